@@ -2,16 +2,261 @@
 """
 Convert the Kaggle Telco CSV into a features parquet for the baseline.
 
+Streams the CSV in blocks of --chunk-mb with an explicit schema, so peak
+memory is bounded by the block and row-group sizes rather than the archive
+size:
+- Yes/No and other low-cardinality text fields (Contract, PaymentMethod, ...)
+  are dictionary-encoded and read back by pandas as `category`
+- SeniorCitizen / tenure are int64, MonthlyCharges / TotalCharges float64;
+  blank or non-numeric TotalCharges become null (as pd.to_numeric(coerce))
+- columns not in the Telco schema are kept as plain strings
+- Churn (Yes/No) becomes the 0/1 target; customerID and Churn are dropped
+
+Output is one parquet file with row groups of --row-group-rows rows, or with
+--partition-by COL a hive-partitioned directory (COL=value/part-*.parquet).
+train_baseline and the Monte-Carlo runner expect the single-file form.
+
+--sample N keeps the same rows, in the same order, as
+df.sample(n=N, random_state=42) on the whole CSV did. A first pass counts
+rows from line ends without parsing; the second parses only the sampled
+lines.
+
 Usage:
   python scripts/archive_to_parquet.py \
     --input data/archive/Telco-Customer-Churn.csv \
     --out data/processed/features.parquet \
     --target churned \
-    [--sample 500]
+    [--sample 500] [--row-group-rows 65536] [--compression zstd] \
+    [--partition-by Contract]
 """
 import argparse
+import csv
+import os
 import pathlib
-import pandas as pd
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+TELCO_TYPES = {
+    "customerID": pa.string(),
+    "gender": CATEGORY,
+    "SeniorCitizen": pa.int64(),
+    "Partner": CATEGORY,
+    "Dependents": CATEGORY,
+    "tenure": pa.int64(),
+    "PhoneService": CATEGORY,
+    "MultipleLines": CATEGORY,
+    "InternetService": CATEGORY,
+    "OnlineSecurity": CATEGORY,
+    "OnlineBackup": CATEGORY,
+    "DeviceProtection": CATEGORY,
+    "TechSupport": CATEGORY,
+    "StreamingTV": CATEGORY,
+    "StreamingMovies": CATEGORY,
+    "Contract": CATEGORY,
+    "PaperlessBilling": CATEGORY,
+    "PaymentMethod": CATEGORY,
+    "MonthlyCharges": pa.float64(),
+    # read as text: the archive has blanks for new customers
+    "TotalCharges": pa.string(),
+    "Churn": pa.string(),
+}
+DROP = ("customerID", "Churn")
+NUMBER = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+
+def read_header(path: pathlib.Path) -> list[str]:
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def _record_end(buf: bytearray, end: int) -> int:
+    """Offset just past the last newline in buf[:end] not inside a quoted field."""
+    pos = buf.rfind(b"\n", 0, end)
+    while pos >= 0 and buf.count(b'"', 0, pos) % 2:
+        pos = buf.rfind(b"\n", 0, pos)
+    return pos + 1
+
+
+def read_blocks(path, block_bytes):
+    """
+    Yield the data rows as views of about block_bytes, each ending on a record
+    boundary; a view is only valid until the next one is requested. Blocks
+    are cut here rather than by pyarrow's streaming CSV reader, whose
+    readahead has no bound, and all reads go into one reused buffer, so
+    memory does not grow with the file.
+    """
+    buf = bytearray(block_bytes)
+    with open(path, "rb") as f:
+        f.readline()  # header
+        filled = 0
+        while True:
+            with memoryview(buf) as view:
+                end = filled + f.readinto(view[filled:])
+            if end == filled:  # EOF
+                if buf[:end].strip():
+                    with memoryview(buf) as view:
+                        yield view[:end]
+                return
+            cut = _record_end(buf, end)
+            if not cut:  # one record longer than the buffer: grow it
+                buf = buf[:end] + bytes(len(buf))
+                filled = end
+                continue
+            with memoryview(buf) as view:
+                yield view[:cut]
+                view[: end - cut] = view[cut:end]
+            filled = end - cut
+
+
+def parse_block(block: bytes, columns) -> pa.Table:
+    return pv.read_csv(
+        pa.py_buffer(block),
+        read_options=pv.ReadOptions(column_names=columns),
+        convert_options=pv.ConvertOptions(
+            column_types={c: TELCO_TYPES.get(c, pa.string()) for c in columns}
+        ),
+    )
+
+
+def to_numeric(strings) -> pa.Array:
+    """float64, with null for anything that does not parse (errors="coerce")."""
+    trimmed = pc.utf8_trim_whitespace(strings)
+    ok = pc.fill_null(pc.match_substring_regex(trimmed, NUMBER), False)
+    return pc.if_else(ok, trimmed, pa.scalar(None, pa.string())).cast(pa.float64())
+
+
+def transform(table: pa.Table, target: str) -> pa.Table:
+    """Raw CSV rows -> features (ids dropped, target last)."""
+    churn = pc.utf8_lower(pc.utf8_trim_whitespace(table.column("Churn")))
+    columns, names = [], []
+    for name, column in zip(table.column_names, table.columns):
+        if name in DROP:
+            continue
+        if name == "TotalCharges":
+            column = to_numeric(column)
+        columns.append(column)
+        names.append(name)
+    columns.append(pc.fill_null(pc.equal(churn, "yes"), False).cast(pa.int64()))
+    return pa.Table.from_arrays(columns, names=names + [target])
+
+
+def feature_tables(path, columns, chunk_mb, target):
+    for block in read_blocks(path, chunk_mb << 20):
+        yield transform(parse_block(block, columns), target)
+
+
+def line_spans(block):
+    """
+    (start, stop) offsets of the non-empty lines in block, or None if it has
+    quotes (a quoted field may hold a newline, so lines are not records).
+    """
+    arr = np.frombuffer(block, dtype=np.uint8)
+    if (arr == ord('"')).any():
+        return None
+    ends = np.flatnonzero(arr == ord("\n"))
+    starts = np.concatenate([[0], ends + 1])
+    stops = np.concatenate([ends, [len(arr)]])
+    # a line holding only "\r" is empty too
+    bare_cr = (stops - starts == 1) & (arr[np.maximum(stops - 1, 0)] == ord("\r"))
+    keep = (stops > starts) & ~bare_cr
+    return starts[keep], stops[keep]
+
+
+def sampled_tables(path, columns, chunk_mb, target, sample):
+    """
+    The rows df.sample(n=sample, random_state=42) picked, in its order:
+    that draws RandomState(42).choice(n_rows, n, replace=False).
+
+    The counting pass only finds line ends, and the second pass parses just
+    the picked lines; blocks with quotes fall back to parsing the block.
+    """
+    counts = []
+    for block in read_blocks(path, chunk_mb << 20):
+        spans = line_spans(block)
+        counts.append(
+            len(spans[0]) if spans is not None else parse_block(block, columns).num_rows
+        )
+    n_rows = sum(counts)
+    picks = np.random.RandomState(42).choice(
+        n_rows, size=min(sample, n_rows), replace=False
+    )
+    ordered = np.sort(picks)
+    kept, start = [], 0
+    blocks = read_blocks(path, chunk_mb << 20)
+    for block, count in zip(blocks, counts):
+        lo, hi = np.searchsorted(ordered, [start, start + count])
+        local = ordered[lo:hi] - start
+        start += count
+        if not len(local):
+            continue
+        spans = line_spans(block)
+        if spans is None:
+            table = parse_block(block, columns).take(pa.array(local))
+        else:
+            lines = [
+                bytes(block[a:b]) + b"\n"
+                for a, b in zip(spans[0][local], spans[1][local])
+            ]
+            table = parse_block(b"".join(lines), columns)
+        kept.append(transform(table, target))
+    table = pa.concat_tables(kept).unify_dictionaries()
+    # kept rows are in file order; put them in sample order
+    order = np.argsort(np.argsort(picks))
+    return [table.take(pa.array(order)).combine_chunks()]
+
+
+def write_file(tables, schema, dst, row_group_rows, compression) -> int:
+    """Write row groups of exactly row_group_rows (the last may be shorter)."""
+    tmp = dst.with_name(dst.name + ".tmp")
+    rows, pending = 0, pa.Table.from_batches([], schema=schema)
+
+    def write_group(group: pa.Table):
+        # One dictionary per column chunk: mixed per-block dictionaries make
+        # the writer fall back to plain encoding
+        writer.write_table(group.unify_dictionaries().combine_chunks())
+
+    with pq.ParquetWriter(tmp, schema, compression=compression) as writer:
+        for table in tables:
+            pending = pa.concat_tables([pending, table])
+            while pending.num_rows >= row_group_rows:
+                write_group(pending.slice(0, row_group_rows))
+                pending = pending.slice(row_group_rows)
+                rows += row_group_rows
+        if pending.num_rows:
+            write_group(pending)
+            rows += pending.num_rows
+    os.replace(tmp, dst)  # readers never see a half-written file
+    return rows
+
+
+def write_partitioned(tables, schema, dst, column, row_group_rows, compression):
+    """Hive-partitioned dataset under dst (one directory per column value)."""
+    counts = {"rows": 0}
+
+    def batches():
+        for table in tables:
+            counts["rows"] += table.num_rows
+            yield from table.to_batches()
+
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(schema, batches()),
+        dst,
+        format="parquet",
+        partitioning=[column],
+        partitioning_flavor="hive",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+        max_rows_per_group=row_group_rows,
+        min_rows_per_group=min(row_group_rows, 1 << 14),
+        existing_data_behavior="delete_matching",
+    )
+    return counts["rows"]
 
 
 def main():
@@ -20,38 +265,70 @@ def main():
     ap.add_argument("--out", required=True)
     ap.add_argument("--target", default="churned")
     ap.add_argument("--sample", type=int, default=None)
+    ap.add_argument(
+        "--chunk-mb", type=int, default=8, help="CSV bytes parsed per block (default 8)"
+    )
+    ap.add_argument(
+        "--row-group-rows",
+        type=int,
+        default=65_536,
+        help="Rows per parquet row group (default 65536)",
+    )
+    ap.add_argument(
+        "--compression",
+        default="zstd",
+        choices=["zstd", "snappy", "gzip", "lz4", "none"],
+        help="Parquet codec (default zstd)",
+    )
+    ap.add_argument(
+        "--partition-by",
+        default=None,
+        metavar="COLUMN",
+        help="Write a hive-partitioned directory at --out instead of one file",
+    )
     args = ap.parse_args()
 
     src = pathlib.Path(args.input)
     dst = pathlib.Path(args.out)
     dst.parent.mkdir(parents=True, exist_ok=True)
 
-    df = pd.read_csv(src)
-
+    columns = read_header(src)
     # Map target 'Churn' (Yes/No) -> 1/0 as 'churned'
-    if "Churn" not in df.columns:
+    if "Churn" not in columns:
         raise ValueError("Expected 'Churn' column in archive CSV")
-    df[args.target] = (df["Churn"].astype(str).str.strip().str.lower() == "yes").astype(
-        int
-    )
-
-    # Optional: drop ID-like columns not useful for the baseline
-    drop_cols = [c for c in ["customerID", "Churn"] if c in df.columns]
-    df = df.drop(columns=drop_cols)
-
-    # basic cleanup: coerce total charges to numeric
-    if "TotalCharges" in df.columns:
-        df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
+    if args.partition_by and args.partition_by not in columns:
+        raise ValueError(f"--partition-by: no '{args.partition_by}' column")
 
-    # Deterministic sample (pre-split lightweight runs)
+    t0 = time.perf_counter()
     if args.sample:
-        df = df.sample(n=min(args.sample, len(df)), random_state=42).reset_index(
-            drop=True
+        tables = iter(
+            sampled_tables(src, columns, args.chunk_mb, args.target, args.sample)
         )
+    else:
+        tables = feature_tables(src, columns, args.chunk_mb, args.target)
+    first = next(tables, None)
+    if first is None:
+        raise ValueError(f"{src}: no data rows")
+    schema = first.schema
 
-    dst.write_bytes(b"")  # ensure path is writable early
-    df.to_parquet(dst, index=False)
-    print(f"Wrote {len(df)} rows -> {dst}")
+    def all_tables():
+        yield first
+        yield from tables
+
+    compression = None if args.compression == "none" else args.compression
+    if args.partition_by:
+        rows = write_partitioned(
+            all_tables(),
+            schema,
+            dst,
+            args.partition_by,
+            args.row_group_rows,
+            compression,
+        )
+    else:
+        rows = write_file(all_tables(), schema, dst, args.row_group_rows, compression)
+    seconds = time.perf_counter() - t0
+    print(f"Wrote {rows} rows -> {dst} ({rows / seconds:,.0f} rows/s)")
 
 
 if __name__ == "__main__":
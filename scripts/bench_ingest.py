@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Postgres loader (src/pipelines/ingest_csv.py).
+
+Runs the loader once per variant (and repeat) as a subprocess against the
+configured database (POSTGRES_* settings), starting each run from empty churn
+tables, and records rows/s, wall time, seconds per phase (parse, spool,
+delta_filter, customer_upsert, label_load, partitions, id_mapping, commit) and
+peak RSS as JSON.
+
+Usage:
+  python scripts/gen_synthetic.py --customers 1000000 --out-dir data/processed/synthetic
+  python scripts/bench_ingest.py \
+    --data-dir data/processed/synthetic \
+    [--variant copy="--mode copy" --variant chunked="--mode copy --chunk-size 100000"] \
+    [--repeat 3] [--out artifacts/bench/ingest_<version>.json] \
+    [--compare artifacts/bench/ingest_0.4.0.json [--max-regression 10]]
+
+--compare prints the median rows/s of each variant against an earlier result
+file; with --max-regression PCT the script exits 1 if any shared variant got
+slower by more than PCT percent.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src import db  # noqa: E402
+
+DEFAULT_VARIANTS = {
+    "upsert": "--mode upsert",
+    "copy": "--mode copy",
+    "copy_chunked": "--mode copy --chunk-size 100000",
+}
+
+
+def parse_variant(spec):
+    name, sep, args = spec.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=ARGS, got {spec!r}")
+    return name, args
+
+
+def reset_tables():
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE churn.customers, churn.churn_labels;")
+        conn.commit()
+
+
+def git_rev():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run_loader(data_dir, extra_args):
+    """Run one load; returns the loader's --stats-json payload plus exit status."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = Path(tmp) / "stats.json"
+        cmd = [
+            sys.executable,
+            "-m",
+            "src.pipelines.ingest_csv",
+            "--data-dir",
+            str(data_dir),
+            "--stats-json",
+            str(stats_path),
+            *shlex.split(extra_args),
+        ]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0 or not stats_path.exists():
+            return {"returncode": proc.returncode, "stderr": proc.stderr[-2000:]}
+        stats = json.loads(stats_path.read_text())
+    total_rows = sum(stats["rows"].values())
+    wall = stats["wall_seconds"]
+    stats["rows_per_sec"] = round(total_rows / wall, 1) if wall > 0 else None
+    stats["returncode"] = 0
+    return stats
+
+
+def summarize(runs):
+    summary = {}
+    for name in dict.fromkeys(r["variant"] for r in runs):
+        ok = [r for r in runs if r["variant"] == name and r["returncode"] == 0]
+        if not ok:
+            summary[name] = {"failed": True}
+            continue
+        summary[name] = {
+            "runs": len(ok),
+            "median_rows_per_sec": statistics.median(r["rows_per_sec"] for r in ok),
+            "median_wall_seconds": statistics.median(r["wall_seconds"] for r in ok),
+            "max_peak_rss_mb": max(
+                max(r["peak_rss_mb"], r["peak_rss_children_mb"]) for r in ok
+            ),
+        }
+    return summary
+
+
+def compare(old, new, max_regression):
+    """Print rows/s deltas per shared variant; returns False on a regression."""
+    ok = True
+    print(f"\nvs {old.get('version')} ({old.get('git_rev')}):")
+    for name, cur in new["summary"].items():
+        prev = old.get("summary", {}).get(name)
+        if not prev or prev.get("failed") or cur.get("failed"):
+            continue
+        before, after = prev["median_rows_per_sec"], cur["median_rows_per_sec"]
+        change = (after - before) / before * 100
+        print(
+            f"  {name:<16} {before:>12,.0f} -> {after:>12,.0f} rows/s ({change:+.1f}%)"
+        )
+        if max_regression is not None and change < -max_regression:
+            ok = False
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-dir", required=True)
+    ap.add_argument(
+        "--variant",
+        action="append",
+        type=parse_variant,
+        default=None,
+        help='NAME="loader args" (repeatable); default: upsert, copy, copy_chunked',
+    )
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--out", default=None)
+    ap.add_argument(
+        "--compare", default=None, help="Earlier result JSON to diff against"
+    )
+    ap.add_argument("--max-regression", type=float, default=None)
+    args = ap.parse_args()
+
+    version = (ROOT / "VERSION").read_text().strip()
+    variants = dict(args.variant) if args.variant else DEFAULT_VARIANTS
+    out = Path(args.out or f"artifacts/bench/ingest_{version}.json")
+
+    runs = []
+    for name, extra in variants.items():
+        for i in range(args.repeat):
+            reset_tables()
+            stats = run_loader(Path(args.data_dir).resolve(), extra)
+            runs.append({"variant": name, "args": extra, "repeat": i, **stats})
+            if stats["returncode"] != 0:
+                print(f"{name} #{i}: loader failed\n{stats['stderr']}", file=sys.stderr)
+                continue
+            print(
+                f"{name} #{i}: {stats['rows_per_sec']:,.0f} rows/s, "
+                f"{stats['wall_seconds']:.2f}s, peak RSS {stats['peak_rss_mb']} MB"
+            )
+
+    result = {
+        "version": version,
+        "git_rev": git_rev(),
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "data_dir": str(args.data_dir),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"Wrote {out}")
+
+    if args.compare and not compare(
+        json.loads(Path(args.compare).read_text()), result, args.max_regression
+    ):
+        sys.exit(1)
+    if any(r["returncode"] != 0 for r in runs):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Generate Telco-shaped loader inputs at arbitrary scale.
+
+Writes customers + churn_labels in the loader format described in
+docs/etl_mapping_telco.md: Telco attributes packed into `attributes`, created_at
+derived from tenure, and one label per customer per monthly snapshot.
+
+Usage:
+  python scripts/gen_synthetic.py \
+    --customers 1000000 \
+    --out-dir data/processed/synthetic \
+    [--snapshots 6] [--snapshot-date 2024-06-30] [--format csv|parquet] [--seed 42]
+
+Rows are generated in blocks, so memory stays flat at any --customers. Output
+is deterministic for a given (--seed, --block-size).
+
+Snapshot model: snapshots are month ends ending at --snapshot-date. A customer
+gets a label at every snapshot from signup until churn (label true at the
+churn snapshot, nothing after). The per-snapshot churn probability follows the
+Telco pattern (month-to-month and fiber customers churn most, long tenure
+least) and is ~26% on average, so --snapshots 1 matches the archive's rate.
+"""
+import argparse
+import pathlib
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Categorical marginals, approximately those of the Telco archive
+YES_NO = ["Yes", "No"]
+CHOICES = {
+    "gender": (["Male", "Female"], [0.505, 0.495]),
+    "Partner": (YES_NO, [0.48, 0.52]),
+    "Dependents": (YES_NO, [0.30, 0.70]),
+    "PhoneService": (YES_NO, [0.90, 0.10]),
+    "InternetService": (["Fiber optic", "DSL", "No"], [0.44, 0.34, 0.22]),
+    "Contract": (["Month-to-month", "One year", "Two year"], [0.55, 0.21, 0.24]),
+    "PaperlessBilling": (YES_NO, [0.59, 0.41]),
+    "PaymentMethod": (
+        [
+            "Electronic check",
+            "Mailed check",
+            "Bank transfer (automatic)",
+            "Credit card (automatic)",
+        ],
+        [0.34, 0.23, 0.22, 0.21],
+    ),
+}
+# Share of "Yes" among customers that have internet service
+INTERNET_ADDONS = {
+    "OnlineSecurity": 0.37,
+    "OnlineBackup": 0.44,
+    "DeviceProtection": 0.44,
+    "TechSupport": 0.37,
+    "StreamingTV": 0.49,
+    "StreamingMovies": 0.50,
+}
+# Telco churn rate by contract
+CONTRACT_CHURN = {"Month-to-month": 0.43, "One year": 0.11, "Two year": 0.03}
+# Tenure range (months) by contract; longer contracts skew older
+CONTRACT_TENURE = {"Month-to-month": (0, 60), "One year": (1, 72), "Two year": (1, 72)}
+
+# Key order inside `attributes` (matches the Telco column order)
+ATTRIBUTE_KEYS = [
+    "gender",
+    "SeniorCitizen",
+    "Partner",
+    "Dependents",
+    "tenure",
+    "PhoneService",
+    "MultipleLines",
+    "InternetService",
+    "OnlineSecurity",
+    "OnlineBackup",
+    "DeviceProtection",
+    "TechSupport",
+    "StreamingTV",
+    "StreamingMovies",
+    "Contract",
+    "PaperlessBilling",
+    "PaymentMethod",
+    "MonthlyCharges",
+    "TotalCharges",
+]
+
+# Loader input schemas (same as src/pipelines/arrow_input.py)
+SCHEMAS = {
+    "customers": pa.schema(
+        [
+            ("external_id", pa.string()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+            ("signup_source", pa.string()),
+            ("country", pa.string()),
+            ("region", pa.string()),
+            ("city", pa.string()),
+            ("plan_tier", pa.string()),
+            ("is_active", pa.bool_()),
+            ("attributes", pa.string()),
+        ]
+    ),
+    "churn_labels": pa.schema(
+        [
+            ("external_id", pa.string()),
+            ("label", pa.bool_()),
+            ("label_date", pa.date32()),
+            ("reason_code", pa.string()),
+            ("notes", pa.string()),
+        ]
+    ),
+}
+
+_LETTERS = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+
+
+def external_ids(ids: np.ndarray) -> np.ndarray:
+    """Telco-style ids ("7590-VHVEG"), unique for ids < 10**4 * 26**5."""
+    out = np.empty((len(ids), 10), dtype=np.uint8)
+    digits = ids % 10_000
+    for pos in range(4):
+        out[:, 3 - pos] = ord("0") + digits % 10
+        digits //= 10
+    out[:, 4] = ord("-")
+    rest = ids // 10_000
+    for pos in range(5):
+        out[:, 9 - pos] = _LETTERS[rest % 26]
+        rest //= 26
+    return out.view("S10").ravel().astype(str)
+
+
+def month_ends(months: np.ndarray) -> np.ndarray:
+    """Last day of each datetime64[M] value, as datetime64[D]."""
+    return (months + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+
+
+def generate_block(rng, ids, snapshot_month, n_snapshots):
+    """Return (customers, labels) Arrow tables for the given ids."""
+    n = len(ids)
+    cols = {
+        name: np.asarray(values)[rng.choice(len(values), size=n, p=p)]
+        for name, (values, p) in CHOICES.items()
+    }
+    cols["SeniorCitizen"] = np.where(rng.random(n) < 0.16, "1", "0")
+
+    has_phone = cols["PhoneService"] == "Yes"
+    cols["MultipleLines"] = np.where(
+        has_phone, np.where(rng.random(n) < 0.47, "Yes", "No"), "No phone service"
+    )
+    internet = cols["InternetService"]
+    for name, share in INTERNET_ADDONS.items():
+        cols[name] = np.where(
+            internet == "No",
+            "No internet service",
+            np.where(rng.random(n) < share, "Yes", "No"),
+        )
+
+    contract = cols["Contract"]
+    tenure = np.zeros(n, dtype=np.int64)
+    for kind, (lo, hi) in CONTRACT_TENURE.items():
+        mask = contract == kind
+        tenure[mask] = rng.integers(lo, hi + 1, size=int(mask.sum()))
+
+    monthly = np.select(
+        [internet == "Fiber optic", internet == "DSL"],
+        [rng.uniform(70, 118, n), rng.uniform(25, 80, n)],
+        rng.uniform(18, 26, n),
+    ).round(2)
+    total = (monthly * tenure * rng.uniform(0.95, 1.05, n)).round(2)
+    cols["tenure"] = tenure.astype(str)
+    cols["MonthlyCharges"] = monthly.astype(str)
+    # Like the archive, brand-new customers have a blank TotalCharges
+    cols["TotalCharges"] = np.where(tenure == 0, " ", total.astype(str))
+
+    # Per-snapshot churn probability
+    p = np.select(
+        [contract == k for k in CONTRACT_CHURN], list(CONTRACT_CHURN.values())
+    )
+    p = p * np.where(internet == "Fiber optic", 1.3, 0.8)
+    p = np.clip(p * np.where(tenure > 24, 0.5, 1.2), 0.0, 0.95)
+
+    # Snapshot k (0 = oldest) is month snapshot_month - (n_snapshots - 1 - k)
+    months_back = np.arange(n_snapshots - 1, -1, -1)
+    exists = tenure[:, None] >= months_back[None, :]
+    churns = exists & (rng.random((n, n_snapshots)) < p[:, None])
+    churned = churns.any(axis=1)
+    churn_k = np.where(churned, churns.argmax(axis=1), n_snapshots)
+    ks = np.arange(n_snapshots)
+    emitted = exists & (ks[None, :] <= churn_k[:, None])
+
+    ext = external_ids(ids)
+    created = month_ends(snapshot_month - tenure.astype("timedelta64[M]"))
+    # {"gender": "Male", "SeniorCitizen": "0", ...} built column-wise
+    parts = []
+    for i, key in enumerate(ATTRIBUTE_KEYS):
+        parts += [("{" if i == 0 else ", ") + f'"{key}": "', pa.array(cols[key]), '"']
+    attributes = pc.binary_join_element_wise(*parts, "}", "")
+    customers = pa.Table.from_arrays(
+        [
+            pa.array(ext),
+            pa.array(created.astype("datetime64[us]")).cast(
+                pa.timestamp("us", tz="UTC")
+            ),
+            pa.array(contract),
+            pa.array(np.full(n, "US")),
+            pa.array(np.full(n, "NA")),
+            pa.array(np.full(n, "")),
+            pa.array(internet),
+            pa.array(~churned),
+            attributes,
+        ],
+        schema=SCHEMAS["customers"],
+    )
+
+    rows, snaps = np.nonzero(emitted)
+    label_dates = month_ends(snapshot_month - months_back.astype("timedelta64[M]"))
+    empty = np.full(len(rows), "")
+    labels = pa.Table.from_arrays(
+        [
+            pa.array(ext[rows]),
+            pa.array(snaps == churn_k[rows]),
+            pa.array(label_dates[snaps]),
+            pa.array(empty),
+            pa.array(empty),
+        ],
+        schema=SCHEMAS["churn_labels"],
+    )
+    return customers, labels
+
+
+class CsvSink:
+    """Loader-format CSVs: ISO timestamps, true/false booleans."""
+
+    def __init__(self, out_dir: pathlib.Path):
+        self.writers = {
+            name: pacsv.CSVWriter(
+                out_dir / f"{name}.csv",
+                pa.schema([(f.name, pa.string()) for f in schema]),
+            )
+            for name, schema in SCHEMAS.items()
+        }
+
+    def write(self, name, table):
+        columns = []
+        for col in table.columns:
+            if pa.types.is_boolean(col.type):
+                col = pc.if_else(col, "true", "false")
+            elif pa.types.is_timestamp(col.type):
+                col = pc.strftime(
+                    col.cast(pa.timestamp("s", tz="UTC")), format="%Y-%m-%dT%H:%M:%SZ"
+                )
+            columns.append(col.cast(pa.string()))
+        self.writers[name].write_table(
+            pa.Table.from_arrays(columns, names=table.column_names)
+        )
+
+    def close(self):
+        for w in self.writers.values():
+            w.close()
+
+
+class ParquetSink:
+    def __init__(self, out_dir: pathlib.Path):
+        self.writers = {
+            name: pq.ParquetWriter(out_dir / f"{name}.parquet", schema)
+            for name, schema in SCHEMAS.items()
+        }
+
+    def write(self, name, table):
+        self.writers[name].write_table(table)
+
+    def close(self):
+        for w in self.writers.values():
+            w.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--customers", type=int, required=True)
+    ap.add_argument("--out-dir", required=True)
+    ap.add_argument("--snapshots", type=int, default=1)
+    ap.add_argument(
+        "--snapshot-date",
+        default="2024-06-30",
+        help="Latest snapshot; all dates are month ends of this and earlier months.",
+    )
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--block-size", type=int, default=200_000)
+    args = ap.parse_args()
+    if args.snapshots < 1:
+        ap.error("--snapshots must be >= 1")
+
+    out_dir = pathlib.Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    snapshot_month = np.datetime64(args.snapshot_date, "M")
+    sink = CsvSink(out_dir) if args.format == "csv" else ParquetSink(out_dir)
+
+    n_labels = n_churned = 0
+    for block, start in enumerate(range(0, args.customers, args.block_size)):
+        stop = min(start + args.block_size, args.customers)
+        rng = np.random.default_rng([args.seed, block])
+        customers, labels = generate_block(
+            rng, np.arange(start, stop, dtype=np.int64), snapshot_month, args.snapshots
+        )
+        sink.write("customers", customers)
+        sink.write("churn_labels", labels)
+        n_labels += labels.num_rows
+        n_churned += customers.num_rows - pc.sum(customers["is_active"]).as_py()
+    sink.close()
+
+    print(
+        f"Wrote {args.customers} customers ({n_churned} churned) and "
+        f"{n_labels} labels over {args.snapshots} snapshot(s) -> {out_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
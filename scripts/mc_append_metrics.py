@@ -1,12 +1,26 @@
 #!/usr/bin/env python3
+"""
+Register one finished run (metrics.json, params.json, timings.json in
+run_outdir) in the run registry (src/cli/run_registry.py). Safe to run from
+many processes at once: writers queue on the registry's write lock.
+
+The run's sweep is keyed on the same params as monte_carlo's (input and its
+digest, target, split and sample settings), read from params.json, so every
+seed of one sweep shares it whatever else params.json records per run.
+"""
 import json
 import sys
-import csv
 import pathlib
 
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.cli.preprocess_cache import file_digest  # noqa: E402
+from src.cli.run_registry import RunRegistry, sweep_key, sweep_params  # noqa: E402
+
 if len(sys.argv) != 5:
     print(
-        "usage: mc_append_metrics.py <seed> <n> <run_outdir> <csv_path>",
+        "usage: mc_append_metrics.py <seed> <n> <run_outdir> <registry.sqlite>",
         file=sys.stderr,
     )
     sys.exit(2)
@@ -14,22 +28,42 @@ if len(sys.argv) != 5:
 seed = int(sys.argv[1])
 n = int(sys.argv[2])
 outdir = pathlib.Path(sys.argv[3])
-csv_path = pathlib.Path(sys.argv[4])
+registry_path = pathlib.Path(sys.argv[4])
 
 m_path = outdir / "metrics.json"
 if not m_path.exists():
     print("metrics.json missing:", m_path, file=sys.stderr)
     sys.exit(1)
-m = json.loads(m_path.read_text())
-row = [
-    seed,
-    n,
-    m.get("accuracy"),
-    m.get("precision"),
-    m.get("recall"),
-    m.get("f1"),
-    m.get("roc_auc"),
-]
-csv_path.parent.mkdir(parents=True, exist_ok=True)
-with open(csv_path, "a", newline="") as f:
-    csv.writer(f).writerow(row)
+
+
+def _load(name):
+    path = outdir / name
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+timings = _load("timings.json")
+params = _load("params.json") or {}
+input_path = params.get("input_path")
+sample = params.get("sample") or {}
+data_digest = None
+if input_path and pathlib.Path(input_path).exists():
+    data_digest = file_digest(input_path)
+sweep = sweep_params(
+    input_path,
+    data_digest,
+    params.get("target"),
+    params.get("test_size"),
+    sample.get("n"),
+    sample.get("stratified", False),
+    params.get("sparse", False),
+)
+with RunRegistry(registry_path) as registry:
+    registry.register(
+        seed,
+        json.loads(m_path.read_text()),
+        n=n,
+        run_dir=str(outdir),
+        params=params or None,
+        timings=timings["stages"] if timings else None,
+        sweep=sweep_key(sweep),
+    )
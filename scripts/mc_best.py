@@ -1,84 +1,117 @@
 #!/usr/bin/env python3
+"""
+Promote the best Monte-Carlo run by a metric: an indexed top-1 query on the
+run registry, then an atomic switch of the `best` symlink to run_<seed>/
+(nothing is copied). Runs are ranked within one sweep (by default the most
+recently registered one), so a run from an experiment with other inputs or
+settings is never promoted. --copy materialises the run into --outdir instead, for
+a snapshot that is committed to git.
+"""
 import argparse
-import csv
 import json
+import os
 import shutil
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.cli.run_registry import RunRegistry  # noqa: E402
+
 
 def main():
     ap = argparse.ArgumentParser(
         description="Pick the best Monte-Carlo run by a chosen metric"
     )
     ap.add_argument(
-        "--metrics",
-        default="artifacts/mc_baseline/metrics.csv",
-        help="Path to metrics CSV from monte-carlo runs",
+        "--registry",
+        default="artifacts/mc_baseline/runs.sqlite",
+        help="Run registry written by monte-carlo runs",
     )
     ap.add_argument(
         "--metric",
         default="roc_auc",
         help="Metric name to rank by (e.g. roc_auc, f1, recall)",
     )
+    ap.add_argument(
+        "--sweep",
+        default=None,
+        help="Sweep key to rank within (printed by monte_carlo). "
+        "Default: the sweep of the latest registered run",
+    )
     ap.add_argument(
         "--outdir",
         default="artifacts/mc_baseline/best",
-        help="Directory to copy the best run's artifacts into",
+        help="Symlink (or, with --copy, directory) pointing at the best run",
+    )
+    ap.add_argument(
+        "--copy",
+        action="store_true",
+        help="Copy the run's artifacts into --outdir instead of linking",
     )
     args = ap.parse_args()
 
-    metrics_path = Path(args.metrics)
-    if not metrics_path.exists():
-        print(f"Error: metrics file not found: {metrics_path}", file=sys.stderr)
+    registry_path = Path(args.registry)
+    if not registry_path.exists():
+        print(f"Error: run registry not found: {registry_path}", file=sys.stderr)
         sys.exit(1)
 
-    with open(metrics_path, newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-    if not rows:
-        print("Error: no rows in metrics CSV", file=sys.stderr)
-        sys.exit(2)
-    if args.metric not in rows[0]:
-        print(
-            f"Error: metric '{args.metric}' not found in CSV headers: {list(rows[0].keys())}",
-            file=sys.stderr,
-        )
-        sys.exit(3)
-
-    # Convert metric to float and pick the row with maximum metric
-    def to_float(v):
-        try:
-            return float(v)
-        except Exception:
-            return float("-inf")
-
-    best = max(rows, key=lambda row: to_float(row.get(args.metric, "-inf")))
-
-    best_seed = best.get("seed")
-    best_n = best.get("n")
-    best_val = to_float(best.get(args.metric))
+    with RunRegistry(registry_path) as registry:
+        sweep = args.sweep or registry.latest_sweep()
+        if sweep is None:
+            print("Error: no runs in the registry", file=sys.stderr)
+            sys.exit(2)
+        best = registry.top(args.metric, k=1, sweep=sweep)
+        if not best:
+            names = registry.metric_names()
+            print(
+                f"Error: no runs with metric '{args.metric}' in sweep {sweep} "
+                f"(metrics: {names})",
+                file=sys.stderr,
+            )
+            sys.exit(3)
+        best = best[0]
 
-    run_dir = Path(f"artifacts/mc_baseline/run_{best_seed}")
-    if not run_dir.exists():
-        print(f"Error: best run directory missing: {run_dir}", file=sys.stderr)
-        sys.exit(4)
+        run_dir = Path(best["run_dir"] or "")
+        if not best["run_dir"] or not run_dir.is_dir():
+            print(f"Error: best run directory missing: {run_dir}", file=sys.stderr)
+            sys.exit(4)
 
-    outdir = Path(args.outdir)
-    if outdir.exists():
-        shutil.rmtree(outdir)
-    shutil.copytree(run_dir, outdir)
+        outdir = Path(args.outdir)
+        summary = {
+            "metric": args.metric,
+            "value": best[args.metric],
+            "sweep": sweep,
+            "seed": best["seed"],
+            "sample_n": best["n"],
+            "source_run_dir": str(run_dir),
+        }
+        if args.copy:
+            if outdir.is_symlink():
+                outdir.unlink()
+            elif outdir.exists():
+                shutil.rmtree(outdir)
+            shutil.copytree(run_dir, outdir)
+            summary["copied_to"] = str(outdir)
+        else:
+            previous = outdir.resolve() if outdir.is_symlink() else None
+            # Written before the switch: `best` never lacks its summary
+            summary["linked_from"] = str(outdir)
+            (run_dir / "best_summary.json").write_text(json.dumps(summary, indent=2))
+            registry.promote(
+                best["run_id"],
+                outdir,
+                metric=args.metric,
+                value=best[args.metric],
+            )
+            if previous is not None and previous != run_dir.resolve():
+                stale = previous / "best_summary.json"
+                if stale.exists():
+                    os.remove(stale)
+        if args.copy:
+            (outdir / "best_summary.json").write_text(json.dumps(summary, indent=2))
 
-    summary = {
-        "metric": args.metric,
-        "value": best_val,
-        "seed": int(best_seed) if best_seed is not None else None,
-        "sample_n": int(best_n) if best_n is not None else None,
-        "source_run_dir": str(run_dir),
-        "copied_to": str(outdir),
-    }
-    (outdir / "best_summary.json").write_text(json.dumps(summary, indent=2))
     print("Best run summary:")
     print(json.dumps(summary, indent=2))
 
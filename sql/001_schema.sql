@@ -18,11 +18,29 @@ CREATE TABLE IF NOT EXISTS churn.customers (
   plan_tier     TEXT,                      -- InternetService
   is_active     BOOLEAN DEFAULT TRUE,      -- Churn == 'No'
   attributes    JSONB,                     -- packed remaining Telco fields
+  row_hash      TEXT,                      -- loader content hash (delta ingest)
   inserted_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
--- Churn labels (snapshot)
+-- Added after v0.5.0; keeps re-applying the schema safe on existing databases
+ALTER TABLE churn.customers ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+-- Up to v0.5 churn_labels was a plain table. Move it aside so the partitioned
+-- table below can take its name; its rows are copied over further down.
+DO $$
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('churn.churn_labels')) = 'r' THEN
+    ALTER TABLE churn.churn_labels RENAME TO churn_labels_unpartitioned;
+    ALTER TABLE churn.churn_labels_unpartitioned
+      RENAME CONSTRAINT churn_labels_pkey TO churn_labels_unpartitioned_pkey;
+  END IF;
+END;
+$$;
+
+-- Churn labels (snapshot), range-partitioned by label_date: one partition per
+-- month (churn.churn_labels_pYYYYMM), created on demand by
+-- churn.ensure_label_partition(). There is no default partition.
 CREATE TABLE IF NOT EXISTS churn.churn_labels (
   customer_id UUID REFERENCES churn.customers(customer_id) ON DELETE CASCADE,
   label       BOOLEAN NOT NULL,            -- TRUE if churned by label_date
@@ -31,7 +49,80 @@ CREATE TABLE IF NOT EXISTS churn.churn_labels (
   notes       TEXT,
   inserted_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   PRIMARY KEY (customer_id, label_date)
-);
+) PARTITION BY RANGE (label_date);
+
+-- Lets MAX(label_date) read one index entry instead of a whole partition
+CREATE INDEX IF NOT EXISTS idx_churn_labels_label_date ON churn.churn_labels (label_date);
+
+-- Name of the partition holding label_date d
+CREATE OR REPLACE FUNCTION churn.label_partition_name(d DATE)
+RETURNS TEXT AS $$
+  SELECT 'churn_labels_p' || to_char(d, 'YYYYMM');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Create the partition for d if missing; returns its qualified name. The
+-- advisory lock serialises creation between concurrent loaders; the re-check
+-- reads pg_class with a fresh snapshot, so it sees a partition that another
+-- loader committed while we waited.
+CREATE OR REPLACE FUNCTION churn.ensure_label_partition(d DATE)
+RETURNS TEXT AS $$
+DECLARE
+  part TEXT := churn.label_partition_name(d);
+  lo   DATE := date_trunc('month', d)::date;
+BEGIN
+  IF to_regclass('churn.' || part) IS NULL THEN
+    PERFORM pg_advisory_xact_lock(hashtext('churn.churn_labels partitions'));
+    IF NOT EXISTS (
+      SELECT 1 FROM pg_class
+      WHERE relname = part AND relnamespace = 'churn'::regnamespace
+    ) THEN
+      EXECUTE format(
+        'CREATE TABLE churn.%I PARTITION OF churn.churn_labels FOR VALUES FROM (%L) TO (%L)',
+        part, lo, (lo + INTERVAL '1 month')::date
+      );
+    END IF;
+  END IF;
+  RETURN 'churn.' || part;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Latest label_date, reading only the newest non-empty partition
+CREATE OR REPLACE FUNCTION churn.latest_label_date()
+RETURNS DATE AS $$
+DECLARE
+  part REGCLASS;
+  d    DATE;
+BEGIN
+  FOR part IN
+    SELECT c.oid::regclass
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'churn.churn_labels'::regclass
+    ORDER BY c.relname DESC               -- pYYYYMM names sort by month
+  LOOP
+    EXECUTE format('SELECT MAX(label_date) FROM %s', part) INTO d;
+    IF d IS NOT NULL THEN
+      RETURN d;
+    END IF;
+  END LOOP;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Finish the v0.5 migration: copy the old rows into their partitions
+DO $$
+BEGIN
+  IF to_regclass('churn.churn_labels_unpartitioned') IS NOT NULL THEN
+    PERFORM churn.ensure_label_partition(d)
+    FROM (SELECT DISTINCT label_date AS d FROM churn.churn_labels_unpartitioned) m;
+    INSERT INTO churn.churn_labels
+      (customer_id, label, label_date, reason_code, notes, inserted_at)
+    SELECT customer_id, label, label_date, reason_code, notes, inserted_at
+    FROM churn.churn_labels_unpartitioned;
+    DROP TABLE churn.churn_labels_unpartitioned;
+  END IF;
+END;
+$$;
 
 -- updated_at trigger
 CREATE OR REPLACE FUNCTION churn.set_updated_at()
@@ -0,0 +1,161 @@
+-- 002_customer_features.sql — typed feature table for SQL-side feature work
+-- Run after 001_schema.sql. Safe to re-apply.
+--
+-- churn.customers keeps the Telco fields as strings inside attributes JSONB;
+-- churn.customer_features holds them extracted and cast once, refreshed
+-- incrementally by churn.refresh_customer_features().
+
+-- Incremental refresh scans customers by updated_at
+CREATE INDEX IF NOT EXISTS idx_customers_updated_at ON churn.customers (updated_at);
+
+CREATE TABLE IF NOT EXISTS churn.customer_features (
+  customer_id        UUID PRIMARY KEY REFERENCES churn.customers(customer_id) ON DELETE CASCADE,
+  external_id        TEXT,
+  created_at         TIMESTAMPTZ,
+  is_active          BOOLEAN,
+  gender             TEXT,
+  senior_citizen     BOOLEAN,
+  partner            BOOLEAN,
+  dependents         BOOLEAN,
+  tenure             INTEGER,               -- months
+  phone_service      BOOLEAN,
+  multiple_lines     TEXT,                  -- Yes / No / No phone service
+  internet_service   TEXT,                  -- DSL / Fiber optic / No
+  online_security    TEXT,
+  online_backup      TEXT,
+  device_protection  TEXT,
+  tech_support       TEXT,
+  streaming_tv       TEXT,
+  streaming_movies   TEXT,
+  contract           TEXT,
+  paperless_billing  BOOLEAN,
+  payment_method     TEXT,
+  monthly_charges    NUMERIC(10, 2),
+  total_charges      NUMERIC(12, 2),        -- NULL where the source is blank
+  source_updated_at  TIMESTAMPTZ NOT NULL,  -- customers.updated_at this row was built from
+  refreshed_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Report queries (sql/queries/) slice by contract / internet service and
+-- filter on tenure and charges
+CREATE INDEX IF NOT EXISTS idx_customer_features_contract_internet
+  ON churn.customer_features (contract, internet_service);
+CREATE INDEX IF NOT EXISTS idx_customer_features_contract_tenure
+  ON churn.customer_features (contract, tenure) INCLUDE (monthly_charges, is_active);
+
+-- One row per incrementally maintained table
+CREATE TABLE IF NOT EXISTS churn.refresh_state (
+  table_name   TEXT PRIMARY KEY,
+  watermark    TIMESTAMPTZ NOT NULL DEFAULT '-infinity',
+  refreshed_at TIMESTAMPTZ,
+  rows_changed BIGINT
+);
+INSERT INTO churn.refresh_state (table_name) VALUES ('customer_features')
+ON CONFLICT DO NOTHING;
+
+-- Text to numeric; blanks and junk become NULL instead of failing the refresh
+CREATE OR REPLACE FUNCTION churn.to_numeric_or_null(v TEXT)
+RETURNS NUMERIC AS $$
+  SELECT CASE WHEN btrim(v) ~ '^-?[0-9]+(\.[0-9]+)?$' THEN btrim(v)::numeric END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Upsert features for customers whose updated_at moved past the watermark
+-- (or all customers when full_refresh => TRUE). Returns the number of rows written.
+--
+-- The new watermark is capped at the start of the oldest other transaction
+-- still open in this database: a load that began earlier stamps its rows with
+-- an earlier updated_at but commits later, and must not fall behind the mark.
+-- (Other roles' transactions are only visible here with pg_read_all_stats.)
+CREATE OR REPLACE FUNCTION churn.refresh_customer_features(full_refresh BOOLEAN DEFAULT FALSE)
+RETURNS BIGINT AS $$
+DECLARE
+  since     TIMESTAMPTZ;
+  new_mark  TIMESTAMPTZ;
+  n         BIGINT;
+BEGIN
+  -- Serialises concurrent refreshes
+  SELECT watermark INTO since
+  FROM churn.refresh_state WHERE table_name = 'customer_features'
+  FOR UPDATE;
+
+  SELECT LEAST(NOW(), MIN(xact_start)) INTO new_mark
+  FROM pg_stat_activity
+  WHERE datname = current_database() AND pid <> pg_backend_pid()
+    AND xact_start IS NOT NULL;
+
+  IF full_refresh THEN
+    TRUNCATE churn.customer_features;
+    since := '-infinity';
+  END IF;
+
+  INSERT INTO churn.customer_features AS f (
+    customer_id, external_id, created_at, is_active, gender, senior_citizen,
+    partner, dependents, tenure, phone_service, multiple_lines, internet_service,
+    online_security, online_backup, device_protection, tech_support,
+    streaming_tv, streaming_movies, contract, paperless_billing, payment_method,
+    monthly_charges, total_charges, source_updated_at, refreshed_at
+  )
+  SELECT
+    c.customer_id,
+    c.external_id,
+    c.created_at,
+    c.is_active,
+    a->>'gender',
+    (a->>'SeniorCitizen') = '1',
+    (a->>'Partner') = 'Yes',
+    (a->>'Dependents') = 'Yes',
+    churn.to_numeric_or_null(a->>'tenure')::integer,
+    (a->>'PhoneService') = 'Yes',
+    a->>'MultipleLines',
+    a->>'InternetService',
+    a->>'OnlineSecurity',
+    a->>'OnlineBackup',
+    a->>'DeviceProtection',
+    a->>'TechSupport',
+    a->>'StreamingTV',
+    a->>'StreamingMovies',
+    a->>'Contract',
+    (a->>'PaperlessBilling') = 'Yes',
+    a->>'PaymentMethod',
+    churn.to_numeric_or_null(a->>'MonthlyCharges'),
+    churn.to_numeric_or_null(a->>'TotalCharges'),
+    c.updated_at,
+    NOW()
+  FROM churn.customers c
+  CROSS JOIN LATERAL (SELECT c.attributes AS a) j
+  WHERE c.updated_at > since
+  ON CONFLICT (customer_id) DO UPDATE SET
+    external_id       = EXCLUDED.external_id,
+    created_at        = EXCLUDED.created_at,
+    is_active         = EXCLUDED.is_active,
+    gender            = EXCLUDED.gender,
+    senior_citizen    = EXCLUDED.senior_citizen,
+    partner           = EXCLUDED.partner,
+    dependents        = EXCLUDED.dependents,
+    tenure            = EXCLUDED.tenure,
+    phone_service     = EXCLUDED.phone_service,
+    multiple_lines    = EXCLUDED.multiple_lines,
+    internet_service  = EXCLUDED.internet_service,
+    online_security   = EXCLUDED.online_security,
+    online_backup     = EXCLUDED.online_backup,
+    device_protection = EXCLUDED.device_protection,
+    tech_support      = EXCLUDED.tech_support,
+    streaming_tv      = EXCLUDED.streaming_tv,
+    streaming_movies  = EXCLUDED.streaming_movies,
+    contract          = EXCLUDED.contract,
+    paperless_billing = EXCLUDED.paperless_billing,
+    payment_method    = EXCLUDED.payment_method,
+    monthly_charges   = EXCLUDED.monthly_charges,
+    total_charges     = EXCLUDED.total_charges,
+    source_updated_at = EXCLUDED.source_updated_at,
+    refreshed_at      = EXCLUDED.refreshed_at
+  -- Rows re-read because of the capped watermark are skipped if unchanged
+  WHERE f.source_updated_at IS DISTINCT FROM EXCLUDED.source_updated_at;
+  GET DIAGNOSTICS n = ROW_COUNT;
+
+  UPDATE churn.refresh_state
+  SET watermark = GREATEST(since, new_mark), refreshed_at = NOW(), rows_changed = n
+  WHERE table_name = 'customer_features';
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
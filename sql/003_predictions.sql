@@ -0,0 +1,22 @@
+-- 003_predictions.sql — model scores written by `python -m src.app score`
+-- Run after 001_schema.sql and 002_customer_features.sql: the queries of
+-- src/pipelines/score.py use churn.to_numeric_or_null from 002.
+-- Safe to re-apply.
+--
+-- One row per customer, snapshot and model version. A scoring run replaces
+-- the rows of its (model_version, snapshot_date) in one transaction.
+
+CREATE TABLE IF NOT EXISTS churn.predictions (
+  model_version      TEXT        NOT NULL,   -- <artifact dir>-<model.pkl hash> by default
+  snapshot_date      DATE        NOT NULL,
+  customer_id        UUID        NOT NULL REFERENCES churn.customers(customer_id) ON DELETE CASCADE,
+  churn_probability  DOUBLE PRECISION NOT NULL,
+  predicted_label    BOOLEAN     NOT NULL,   -- churn_probability >= 0.5
+  scored_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  -- Leading (model_version, snapshot_date) serves the per-run replace
+  PRIMARY KEY (model_version, snapshot_date, customer_id)
+);
+
+-- A customer's score history across runs
+CREATE INDEX IF NOT EXISTS idx_predictions_customer
+  ON churn.predictions (customer_id, snapshot_date);
@@ -0,0 +1,80 @@
+-- 004_customer_history.sql — versioned customer attributes for point-in-time training sets
+-- Run after 001_schema.sql and 002_customer_features.sql: the queries of
+-- src/pipelines/training_sets.py use churn.to_numeric_or_null from 002.
+-- Safe to re-apply.
+--
+-- churn.customers only holds the current state of each customer. Every insert
+-- and every change of attributes also appends a version here, valid from the
+-- time it was written, so src/pipelines/training_sets.py can join each label
+-- snapshot to the features as they were on its label_date.
+--
+-- valid_from defaults to NOW(), so after a fresh load no label dated before
+-- it finds a version. A load of an older extract stamps its rows with the
+-- extract date instead by setting churn.valid_from for its session:
+-- python -m src.pipelines.ingest_csv --valid-from 2024-04-30
+
+CREATE TABLE IF NOT EXISTS churn.customer_history (
+  customer_id  UUID NOT NULL REFERENCES churn.customers(customer_id) ON DELETE CASCADE,
+  valid_from   TIMESTAMPTZ NOT NULL,        -- '-infinity' for rows that predate this table
+  attributes   JSONB,
+  recorded_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (customer_id, valid_from)
+);
+
+-- Per-snapshot fingerprints count the versions valid by each label_date
+CREATE INDEX IF NOT EXISTS idx_customer_history_valid_from
+  ON churn.customer_history (valid_from) INCLUDE (recorded_at);
+
+CREATE OR REPLACE FUNCTION churn.history_valid_from()
+RETURNS TIMESTAMPTZ AS $$
+  SELECT coalesce(nullif(current_setting('churn.valid_from', TRUE), '')::timestamptz, NOW());
+$$ LANGUAGE sql STABLE;
+
+-- Statement-level: one set-based insert per loader statement rather than one
+-- per row. Two rows for the same customer and valid_from (an upsert that
+-- touches a customer twice in one transaction) keep the latest attributes.
+CREATE OR REPLACE FUNCTION churn.record_customer_inserts()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO churn.customer_history (customer_id, valid_from, attributes)
+  SELECT customer_id, churn.history_valid_from(), attributes FROM new_rows
+  ON CONFLICT (customer_id, valid_from) DO UPDATE
+    SET attributes = EXCLUDED.attributes, recorded_at = NOW();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION churn.record_customer_updates()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO churn.customer_history (customer_id, valid_from, attributes)
+  SELECT n.customer_id, churn.history_valid_from(), n.attributes
+  FROM new_rows n JOIN old_rows o USING (customer_id)
+  WHERE n.attributes IS DISTINCT FROM o.attributes
+  ON CONFLICT (customer_id, valid_from) DO UPDATE
+    SET attributes = EXCLUDED.attributes, recorded_at = NOW();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_customers_history_insert ON churn.customers;
+CREATE TRIGGER trg_customers_history_insert
+AFTER INSERT ON churn.customers
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION churn.record_customer_inserts();
+
+DROP TRIGGER IF EXISTS trg_customers_history_update ON churn.customers;
+CREATE TRIGGER trg_customers_history_update
+AFTER UPDATE ON churn.customers
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION churn.record_customer_updates();
+
+-- Customers loaded before history was kept: their earlier states are unknown,
+-- so the current attributes stand for all of the past. Snapshots built from
+-- these rows are only as point-in-time as that assumption.
+INSERT INTO churn.customer_history (customer_id, valid_from, attributes)
+SELECT c.customer_id, '-infinity', c.attributes
+FROM churn.customers c
+WHERE NOT EXISTS (
+  SELECT 1 FROM churn.customer_history h WHERE h.customer_id = c.customer_id
+);
@@ -2,7 +2,7 @@
 -- Validation checks for customers, churn_labels
 -- Assumed schema:
 --   customers(customer_id PK, ...)
---   churn_labels(customer_id FK, label boolean, label_date date)
+--   churn_labels(customer_id FK, label boolean, label_date date), partitioned by month
 \echo '--- [V1] Row counts by table'
 SELECT 'customers' AS table_name, COUNT(*) AS row_count FROM churn.customers
 UNION ALL
@@ -16,11 +16,20 @@ LEFT JOIN churn.customers c USING (customer_id)
 WHERE c.customer_id IS NULL;
 
 \echo '--- [V3] Churn snapshot on most recent label_date'
-WITH latest AS (SELECT MAX(label_date) AS d FROM churn.churn_labels)
+-- latest_label_date() reads only the newest partition, and the InitPlan lets
+-- the executor prune every other partition (EXPLAIN shows "never executed")
 SELECT
-  (SELECT d FROM latest)                                       AS latest_label_date,
+  MAX(label_date)                        AS latest_label_date,
   COUNT(*) FILTER (WHERE label = TRUE)  AS churn_true_count,
   COUNT(*) FILTER (WHERE label = FALSE) AS churn_false_count,
   COUNT(*)                               AS total_rows_on_latest
 FROM churn.churn_labels
-WHERE label_date = (SELECT d FROM latest);
+WHERE label_date = (SELECT churn.latest_label_date());
+
+\echo '--- [V4] Label partitions (one per month)'
+SELECT c.relname AS partition_name,
+       pg_get_expr(c.relpartbound, c.oid) AS bounds
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'churn.churn_labels'::regclass
+ORDER BY c.relname;
@@ -0,0 +1,40 @@
+-- sample_churn_report.sql — churn report over the typed feature table
+-- Needs 002_customer_features.sql and a refresh:
+--   SELECT churn.refresh_customer_features();
+
+\echo '--- Churn rate by contract and internet service (latest snapshot)'
+SELECT
+  f.contract,
+  f.internet_service,
+  COUNT(*)                                          AS customers,
+  ROUND(AVG(l.label::int) * 100, 1)                 AS churn_pct,
+  ROUND(AVG(f.monthly_charges), 2)                  AS avg_monthly_charges,
+  ROUND(AVG(f.tenure), 1)                           AS avg_tenure_months
+FROM churn.customer_features f
+JOIN churn.churn_labels l
+  ON l.customer_id = f.customer_id
+ AND l.label_date = (SELECT churn.latest_label_date())  -- one partition
+GROUP BY f.contract, f.internet_service
+ORDER BY churn_pct DESC;
+
+\echo '--- Churn rate by tenure band (latest snapshot)'
+SELECT
+  LEAST(f.tenure / 12, 5)                           AS tenure_band,
+  MIN(f.tenure) || '-' || MAX(f.tenure)             AS tenure_months,
+  COUNT(*)                                          AS customers,
+  ROUND(AVG(l.label::int) * 100, 1)                 AS churn_pct
+FROM churn.customer_features f
+JOIN churn.churn_labels l
+  ON l.customer_id = f.customer_id
+ AND l.label_date = (SELECT churn.latest_label_date())
+GROUP BY tenure_band
+ORDER BY tenure_band;
+
+\echo '--- Active high-value month-to-month customers in their first year'
+-- Served by idx_customer_features_contract_tenure (index-only for the filter)
+SELECT COUNT(*) AS customers, ROUND(SUM(monthly_charges), 2) AS monthly_revenue
+FROM churn.customer_features
+WHERE contract = 'Month-to-month'
+  AND tenure < 12
+  AND monthly_charges >= 80
+  AND is_active;
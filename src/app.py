@@ -1,10 +1,20 @@
 """
 CLI entrypoint for churn-prediction (v0.3.0).
 
-Currently exposes a single `health` subcommand that:
-- prints a redacted SQLAlchemy URL (to verify env wiring),
-- opens a DB connection, and
-- runs a trivial query to confirm connectivity.
+Subcommands:
+- `health`: prints a redacted SQLAlchemy URL (to verify env wiring), opens a DB
+  connection and runs a trivial query to confirm connectivity.
+- `refresh-features`: incrementally refreshes churn.customer_features
+  (sql/002_customer_features.sql) from customers changed since the last run.
+- `score`: scores customers (churn.customers or a features parquet) with a
+  saved train_baseline model and writes churn.predictions
+  (sql/003_predictions.sql); see src/pipelines/score.py.
+- `build-training-sets`: writes one point-in-time training parquet per label
+  snapshot from churn.customer_history (sql/004_customer_history.sql),
+  rebuilding only snapshots whose inputs changed; see
+  src/pipelines/training_sets.py.
+- `serve`: HTTP scoring service with a compiled NumPy fast path and request
+  micro-batching; reports p50/p99 latency (see src/serve.py).
 
 Designed to stay small and import-safe; add more subcommands in later milestones
 (e.g., `schema apply`, `ingest`, `model train`).
@@ -12,12 +22,16 @@ Designed to stay small and import-safe; add more subcommands in later milestones
 
 # Standard libs
 import argparse
+import datetime as dt
+import json
+import signal
 import sys
 
 # Third-party
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-# Local config (immutable settings snapshot)
+# Local config (immutable settings snapshot) + shared connection pool
+from src import db
 from src.config import settings
 
 
@@ -32,12 +46,12 @@ def cmd_health(_):
         f"[health] sqlalchemy_url: {settings.sqlalchemy_url.replace(settings.pg_password, '****')}"
     )
     try:
-        # pool_pre_ping=True -> proactively checks connections; avoids stale-conn errors
-        engine = create_engine(settings.sqlalchemy_url, pool_pre_ping=True)
-        with engine.connect() as conn:
+        # Shared pooled engine (src/db.py); pre-ping is configured there
+        with db.get_engine().connect() as conn:
             # Minimal roundtrip to ensure the DB is actually reachable
             conn.execute(text("SELECT 1"))
         print("[health] DB connectivity: OK")
+        print(f"[health] pool: {db.pool_stats()}")
         return 0
     except Exception as e:
         # Keep this broad for a simple health signal; detailed errors show up in logs
@@ -45,6 +59,133 @@ def cmd_health(_):
         return 1
 
 
+def cmd_refresh_features(args):
+    """
+    Run churn.refresh_customer_features() and report rows written.
+    Returns 0 on success, 1 on failure.
+    """
+    try:
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT churn.refresh_customer_features(%s);", (args.full,))
+                (n,) = cur.fetchone()
+                cur.execute(
+                    "SELECT watermark FROM churn.refresh_state "
+                    "WHERE table_name = 'customer_features';"
+                )
+                (watermark,) = cur.fetchone()
+            conn.commit()
+    except Exception as e:
+        print(f"[features] refresh: FAIL -> {e}")
+        return 1
+    kind = "full" if args.full else "incremental"
+    print(f"[features] {kind} refresh: {n} rows written (watermark {watermark})")
+    return 0
+
+
+def cmd_score(args):
+    """
+    Score customers with a saved model and write churn.predictions.
+    Returns 0 on success, 1 on failure.
+    """
+    # Imported here: scoring pulls in pandas/sklearn, health checks should not
+    from src.pipelines import score
+
+    try:
+        stats = score.score(
+            model_dir=args.model_dir,
+            input_path=args.input,
+            id_column=args.id_column,
+            snapshot_date=args.snapshot_date,
+            model_version=args.model_version,
+            batch_rows=args.batch_rows,
+            active_only=args.active_only,
+        )
+    except Exception as e:
+        print(f"[score] FAIL -> {e}")
+        return 1
+    phases = ", ".join(f"{k} {v:.2f}s" for k, v in stats["phases"].items())
+    print(
+        f"[score] {stats['rows']} rows -> churn.predictions "
+        f"(model {stats['model_version']}, snapshot {stats['snapshot_date']}) "
+        f"in {stats['wall_seconds']:.2f}s = {stats['rows_per_sec']:,.0f} rows/s"
+    )
+    print(f"[score] predicted churn: {stats['predicted_churn']}; {phases}")
+    if stats["unmatched"]:
+        print(f"[score] skipped {stats['unmatched']} rows with unknown external_id")
+    if args.stats_json:
+        with open(args.stats_json, "w") as f:
+            json.dump(stats, f, indent=2)
+    return 0
+
+
+def cmd_build_training_sets(args):
+    """
+    Build or refresh the per-snapshot training parquet files.
+    Returns 0 on success, 1 on failure.
+    """
+    from src.pipelines import training_sets
+
+    try:
+        stats = training_sets.build_training_sets(
+            args.out_dir,
+            label_dates=args.label_date,
+            target=args.target,
+            force=args.force,
+        )
+    except Exception as e:
+        print(f"[training-sets] FAIL -> {e}")
+        return 1
+    phases = ", ".join(f"{k} {v:.2f}s" for k, v in stats["phases"].items())
+    print(
+        f"[training-sets] built {len(stats['built'])} snapshots "
+        f"({stats['rows']} rows), {len(stats['unchanged'])} unchanged, "
+        f"{len(stats['removed'])} removed in {stats['wall_seconds']:.2f}s; {phases}"
+    )
+    if stats["dropped_labels"]:
+        print(
+            f"[training-sets] dropped {stats['dropped_labels']} labels "
+            "with no customer history by their label_date"
+        )
+    return 0
+
+
+def cmd_serve(args):
+    """
+    Serve POST /score until interrupted, then print the latency summary.
+    Returns 0 on clean shutdown, 1 if the model cannot be loaded.
+    """
+    from src import serve
+
+    try:
+        server, batcher, latency = serve.build_server(
+            args.model_dir,
+            host=args.host,
+            port=args.port,
+            engine=args.engine,
+            max_batch=args.max_batch,
+            max_wait_ms=args.max_wait_ms,
+        )
+    except Exception as e:
+        print(f"[serve] FAIL -> {e}")
+        return 1
+
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _stop)  # docker stop -> same clean shutdown
+    host, port = server.server_address[:2]
+    print(f"[serve] {args.engine} engine on http://{host}:{port} (POST /score)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"[serve] {latency.summary()}")
+    return 0
+
+
 def main():
     """Argument parser scaffold; easy to extend with new subcommands later."""
     p = argparse.ArgumentParser(
@@ -56,6 +197,99 @@ def main():
     h = sub.add_parser("health", help="Check env + DB connectivity")
     h.set_defaults(func=cmd_health)
 
+    # `refresh-features` subcommand
+    r = sub.add_parser(
+        "refresh-features", help="Refresh churn.customer_features from customers"
+    )
+    r.add_argument(
+        "--full", action="store_true", help="Rebuild every row, not just changes"
+    )
+    r.set_defaults(func=cmd_refresh_features)
+
+    # `score` subcommand
+    s = sub.add_parser("score", help="Score customers into churn.predictions")
+    s.add_argument(
+        "--model-dir",
+        required=True,
+        help="train_baseline artifact dir (model.pkl + params.json)",
+    )
+    s.add_argument(
+        "--input",
+        default=None,
+        help="Features parquet to score instead of churn.customers",
+    )
+    s.add_argument(
+        "--id-column",
+        choices=["customer_id", "external_id"],
+        default="customer_id",
+        help="Key column of --input (external_id is resolved via churn.customers)",
+    )
+    s.add_argument(
+        "--snapshot-date",
+        type=dt.date.fromisoformat,
+        default=None,
+        help="YYYY-MM-DD stored with each score (default: today)",
+    )
+    s.add_argument(
+        "--model-version",
+        default=None,
+        help="Default: <model dir name>-<model.pkl hash prefix>",
+    )
+    s.add_argument("--batch-rows", type=int, default=50_000, help="Rows per batch")
+    s.add_argument(
+        "--active-only", action="store_true", help="Skip customers with is_active false"
+    )
+    s.add_argument("--stats-json", default=None, help="Write run stats to this file")
+    s.set_defaults(func=cmd_score)
+
+    # `build-training-sets` subcommand
+    b = sub.add_parser(
+        "build-training-sets",
+        help="Point-in-time training parquet per label snapshot",
+    )
+    b.add_argument(
+        "--out-dir",
+        default="data/processed/training_sets",
+        help="Output directory (label_date=YYYY-MM-DD/part-0.parquet + _manifest.json)",
+    )
+    b.add_argument(
+        "--label-date",
+        action="append",
+        default=None,
+        help="Only this snapshot (repeatable). Default: every label_date",
+    )
+    b.add_argument("--target", default="churned", help="Target column name")
+    b.add_argument(
+        "--force", action="store_true", help="Rebuild even unchanged snapshots"
+    )
+    b.set_defaults(func=cmd_build_training_sets)
+
+    # `serve` subcommand
+    v = sub.add_parser("serve", help="HTTP scoring service for a saved model")
+    v.add_argument(
+        "--model-dir",
+        required=True,
+        help="train_baseline artifact dir (model.pkl + params.json)",
+    )
+    v.add_argument("--host", default="0.0.0.0", help="Bind address")
+    v.add_argument("--port", type=int, default=8000, help="Port (default 8000)")
+    v.add_argument(
+        "--engine",
+        choices=["fast", "pipeline"],
+        default="fast",
+        help="fast = compiled NumPy scorer; pipeline = sklearn predict_proba",
+    )
+    v.add_argument(
+        "--max-batch", type=int, default=64, help="Rows per micro-batch (default 64)"
+    )
+    v.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=2.0,
+        help="Max wait to batch concurrent requests (default 2 ms)",
+    )
+    v.set_defaults(func=cmd_serve)
+
     args = p.parse_args()
     # Call the selected subcommand and exit with its return code
     sys.exit(args.func(args))
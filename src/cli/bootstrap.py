@@ -0,0 +1,122 @@
+"""
+Bootstrap confidence intervals for the held-out metrics of one run.
+
+Rather than refitting (the Monte-Carlo loop) or calling sklearn metrics once
+per resample, every resample is drawn at once as a (resamples x n) index
+matrix and turned into per-row counts with one bincount. Each metric is then
+a product of that count matrix with a fixed vector:
+
+- confusion counts: counts @ (y & pred), counts @ (~y & pred), ...
+  -> accuracy, precision, recall, F1 (zero_division=0, as in fit_prepared)
+- ROC-AUC: rows are sorted by score once and grouped into tied scores;
+  per resample, AUC = sum over groups of pos_g * (neg below g + neg_g / 2)
+  / (P * N), i.e. the Mann-Whitney statistic with ties counted as half
+
+Resamples are processed in chunks of CHUNK_CELLS index cells, so memory
+stays at a few times 32 MB whatever the test-set size. Intervals are
+percentile intervals; a resample with no positives (or no negatives) has no
+ROC-AUC and is left out of its interval.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+METRICS = ("accuracy", "precision", "recall", "f1", "roc_auc")
+CHUNK_CELLS = 1 << 22  # index-matrix cells per chunk (int64 -> 32 MB)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    # zero_division=0
+    return np.divide(num, den, out=np.zeros(len(num)), where=den > 0)
+
+
+def resample_metrics(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    y_proba: Optional[np.ndarray],
+    idx: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Metric values for each row of the index matrix idx (resamples x n)."""
+    y = np.asarray(y_true).astype(bool)
+    pred = np.asarray(y_pred).astype(bool)
+    n_boot, n = idx.shape
+    offsets = (np.arange(n_boot) * n)[:, None]
+    counts = np.bincount((idx + offsets).ravel(), minlength=n_boot * n)
+    counts = counts.reshape(n_boot, n).astype(np.float64)
+
+    tp = counts @ (y & pred)
+    fp = counts @ (~y & pred)
+    fn = counts @ (y & ~pred)
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    out = {
+        "accuracy": (counts @ (y == pred)) / n,
+        "precision": precision,
+        "recall": recall,
+        "f1": _ratio(2 * tp, 2 * tp + fp + fn),
+    }
+
+    if y_proba is None:
+        out["roc_auc"] = np.full(n_boot, np.nan)
+        return out
+    order = np.argsort(y_proba, kind="stable")
+    scores, y_sorted = np.asarray(y_proba)[order], y[order]
+    starts = np.flatnonzero(np.r_[True, scores[1:] != scores[:-1]])
+    sorted_counts = counts[:, order]
+    pos = np.add.reduceat(sorted_counts * y_sorted, starts, axis=1)
+    neg = np.add.reduceat(sorted_counts * ~y_sorted, starts, axis=1)
+    neg_below = np.cumsum(neg, axis=1) - neg
+    n_pos, n_neg = pos.sum(axis=1), neg.sum(axis=1)
+    auc = (pos * (neg_below + 0.5 * neg)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["roc_auc"] = np.where(
+            (n_pos > 0) & (n_neg > 0), auc / (n_pos * n_neg), np.nan
+        )
+    return out
+
+
+def bootstrap_intervals(
+    y_true,
+    y_pred,
+    y_proba=None,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> dict:
+    """
+    Percentile intervals for METRICS over `resamples` bootstrap resamples of
+    the test rows; the dict goes under metrics.json["bootstrap"].
+    """
+    y_true = np.asarray(y_true)
+    n = len(y_true)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, CHUNK_CELLS // max(n, 1))
+    values = {m: [] for m in METRICS}
+    for start in range(0, resamples, chunk):
+        idx = rng.integers(0, n, size=(min(chunk, resamples - start), n))
+        for m, v in resample_metrics(y_true, y_pred, y_proba, idx).items():
+            values[m].append(v)
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for m in METRICS:
+        v = np.concatenate(values[m])
+        v = v[~np.isnan(v)]
+        if not len(v):
+            intervals[m] = None
+            continue
+        low, high = np.percentile(v, [tail, 100 - tail])
+        intervals[m] = {
+            "low": float(low),
+            "high": float(high),
+            "std": float(v.std(ddof=1)) if len(v) > 1 else 0.0,
+        }
+    return {
+        "resamples": resamples,
+        "confidence": confidence,
+        "seed": seed,
+        "intervals": intervals,
+    }
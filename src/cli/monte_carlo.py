@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Monte-Carlo runner for the baseline: many seeds in one process pool.
+
+- Reads the features parquet once and writes each column to a .npy file
+  (under /dev/shm when available); workers memory-map them read-only, so the
+  data is shared between processes instead of pickled per task
+- Each seed runs the same sample -> split -> fit -> score as
+  train_baseline.train_and_save, so metrics match the single-run CLI
+- Registers every finished run in <outbase>/runs.sqlite (or --registry;
+  src/cli/run_registry.py): metrics, params, timings and the run_<seed>/
+  path, indexed for top-k by metric (scripts/mc_best.py promotes from it)
+- Also appends one row per seed to <outbase>/metrics.csv as runs finish
+  (columns: seed,n,accuracy,precision,recall,f1,roc_auc)
+- Per-stage timings (src/cli/timings.py) of every seed go to
+  <outbase>/timings.csv (one row per seed and stage), and the mean wall time
+  per stage is printed at the end; each run dir also gets timings.json
+
+Usage:
+  python -m src.cli.monte_carlo \
+    --input data/processed/features.parquet \
+    --target churned \
+    --iters 20 --sample 100 \
+    --outbase artifacts/mc_baseline \
+    [--jobs 8] [--artifacts light|full|none] [--registry runs.sqlite]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from src.cli.preprocess_cache import PreprocessCache, file_digest
+from src.cli.run_registry import RunRegistry, sweep_key, sweep_params
+from src.cli.sampling import sample_positions
+from src.cli.timings import StageTimer
+from src.cli.train_baseline import (
+    cached_prepare,
+    fit_and_evaluate,
+    fit_prepared,
+    save_artifacts,
+)
+
+METRIC_FIELDS = ["accuracy", "precision", "recall", "f1", "roc_auc"]
+CSV_HEADER = ["seed", "n"] + METRIC_FIELDS
+TIMING_FIELDS = [
+    "seed",
+    "stage",
+    "wall_s",
+    "cpu_s",
+    "child_cpu_s",
+    "peak_rss_mb",
+    "peak_rss_delta_mb",
+]
+
+# Filled in each worker by _init_worker: {"spec": ..., "arrays": {...}}
+_SHARED: dict = {}
+
+
+def export_frame(df: pd.DataFrame, workdir: Path) -> dict:
+    """
+    Write df column by column as .npy files for memory-mapping.
+
+    Numeric columns keep their dtype; every other column is stored as int32
+    codes plus its (small) list of distinct values and the exact missing value
+    it used (None vs NaN matters to SimpleImputer). Returns the spec that
+    import_frame() needs.
+    """
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        file = f"col_{i}.npy"
+        if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+            np.save(workdir / file, col.to_numpy())
+            columns.append({"name": name, "file": file, "values": None})
+        else:
+            codes, uniques = pd.factorize(col, use_na_sentinel=True)
+            missing = col[col.isna()]
+            np.save(workdir / file, codes.astype(np.int32))
+            columns.append(
+                {
+                    "name": name,
+                    "file": file,
+                    "values": list(uniques),
+                    "missing": missing.iloc[0] if len(missing) else None,
+                }
+            )
+    return {"n_rows": len(df), "columns": columns}
+
+
+def import_frame(spec: dict, arrays: dict, rows: Optional[np.ndarray]) -> pd.DataFrame:
+    """Rebuild the frame (or just `rows`, in that order) from mapped columns."""
+    data = {}
+    for c in spec["columns"]:
+        arr = arrays[c["name"]]
+        arr = np.asarray(arr) if rows is None else arr[rows]
+        if c["values"] is None:
+            data[c["name"]] = arr
+        else:
+            values = np.array(c["values"] + [c["missing"]], dtype=object)
+            data[c["name"]] = values[arr]  # code -1 picks the missing value
+    return pd.DataFrame(data)
+
+
+def sample_rows(n_rows: int, sample_n: Optional[int], seed: int, labels=None):
+    """
+    Row positions train_baseline._maybe_sample keeps for this seed (both go
+    through sampling.sample_positions), or None for all rows.
+    """
+    return sample_positions(n_rows, sample_n, seed, labels)
+
+
+def _init_worker(workdir: str, spec: dict):
+    # One BLAS thread per process; the pool provides the parallelism
+    _SHARED["limits"] = threadpool_limits(limits=1)
+    _SHARED["spec"] = spec
+    _SHARED["arrays"] = {
+        c["name"]: np.load(Path(workdir) / c["file"], mmap_mode="r")
+        for c in spec["columns"]
+    }
+
+
+def _run_seed(seed: int, cfg: dict) -> dict:
+    spec = _SHARED["spec"]
+    timer = StageTimer()
+    labels = None
+    if cfg["stratified_sample"]:
+        target = [c for c in spec["columns"] if c["name"] == cfg["target"]]
+        frame = import_frame({"columns": target}, _SHARED["arrays"], None)
+        labels = frame[cfg["target"]].to_numpy()
+    rows = sample_rows(spec["n_rows"], cfg["sample_n"], seed, labels)
+    if cfg["cache_dir"]:
+        # The frame is already sampled; sample_n only goes into the cache key
+        # (prepare() leaves a frame of sample_n rows as it is)
+        with timer.stage("prepare_cached"):
+            prepared, info = cached_prepare(
+                PreprocessCache(cfg["cache_dir"], cfg["cache_max_mb"] * 2**20),
+                cfg["data_digest"],
+                lambda: import_frame(spec, _SHARED["arrays"], rows),
+                cfg["target"],
+                cfg["test_size"],
+                seed,
+                cfg["sample_n"],
+                cfg["use_sparse"],
+                cfg["stratified_sample"],
+            )
+        result = fit_prepared(prepared, seed, cfg["use_sparse"], timer=timer)
+        result["params"] = {"preprocess_cache": info}
+    else:
+        with timer.stage("read"):
+            df = import_frame(spec, _SHARED["arrays"], rows)
+        result = fit_and_evaluate(
+            df,
+            cfg["target"],
+            cfg["test_size"],
+            seed,
+            use_sparse=cfg["use_sparse"],
+            timer=timer,
+        )
+    if cfg["sample_n"] is not None:
+        # as train_and_save records it; mc_append_metrics keys sweeps on it
+        result.setdefault("params", {})["sample"] = {
+            "n": cfg["sample_n"],
+            "stratified": cfg["stratified_sample"],
+        }
+    if cfg["artifacts"] != "none":
+        outdir = Path(cfg["outbase"]) / f"run_{seed}"
+        save_artifacts(
+            result,
+            str(outdir),
+            cfg["input_path"],
+            cfg["target"],
+            cfg["test_size"],
+            seed,
+            plots=cfg["artifacts"] == "full",
+            timer=timer,
+        )
+        timer.write(outdir / "timings.json")
+    n = cfg["sample_n"] if cfg["sample_n"] is not None else spec["n_rows"]
+    return {"seed": seed, "n": n, **result["metrics"], "timings": timer.stages}
+
+
+def _shm_dir(nbytes: int) -> Optional[str]:
+    """/dev/shm if it can hold nbytes (Docker defaults it to 64 MB), else None."""
+    shm = Path("/dev/shm")
+    if not (shm.is_dir() and os.access(shm, os.W_OK)):
+        return None
+    return str(shm) if shutil.disk_usage(shm).free > 2 * nbytes else None
+
+
+def run_monte_carlo(
+    input_path: str,
+    target: str,
+    seeds: list[int],
+    outbase: str,
+    sample_n: Optional[int] = None,
+    stratified_sample: bool = False,
+    test_size: float = 0.2,
+    jobs: Optional[int] = None,
+    artifacts: str = "light",
+    use_sparse: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_mb: int = 2048,
+    registry: Optional[str] = None,
+) -> int:
+    """Run every seed; returns the number of failed seeds."""
+    df = pd.read_parquet(input_path)
+    if target not in df.columns:
+        raise ValueError(f"Target column '{target}' not in dataset.")
+    out = Path(outbase)
+    out.mkdir(parents=True, exist_ok=True)
+    data_digest = file_digest(input_path)
+    cfg = {
+        "input_path": input_path,
+        "target": target,
+        "test_size": test_size,
+        "sample_n": sample_n,
+        "stratified_sample": stratified_sample,
+        "outbase": outbase,
+        "artifacts": artifacts,
+        "use_sparse": use_sparse,
+        "cache_dir": cache_dir,
+        "cache_max_mb": cache_max_mb,
+        "data_digest": data_digest if cache_dir else None,
+    }
+
+    # Identifies the sweep in the registry: a re-run with another input or
+    # split settings does not replace these runs
+    run_params = sweep_params(
+        input_path,
+        data_digest,
+        target,
+        test_size,
+        sample_n,
+        stratified_sample,
+        use_sparse,
+    )
+
+    failed = 0
+    wall = defaultdict(list)  # stage -> wall_s of each run
+    t0 = time.perf_counter()
+    shm = _shm_dir(int(df.memory_usage(deep=False).sum()))
+    with tempfile.TemporaryDirectory(prefix="churn-mc-", dir=shm) as workdir:
+        spec = export_frame(df, Path(workdir))
+        del df
+        with (
+            open(out / "metrics.csv", "w", newline="") as f,
+            open(out / "timings.csv", "w", newline="") as tf,
+            RunRegistry(registry or out / "runs.sqlite") as runs,
+            ProcessPoolExecutor(
+                max_workers=jobs or os.cpu_count(),
+                initializer=_init_worker,
+                initargs=(workdir, spec),
+            ) as pool,
+        ):
+            # Nested metrics (resources) stay in each run's metrics.json
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADER, extrasaction="ignore")
+            writer.writeheader()
+            timing_writer = csv.DictWriter(tf, fieldnames=TIMING_FIELDS)
+            timing_writer.writeheader()
+            futures = {pool.submit(_run_seed, seed, cfg): seed for seed in seeds}
+            for fut in as_completed(futures):
+                try:
+                    row = fut.result()
+                except ValueError as e:
+                    failed += 1
+                    print(f"seed {futures[fut]}: {e}", file=sys.stderr)
+                    continue
+                writer.writerow(row)
+                f.flush()  # rows are readable while the run is in progress
+                runs.register(
+                    row["seed"],
+                    {k: v for k, v in row.items() if k not in ("seed", "n", "timings")},
+                    n=row["n"],
+                    run_dir=(
+                        str(out / f"run_{row['seed']}") if artifacts != "none" else None
+                    ),
+                    params=run_params,
+                    timings=row["timings"],
+                )
+                for stage in row["timings"]:
+                    timing_writer.writerow({"seed": row["seed"], **stage})
+                    wall[stage["stage"]].append(stage["wall_s"])
+
+    seconds = time.perf_counter() - t0
+    done = len(seeds) - failed
+    print(
+        f"Monte-Carlo: {done}/{len(seeds)} runs in {seconds:.1f}s "
+        f"({done / seconds:.1f} runs/s) -> {out / 'metrics.csv'}, "
+        f"registry sweep {sweep_key(run_params)}"
+    )
+    if wall:
+        print("Mean wall time per stage (s):")
+        for stage, values in sorted(wall.items(), key=lambda kv: -sum(kv[1])):
+            print(f"  {stage:<22} {np.mean(values):8.4f}")
+    return failed
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Run the baseline over many seeds in a process pool."
+    )
+    p.add_argument(
+        "--input",
+        required=True,
+        help="Path to processed features parquet (includes target column).",
+    )
+    p.add_argument("--target", required=True, help="Target column name (binary 0/1).")
+    p.add_argument("--iters", type=int, default=20, help="Number of seeds. Default: 20")
+    p.add_argument("--first-seed", type=int, default=1, help="First seed. Default: 1")
+    p.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        help="Optional per-run row cap (seeded like train_baseline --sample).",
+    )
+    p.add_argument(
+        "--stratified-sample",
+        action="store_true",
+        help="Keep the target's class proportions in each --sample.",
+    )
+    p.add_argument(
+        "--test-size", type=float, default=0.2, help="Test split size. Default: 0.2"
+    )
+    p.add_argument(
+        "--outbase",
+        default="artifacts/mc_baseline",
+        help="Writes metrics.csv and run_<seed>/ here.",
+    )
+    p.add_argument(
+        "--jobs", type=int, default=None, help="Worker processes. Default: all CPUs"
+    )
+    p.add_argument(
+        "--artifacts",
+        choices=["light", "full", "none"],
+        default="light",
+        help="Per-run artifacts: light = all but PNG plots (default), "
+        "full = same as train_baseline, none = metrics.csv only.",
+    )
+    p.add_argument(
+        "--sparse",
+        action="store_true",
+        help="Train each run on a CSR design matrix (see train_baseline --sparse).",
+    )
+    p.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Preprocessing cache shared by the runs (see train_baseline).",
+    )
+    p.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=2048,
+        help="Cache size bound for LRU eviction. Default: 2048",
+    )
+    p.add_argument(
+        "--registry",
+        default=None,
+        help="Run registry (SQLite) to record runs in. Default: <outbase>/runs.sqlite",
+    )
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    seeds = list(range(args.first_seed, args.first_seed + args.iters))
+    failed = run_monte_carlo(
+        input_path=args.input,
+        target=args.target,
+        seeds=seeds,
+        outbase=args.outbase,
+        sample_n=args.sample,
+        stratified_sample=args.stratified_sample,
+        test_size=args.test_size,
+        jobs=args.jobs,
+        artifacts=args.artifacts,
+        use_sparse=args.sparse,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        registry=args.registry,
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
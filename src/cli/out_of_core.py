@@ -0,0 +1,292 @@
+"""
+Out-of-core variant of train_baseline.fit_and_evaluate.
+
+Streams the features parquet in record batches (row group by row group), so
+memory is bounded by --batch-rows instead of the dataset size:
+
+1. Pass 1 over the training rows: category vocabularies and counts per
+   categorical column, plus a fixed-size uniform reservoir of rows that the
+   numeric imputer (median) and scaler are fitted on
+2. --epochs passes of averaged SGDClassifier(loss="log_loss").partial_fit,
+   one batch at a time, on CSR batches from the fitted preprocessor
+3. One pass over the held-out rows to score them
+
+The train/test split is a hash of the row position and the seed, so every
+pass sees the same split without keeping row ids around. Nulls in
+categorical columns are imputed with the most frequent value.
+
+The returned dict has the same keys as fit_and_evaluate(), so
+save_artifacts() writes the usual model.pkl / metrics.json / coefficients.csv
+and plots.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import (
+    accuracy_score,
+    precision_score,
+    recall_score,
+    f1_score,
+    roc_auc_score,
+)
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.cli.timings import peak_rss_mb
+from src.cli.train_baseline import design_matrix_stats
+
+RESERVOIR_ROWS = 100_000
+
+
+def _column_types(schema: pa.Schema, target: str) -> tuple[list[str], list[str]]:
+    # Same split as train_baseline._infer_column_types (bools are categorical)
+    numeric, categorical = [], []
+    for field in schema:
+        if field.name == target:
+            continue
+        t = field.type
+        if pa.types.is_integer(t) or pa.types.is_floating(t):
+            numeric.append(field.name)
+        else:
+            categorical.append(field.name)
+    return numeric, categorical
+
+
+def held_out_mask(row_ids: np.ndarray, test_size: float, seed: int) -> np.ndarray:
+    """
+    True for rows in the held-out split: splitmix64(row_id ^ seed) mapped to
+    [0, 1) and compared with test_size. Independent of batch boundaries.
+    """
+    z = row_ids.astype(np.uint64) ^ np.uint64(seed & 0xFFFFFFFFFFFFFFFF)
+    z = z + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+def _batches(
+    path: str,
+    columns: list[str],
+    batch_rows: int,
+    test_size: float,
+    seed: int,
+    test: bool,
+) -> Iterator[pd.DataFrame]:
+    """Yield the train (or test) rows of each record batch as a frame."""
+    start = 0
+    for batch in pq.ParquetFile(path).iter_batches(
+        batch_size=batch_rows, columns=columns
+    ):
+        n = batch.num_rows
+        mask = held_out_mask(np.arange(start, start + n), test_size, seed)
+        start += n
+        if not test:
+            mask = ~mask
+        if mask.any():
+            yield batch.filter(pa.array(mask)).to_pandas()
+
+
+def _categorical_frame(df: pd.DataFrame, categorical_cols: list[str]) -> pd.DataFrame:
+    # One missing marker for the imputer, whatever the column's dtype was
+    for c in categorical_cols:
+        df[c] = df[c].astype(object).where(df[c].notna(), np.nan)
+    return df
+
+
+def _reservoir_add(
+    reservoir: dict,
+    seen: int,
+    df: pd.DataFrame,
+    size: int,
+    rng: np.random.Generator,
+) -> None:
+    """Algorithm R over a whole batch: each row seen so far is kept with p=size/seen."""
+    n = len(df)
+    slots = np.arange(seen, seen + n)
+    fill = slots < size
+    draws = rng.integers(0, slots + 1)
+    slots = np.where(fill, slots, draws)
+    keep = slots < size
+    for c in df.columns:
+        if c not in reservoir:
+            reservoir[c] = np.empty(size, dtype=object)
+        # later rows win on repeated slots, as in the sequential algorithm
+        reservoir[c][slots[keep]] = df[c].to_numpy(dtype=object)[keep]
+
+
+def _build_preprocessor(
+    numeric_cols: list[str],
+    categorical_cols: list[str],
+    vocab: dict[str, pd.Series],
+) -> ColumnTransformer:
+    categorical = []
+    for c in categorical_cols:
+        counts = vocab[c]
+        mode = counts.idxmax() if len(counts) else "missing"
+        categorical.append(
+            (
+                c,
+                Pipeline(
+                    steps=[
+                        (
+                            "imputer",
+                            SimpleImputer(strategy="constant", fill_value=mode),
+                        ),
+                        (
+                            "onehot",
+                            OneHotEncoder(
+                                categories=[sorted(counts.index, key=str)],
+                                handle_unknown="ignore",
+                            ),
+                        ),
+                    ]
+                ),
+                [c],
+            )
+        )
+    numeric = Pipeline(
+        steps=[
+            ("imputer", SimpleImputer(strategy="median")),
+            # SGD needs standardised inputs to converge
+            ("scaler", StandardScaler()),
+        ]
+    )
+    return ColumnTransformer(
+        transformers=[("num", numeric, numeric_cols)] + categorical,
+        remainder="drop",
+        sparse_threshold=1.0,
+        verbose_feature_names_out=False,
+    )
+
+
+def fit_out_of_core(
+    input_path: str,
+    target: str,
+    test_size: float,
+    random_state: int,
+    batch_rows: int = 65_536,
+    epochs: int = 5,
+) -> dict:
+    """Streamed equivalent of fit_and_evaluate(); see the module docstring."""
+    schema = pq.read_schema(input_path)
+    if target not in schema.names:
+        raise ValueError(f"Target column '{target}' not in dataset.")
+    numeric_cols, categorical_cols = _column_types(schema, target)
+    columns = numeric_cols + categorical_cols + [target]
+
+    def batches(test: bool):
+        for df in _batches(
+            input_path, columns, batch_rows, test_size, random_state, test
+        ):
+            yield _categorical_frame(df, categorical_cols)
+
+    # Pass 1: vocabularies + reservoir for the numeric statistics
+    rng = np.random.default_rng(random_state)
+    vocab = {c: pd.Series(dtype=np.int64) for c in categorical_cols}
+    reservoir: dict = {}
+    n_train = 0
+    for df in batches(test=False):
+        for c in categorical_cols:
+            vocab[c] = vocab[c].add(df[c].value_counts(), fill_value=0)
+        _reservoir_add(reservoir, n_train, df[numeric_cols], RESERVOIR_ROWS, rng)
+        n_train += len(df)
+    if n_train < 2:
+        raise ValueError(f"Too few training rows: {n_train}.")
+
+    kept = min(n_train, RESERVOIR_ROWS)
+    # explicit index: with no numeric columns the frame still has `kept` rows
+    sample = pd.DataFrame(
+        {c: pd.to_numeric(reservoir[c][:kept]) for c in numeric_cols},
+        index=range(kept),
+        columns=numeric_cols,
+    )
+    for c in categorical_cols:
+        # categories are fixed and the imputer fill is constant: nothing to learn
+        sample[c] = pd.Series(np.nan, index=sample.index, dtype=object)
+    prep = _build_preprocessor(numeric_cols, categorical_cols, vocab)
+    prep.fit(sample)
+
+    # Pass 2: incremental fit
+    # Averaged SGD: the running mean of the weights is far less noisy than the
+    # last iterate after a few passes
+    clf = SGDClassifier(loss="log_loss", average=True, random_state=random_state)
+    nnz = 0
+    batch_mb = 0.0
+    for epoch in range(epochs):
+        for df in batches(test=False):
+            Xt = prep.transform(df)
+            clf.partial_fit(Xt, df[target].astype(int), classes=[0, 1])
+            if epoch == 0:
+                stats = design_matrix_stats(Xt)
+                nnz += stats["nnz"]
+                batch_mb = max(batch_mb, stats["mb"])
+    pipe = Pipeline(steps=[("prep", prep), ("clf", clf)])
+
+    # Pass 3: score the held-out rows
+    y_parts, proba_parts = [], []
+    for df in batches(test=True):
+        y_parts.append(df[target].astype(int).to_numpy())
+        proba_parts.append(pipe.predict_proba(df)[:, 1])
+    if not y_parts:
+        raise ValueError(
+            f"No rows fell in the test split; increase --test-size "
+            f"(current={test_size})."
+        )
+    y_test = pd.Series(np.concatenate(y_parts), name=target)
+    y_proba = np.concatenate(proba_parts)
+    y_pred = (y_proba >= 0.5).astype(int)
+
+    metrics = {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "precision": float(precision_score(y_test, y_pred, zero_division=0)),
+        "recall": float(recall_score(y_test, y_pred, zero_division=0)),
+        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
+        "roc_auc": (
+            float(roc_auc_score(y_test, y_proba)) if y_test.nunique() > 1 else None
+        ),
+    }
+    if metrics["roc_auc"] is None:
+        y_proba = None
+    metrics["resources"] = {
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "design_matrix": {
+            "format": "csr",
+            "shape": [n_train, len(prep.get_feature_names_out())],
+            "nnz": nnz,
+            "batch_mb": batch_mb,
+        },
+    }
+
+    return {
+        "pipe": pipe,
+        "metrics": metrics,
+        "numeric_cols": numeric_cols,
+        "categorical_cols": categorical_cols,
+        "use_sparse": True,
+        "params": {
+            "model": "SGDClassifier",
+            "solver": "sgd",
+            "loss": "log_loss",
+            "average": True,
+            "out_of_core": {
+                "batch_rows": batch_rows,
+                "epochs": epochs,
+                "train_rows": n_train,
+                "test_rows": len(y_test),
+                "reservoir_rows": kept,
+            },
+        },
+        "y_test": y_test,
+        "y_pred": y_pred,
+        "y_proba": y_proba,
+    }
@@ -0,0 +1,164 @@
+"""
+Content-addressed cache of encoded design matrices for train_baseline.
+
+An entry holds everything a run needs after preprocessing: the fitted
+ColumnTransformer, the encoded train/test matrices and their labels, and the
+column lists. The key is a hash of the input file's fingerprint (file_digest:
+path, size, mtime and the parquet footer, read without touching the data)
+and the run spec (target, split size and seed, sample cap, dense/sparse), so a
+re-run over an unchanged parquet goes straight to fitting the classifier
+without reading it.
+
+Layout: <root>/<key>/
+- meta.json     column lists, matrix formats/shapes, entry size; its mtime is
+                the entry's last use (LRU order)
+- prep.pkl      fitted preprocessor (joblib)
+- *.npy         X_train / X_test (dense, or CSR data/indices/indptr),
+                loaded with mmap_mode="r"; y_train / y_test
+
+Entries are written to a temp dir and renamed into place, so concurrent
+writers (Monte-Carlo workers) never expose a half-written entry. After each
+put, least recently used entries are removed until the cache fits max_bytes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+
+# Bump when the preprocessing in train_baseline._build_pipeline changes
+CACHE_VERSION = 1
+MATRICES = ("X_train", "X_test")
+
+
+def file_digest(path: str) -> str:
+    """
+    blake2b of the file's resolved path, size and mtime_ns and, for a parquet
+    file, its footer (schema, row group offsets and column statistics). Two
+    small reads whatever the file size; rewriting the file changes it.
+    """
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{os.path.realpath(path)}\0{st.st_size}\0{st.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        if st.st_size >= 12:
+            f.seek(-8, os.SEEK_END)
+            tail = f.read(8)
+            # footer: <metadata> <4-byte little-endian length> "PAR1"
+            footer_len = int.from_bytes(tail[:4], "little")
+            if tail[4:] == b"PAR1" and footer_len + 8 <= st.st_size:
+                f.seek(-8 - footer_len, os.SEEK_END)
+                h.update(f.read(footer_len))
+    return h.hexdigest()
+
+
+class PreprocessCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(data_digest: str, **spec) -> str:
+        payload = json.dumps([CACHE_VERSION, data_digest, spec], sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """The prepared run stored under key (arrays memory-mapped), or None."""
+        entry = self.root / key
+        try:
+            meta = json.loads((entry / "meta.json").read_text())
+            prepared = {
+                "prep": joblib.load(entry / "prep.pkl"),
+                "numeric_cols": meta["numeric_cols"],
+                "categorical_cols": meta["categorical_cols"],
+            }
+            for name in MATRICES:
+                prepared[name] = load_matrix(entry, name, meta["matrices"][name])
+            for name in ("y_train", "y_test"):
+                # Labels are small, and sklearn wants them writeable
+                y = np.load(entry / f"{name}.npy")
+                prepared[name] = pd.Series(y, name=meta["target"])
+            os.utime(entry / "meta.json")  # mark as recently used
+        except FileNotFoundError:
+            # Never written, or evicted by another process mid-read
+            return None
+        return prepared
+
+    def put(self, key: str, prepared: dict, target: str) -> None:
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.root))
+        try:
+            joblib.dump(prepared["prep"], tmp / "prep.pkl")
+            matrices = {
+                name: save_matrix(tmp, name, prepared[name]) for name in MATRICES
+            }
+            for name in ("y_train", "y_test"):
+                np.save(tmp / f"{name}.npy", np.asarray(prepared[name]))
+            nbytes = sum(p.stat().st_size for p in tmp.iterdir())
+            meta = {
+                "target": target,
+                "numeric_cols": prepared["numeric_cols"],
+                "categorical_cols": prepared["categorical_cols"],
+                "matrices": matrices,
+                "nbytes": nbytes,
+            }
+            (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+            try:
+                tmp.rename(self.root / key)
+            except OSError:
+                pass  # another process stored the same key first
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> list[str]:
+        """Drop least recently used entries until the cache fits; returns their keys."""
+        entries = []
+        for entry in self.root.iterdir():
+            try:
+                meta_path = entry / "meta.json"
+                nbytes = json.loads(meta_path.read_text())["nbytes"]
+                entries.append((meta_path.stat().st_mtime, nbytes, entry))
+            except (FileNotFoundError, NotADirectoryError):
+                continue  # temp dirs being written, or already evicted
+        total = sum(nbytes for _, nbytes, _ in entries)
+        evicted = []
+        for _, nbytes, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= nbytes
+            evicted.append(entry.name)
+        return evicted
+
+
+def save_matrix(outdir: Path, name: str, X) -> dict:
+    """Write X as <name>.npy (dense) or <name>.{data,indices,indptr}.npy (CSR)."""
+    if sp.issparse(X):
+        X = X.tocsr()
+        for part in ("data", "indices", "indptr"):
+            np.save(outdir / f"{name}.{part}.npy", getattr(X, part))
+        return {"format": "csr", "shape": list(X.shape)}
+    np.save(outdir / f"{name}.npy", np.asarray(X))
+    return {"format": "dense", "shape": list(X.shape)}
+
+
+def load_matrix(entry: Path, name: str, info: dict):
+    """Memory-map a matrix written by save_matrix; info is what it returned."""
+    if info["format"] == "csr":
+        parts = [
+            np.load(entry / f"{name}.{part}.npy", mmap_mode="r")
+            for part in ("data", "indices", "indptr")
+        ]
+        return sp.csr_matrix(tuple(parts), shape=tuple(info["shape"]), copy=False)
+    return np.load(entry / f"{name}.npy", mmap_mode="r")
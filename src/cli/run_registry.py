@@ -0,0 +1,292 @@
+"""
+Run registry for Monte-Carlo (and any other) training runs: one SQLite file.
+
+- runs: sweep, seed, sample size, artifact directory, params and per-stage
+  timings (JSON), registration time. The sweep is a digest of the params
+  minus the seed (sweep_key), so runs of one experiment share it; one row
+  per (sweep, seed): re-registering a seed replaces it within its sweep,
+  while a sweep with other inputs or settings gets rows of its own
+- metrics: one row per (run, scalar metric), indexed by (name, value), so
+  top-k by any metric is an index range scan instead of a scan of every run
+- aliases: named pointers to a run ("best"), with the metric that chose it
+
+The database runs in WAL mode: readers never block the writer, and writers
+from several processes (monte_carlo's parent, scripts/mc_append_metrics.py
+per run) queue on the write lock for up to `timeout` seconds instead of
+failing. Every registration is one transaction.
+
+top() ranks within one sweep when given one, so the best run is never picked
+from a different experiment. promote() points an alias at a run and switches a symlink (e.g.
+artifacts/mc_baseline/best -> run_7) with an atomic rename, so readers see
+either the old or the new best run, never a half-copied directory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+  run_id     INTEGER PRIMARY KEY,
+  sweep      TEXT NOT NULL,
+  seed       INTEGER NOT NULL,
+  n          INTEGER,
+  run_dir    TEXT,
+  params     TEXT,
+  timings    TEXT,
+  created_at REAL NOT NULL,
+  UNIQUE (sweep, seed)
+);
+CREATE INDEX IF NOT EXISTS runs_by_created ON runs (created_at);
+CREATE TABLE IF NOT EXISTS metrics (
+  run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+  name   TEXT NOT NULL,
+  value  REAL,
+  PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS metrics_by_value ON metrics (name, value);
+CREATE TABLE IF NOT EXISTS aliases (
+  alias       TEXT PRIMARY KEY,
+  run_id      INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+  metric      TEXT,
+  value       REAL,
+  promoted_at REAL NOT NULL
+);
+"""
+
+
+# Params that differ between the runs of one sweep
+SEED_KEYS = ("seed", "random_state")
+
+
+def sweep_key(params: Optional[dict]) -> str:
+    """Digest of the run params without the seed: equal for runs of one sweep."""
+    spec = {k: v for k, v in (params or {}).items() if k not in SEED_KEYS}
+    blob = json.dumps(spec, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def sweep_params(
+    input_path,
+    data_digest: Optional[str],
+    target: str,
+    test_size: float,
+    sample_n: Optional[int] = None,
+    stratified_sample: bool = False,
+    use_sparse: bool = False,
+) -> dict:
+    """
+    The run params that identify a Monte-Carlo sweep (see sweep_key), shared
+    by monte_carlo and scripts/mc_append_metrics.py. Per-seed details of a
+    run (cache hits, tuned hyper-parameters, split sizes) stay out.
+    """
+    return {
+        "input_path": input_path,
+        "data_digest": data_digest,
+        "target": target,
+        "test_size": test_size,
+        "sample_n": sample_n,
+        "stratified_sample": stratified_sample,
+        "sparse": use_sparse,
+    }
+
+
+def _scalars(metrics: dict) -> dict:
+    """Top-level numeric metrics (nested blocks stay in metrics.json)."""
+    return {
+        k: float(v)
+        for k, v in metrics.items()
+        if isinstance(v, (int, float)) and not isinstance(v, bool)
+    }
+
+
+class RunRegistry:
+    def __init__(self, path, timeout: float = 30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: transactions are opened explicitly below
+        self.conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: a commit is durable once the WAL is checkpointed,
+        # and never corrupts the file
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def register(
+        self,
+        seed: int,
+        metrics: dict,
+        n: Optional[int] = None,
+        run_dir: Optional[str] = None,
+        params: Optional[dict] = None,
+        timings: Optional[list] = None,
+        sweep: Optional[str] = None,
+    ) -> int:
+        """
+        Record one run, replacing an earlier run of the same seed in the same
+        sweep (default: sweep_key(params)); returns its run_id.
+        """
+        scalars = _scalars(metrics)
+        sweep = sweep or sweep_key(params)
+        # IMMEDIATE takes the write lock up front: concurrent writers wait
+        # on busy_timeout instead of failing on a lock upgrade
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            (run_id,) = self.conn.execute(
+                "INSERT INTO runs "
+                "(sweep, seed, n, run_dir, params, timings, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (sweep, seed) DO UPDATE SET n = excluded.n, "
+                "run_dir = excluded.run_dir, params = excluded.params, "
+                "timings = excluded.timings, created_at = excluded.created_at "
+                "RETURNING run_id",
+                (
+                    sweep,
+                    int(seed),
+                    n,
+                    run_dir,
+                    json.dumps(params) if params is not None else None,
+                    json.dumps(timings) if timings is not None else None,
+                    time.time(),
+                ),
+            ).fetchone()
+            self.conn.execute("DELETE FROM metrics WHERE run_id = ?", (run_id,))
+            self.conn.executemany(
+                "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                [(run_id, k, v) for k, v in scalars.items()],
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return run_id
+
+    def top(
+        self,
+        metric: str,
+        k: int = 1,
+        lowest: bool = False,
+        sweep: Optional[str] = None,
+    ) -> list[dict]:
+        """The k runs with the highest (or lowest) `metric`, best first; within `sweep` if given."""
+        order = "ASC" if lowest else "DESC"
+        # Runs where the metric is undefined (NULL, e.g. roc_auc on one class) are skipped
+        where = "m.name = ? AND m.value IS NOT NULL"
+        args = [metric]
+        if sweep is not None:
+            where += " AND r.sweep = ?"
+            args.append(sweep)
+        cur = self.conn.execute(
+            "SELECT r.run_id, r.sweep, r.seed, r.n, r.run_dir, m.value "
+            f"FROM metrics m JOIN runs r USING (run_id) WHERE {where} "
+            f"ORDER BY m.value {order}, r.seed LIMIT ?",
+            (*args, k),
+        )
+        return [
+            {
+                "run_id": row[0],
+                "sweep": row[1],
+                "seed": row[2],
+                "n": row[3],
+                "run_dir": row[4],
+                metric: row[5],
+            }
+            for row in cur
+        ]
+
+    def latest_sweep(self) -> Optional[str]:
+        """Sweep of the most recently registered run."""
+        row = self.conn.execute(
+            "SELECT sweep FROM runs ORDER BY created_at DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def metric_names(self) -> list[str]:
+        return [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT DISTINCT name FROM metrics ORDER BY name"
+            )
+        ]
+
+    def get(self, run_id: int) -> dict:
+        row = self.conn.execute(
+            "SELECT run_id, sweep, seed, n, run_dir, params, timings, created_at "
+            "FROM runs WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"no run {run_id}")
+        run = dict(zip(["run_id", "sweep", "seed", "n", "run_dir"], row[:5]))
+        run["params"] = json.loads(row[5]) if row[5] else None
+        run["timings"] = json.loads(row[6]) if row[6] else None
+        run["created_at"] = row[7]
+        run["metrics"] = dict(
+            self.conn.execute(
+                "SELECT name, value FROM metrics WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        )
+        return run
+
+    def alias(self, alias: str) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT run_id, metric, value, promoted_at FROM aliases WHERE alias = ?",
+            (alias,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(["run_id", "metric", "value", "promoted_at"], row))
+
+    def promote(
+        self,
+        run_id: int,
+        link,
+        alias: str = "best",
+        metric: Optional[str] = None,
+        value: Optional[float] = None,
+    ) -> Path:
+        """
+        Point `alias` at run_id and the symlink `link` at its run_dir. The new
+        link is created next to the old one and renamed over it, so the switch
+        is atomic. A real directory left at `link` by the old copy-based
+        promotion is removed first.
+        """
+        run = self.get(run_id)
+        if not run["run_dir"] or not Path(run["run_dir"]).is_dir():
+            raise FileNotFoundError(
+                f"run {run_id} has no artifact dir: {run['run_dir']}"
+            )
+        link = Path(link)
+        if link.is_dir() and not link.is_symlink():
+            shutil.rmtree(link)
+        target = os.path.relpath(Path(run["run_dir"]).resolve(), link.parent.resolve())
+        tmp = link.with_name(f".{link.name}.{os.getpid()}.tmp")
+        if tmp.is_symlink():
+            tmp.unlink()
+        os.symlink(target, tmp, target_is_directory=True)
+        os.replace(tmp, link)
+        self.conn.execute(
+            "INSERT INTO aliases (alias, run_id, metric, value, promoted_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (alias) DO UPDATE SET "
+            "run_id = excluded.run_id, metric = excluded.metric, "
+            "value = excluded.value, promoted_at = excluded.promoted_at",
+            (alias, run_id, metric, value, time.time()),
+        )
+        return link
@@ -0,0 +1,96 @@
+"""
+Seeded row sampling (`--sample N`) pushed into the parquet reader.
+
+sample_positions() draws N of n_rows row positions from
+np.random.default_rng(seed) without materialising a permutation of all rows,
+so the draw costs O(N). With `labels`, the sample is stratified: each class
+gets its share of N (largest remainder), drawn within the class, and the
+positions are shuffled together.
+
+read_sample() maps the positions onto the file's row groups from the parquet
+footer and decodes only the row groups that hold a picked row (and only the
+requested columns). A stratified draw also reads the target column once to
+know the classes. Rows come back in draw order, exactly as
+df.iloc[sample_positions(len(df), ...)] on the whole file: train_baseline,
+the Monte-Carlo runner and the preprocessing cache all sample through
+sample_positions() and agree seed for seed.
+
+The row group is the unit of reading, so small samples pay in proportion to
+the sample only when the file has many row groups (archive_to_parquet
+writes 65536 rows per group); a single-row-group file is read whole.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def sample_positions(
+    n_rows: int, n: Optional[int], seed: int, labels=None
+) -> Optional[np.ndarray]:
+    """Positions of the sampled rows in draw order, or None to keep all rows."""
+    if n is None or n_rows <= n:
+        return None
+    rng = np.random.default_rng(seed)
+    if labels is None:
+        return rng.choice(n_rows, size=n, replace=False)
+
+    classes, inverse, counts = np.unique(
+        np.asarray(labels), return_inverse=True, return_counts=True
+    )
+    quota = counts * n / n_rows
+    take = np.floor(quota).astype(np.int64)
+    # Hand the rows left over to the largest remainders (ties: class order)
+    short = n - int(take.sum())
+    take[np.argsort(-(quota - take), kind="stable")[:short]] += 1
+    picks = []
+    for c, k in enumerate(take):
+        members = np.flatnonzero(inverse == c)
+        picks.append(members[rng.choice(len(members), size=k, replace=False)])
+    positions = np.concatenate(picks)
+    rng.shuffle(positions)
+    return positions
+
+
+def read_sample(
+    path,
+    n: Optional[int],
+    seed: int,
+    stratify_on: Optional[str] = None,
+    columns: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """
+    pd.read_parquet(path, columns=columns) followed by the `n`-row sample of
+    sample_positions(), reading only the row groups the sample touches.
+    """
+    pf = pq.ParquetFile(path)
+    n_rows = pf.metadata.num_rows
+    if n is None or n_rows <= n:
+        return pd.read_parquet(path, columns=columns)
+
+    labels = None
+    if stratify_on is not None:
+        if stratify_on not in pf.schema_arrow.names:
+            raise ValueError(f"Stratify column '{stratify_on}' not in {path}.")
+        labels = pf.read(columns=[stratify_on]).column(0).to_numpy()
+    positions = sample_positions(n_rows, n, seed, labels)
+
+    sizes = [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)]
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    order = np.argsort(positions, kind="stable")
+    ordered = positions[order]
+    groups = np.searchsorted(starts, ordered, side="right") - 1
+    pieces = []
+    for g in np.unique(groups):
+        local = ordered[groups == g] - starts[g]
+        table = pf.read_row_group(int(g), columns=columns, use_pandas_metadata=True)
+        pieces.append(table.take(pa.array(local)))
+    # Row groups were read in file order; put the rows back in draw order
+    table = pa.concat_tables(pieces).unify_dictionaries()
+    table = table.take(pa.array(np.argsort(order)))
+    return table.to_pandas().reset_index(drop=True)
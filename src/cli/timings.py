@@ -0,0 +1,96 @@
+"""
+Per-stage timings for train_baseline runs (timings.json).
+
+StageTimer.stage(name) wraps one step of a run (read, split, fit, plots, ...)
+and records:
+- wall_s        elapsed time (perf_counter)
+- cpu_s         CPU time of this process, all threads (BLAS included)
+- child_cpu_s   CPU time of worker processes that finished during the stage
+                (the --mode tune pool)
+- peak_rss_mb   the process's RSS high-water mark at the end of the stage,
+  peak_rss_delta_mb  and how much this stage raised it
+
+profile_summary() condenses a cProfile run into its most expensive
+functions for timings.json; the full dump goes to --profile PATH.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pstats
+import resource
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def peak_rss_mb() -> float:
+    """The process's RSS high-water mark so far, in MB."""
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child_cpu() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages: list[dict] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu, child, peak = (
+            time.perf_counter(),
+            time.process_time(),
+            _child_cpu(),
+            peak_rss_mb(),
+        )
+        try:
+            yield
+        finally:
+            peak_end = peak_rss_mb()
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_s": round(time.perf_counter() - wall, 4),
+                    "cpu_s": round(time.process_time() - cpu, 4),
+                    "child_cpu_s": round(_child_cpu() - child, 4),
+                    "peak_rss_mb": round(peak_end, 1),
+                    "peak_rss_delta_mb": round(peak_end - peak, 1),
+                }
+            )
+
+    def summary(self) -> dict:
+        total = {
+            key: round(sum(s[key] for s in self.stages), 4)
+            for key in ("wall_s", "cpu_s", "child_cpu_s")
+        }
+        total["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        return {"stages": self.stages, "total": total}
+
+    def write(self, path, **extra) -> None:
+        with open(path, "w") as f:
+            json.dump({**self.summary(), **extra}, f, indent=2)
+
+
+def profile_summary(profiler, path: str, top: int = 20) -> dict:
+    """Dump the cProfile stats to path; returns the `top` functions by cumtime."""
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler)
+    functions = []
+    for func, (_, calls, tottime, cumtime, _) in sorted(
+        stats.stats.items(), key=lambda item: item[1][3], reverse=True
+    )[:top]:
+        file, line, name = func
+        functions.append(
+            {
+                "function": f"{Path(file).name}:{line}({name})",
+                "calls": calls,
+                "tottime_s": round(tottime, 4),
+                "cumtime_s": round(cumtime, 4),
+            }
+        )
+    return {"path": str(path), "top_cumulative": functions}
@@ -4,25 +4,43 @@ Train a minimal baseline (Logistic Regression) on v0.4.0 features/labels and per
 
 Artifacts saved to --outdir:
 - model.pkl
+- scorer/ (memory-mappable copy of the model: manifest.json + .npy arrays,
+  see src/pipelines/fast_scorer.py)
 - metrics.json
 - params.json
 - coefficients.csv (or feature_importances.csv)
+- timings.json
 - confusion_matrix.png
 - roc_curve.png
+
+Reads --input (parquet) or a Postgres snapshot (--db-snapshot / --db-query),
+trains with --mode train (default) or tunes hyperparameters with --mode tune
+(also writes tune_trials.csv). See --help for the options and the README
+("Baseline Model") for details.
 """
 
 from __future__ import annotations
 import argparse
+import cProfile
+import hashlib
 import json
+import math
+import os
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Tuple
 from typing import Optional
 
 import joblib
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+from scipy import sparse as sp
 from sklearn.compose import ColumnTransformer
+from sklearn.exceptions import ConvergenceWarning
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import (
@@ -36,21 +54,55 @@ from sklearn.metrics import (
 )
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import MaxAbsScaler, OneHotEncoder
+from threadpoolctl import threadpool_limits
+
+from src.cli.bootstrap import bootstrap_intervals
+from src.cli.preprocess_cache import (
+    PreprocessCache,
+    file_digest,
+    load_matrix,
+    save_matrix,
+)
+from src.cli.sampling import read_sample, sample_positions
+from src.cli.timings import StageTimer, peak_rss_mb, profile_summary
+from src.pipelines.fast_scorer import FastScorer
+
+# --mode tune search space. Each (solver, penalty, class_weight) combination
+# is one regularization path, fitted over ascending C with warm starts.
+TUNE_C = [0.001, 0.01, 0.1, 1.0, 10.0, 100.0]
+TUNE_PATHS = [
+    {"solver": solver, "penalty": penalty, "class_weight": class_weight}
+    for solver in ("liblinear", "saga")
+    for penalty in ("l1", "l2")
+    for class_weight in (None, "balanced")
+]
+TUNE_METRICS = ["roc_auc", "f1", "accuracy", "precision", "recall"]
+
+
+def _solver(use_sparse: bool) -> str:
+    # saga trains on CSR in place; liblinear copies the input into its own format
+    return "saga" if use_sparse else "liblinear"
 
 
 def _build_pipeline(
-    numeric_cols: list[str], categorical_cols: list[str], random_state: int
+    numeric_cols: list[str],
+    categorical_cols: list[str],
+    random_state: int,
+    use_sparse: bool = False,
 ) -> Pipeline:
-    numeric_transformer = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="median")),
-        ]
-    )
+    numeric_steps = [("imputer", SimpleImputer(strategy="median"))]
+    if use_sparse:
+        # saga needs comparable feature scales; MaxAbsScaler keeps zeros zero
+        numeric_steps.append(("scaler", MaxAbsScaler()))
+    numeric_transformer = Pipeline(steps=numeric_steps)
     categorical_transformer = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=False)),
+            (
+                "onehot",
+                OneHotEncoder(handle_unknown="ignore", sparse_output=use_sparse),
+            ),
         ]
     )
 
@@ -60,18 +112,38 @@ def _build_pipeline(
             ("cat", categorical_transformer, categorical_cols),
         ],
         remainder="drop",
+        # sparse: always stack to CSR, whatever the overall density
+        sparse_threshold=1.0 if use_sparse else 0.3,
         verbose_feature_names_out=False,
     )
 
     clf = LogisticRegression(
         random_state=random_state,
         max_iter=1000,
-        solver="liblinear",
+        solver=_solver(use_sparse),
     )
 
     return Pipeline(steps=[("prep", preprocessor), ("clf", clf)])
 
 
+def design_matrix_stats(Xt) -> dict:
+    """Shape, non-zeros and in-memory size of the transformed training matrix."""
+    if sp.issparse(Xt):
+        nbytes = Xt.data.nbytes + Xt.indices.nbytes + Xt.indptr.nbytes
+        return {
+            "format": Xt.format,
+            "shape": list(Xt.shape),
+            "nnz": int(Xt.nnz),
+            "mb": round(nbytes / 2**20, 3),
+        }
+    return {
+        "format": "dense",
+        "shape": list(Xt.shape),
+        "nnz": int(np.count_nonzero(Xt)),
+        "mb": round(Xt.nbytes / 2**20, 3),
+    }
+
+
 def _infer_column_types(df: pd.DataFrame, target: str) -> Tuple[list[str], list[str]]:
     X = df.drop(columns=[target])
     numeric_cols = X.select_dtypes(include=[np.number]).columns.tolist()
@@ -134,34 +206,58 @@ def _save_roc_curve_png(y_true, y_proba, outpath: Path):
 
 
 def _maybe_sample(
-    df: pd.DataFrame, n: Optional[int], random_state: int
+    df: pd.DataFrame,
+    n: Optional[int],
+    random_state: int,
+    stratify_on: Optional[str] = None,
 ) -> pd.DataFrame:
     """
-    If n is provided and df has more than n rows, return a deterministic sample of size n.
-    Otherwise return df unchanged.
+    If n is provided and df has more than n rows, return a deterministic sample of size n
+    (the rows sampling.read_sample picks from the same file). Otherwise return df unchanged.
     """
     if n is None:
         return df
     if len(df) <= n:
         return df.reset_index(drop=True)
-    return df.sample(n=n, random_state=random_state).reset_index(drop=True)
+    labels = df[stratify_on].to_numpy() if stratify_on else None
+    rows = sample_positions(len(df), n, random_state, labels)
+    return df.iloc[rows].reset_index(drop=True)
 
 
-def train_and_save(
-    input_path: str,
+def _frame_digest(df: pd.DataFrame) -> str:
+    """blake2b of the frame's column names and row hashes (no file to digest)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([[c, str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def prepare(
+    df: pd.DataFrame,
     target: str,
     test_size: float,
     random_state: int,
-    outdir: str,
     sample_n: Optional[int] = None,
-):
+    use_sparse: bool = False,
+    stratified_sample: bool = False,
+    timer: Optional[StageTimer] = None,
+) -> dict:
+    """
+    Sample, split and encode one run: everything up to the classifier fit.
 
-    df = pd.read_parquet(input_path)
+    Returns the fitted preprocessor (`prep`), the encoded `X_train`/`X_test`,
+    `y_train`/`y_test` and the column lists. This is what PreprocessCache
+    stores.
+    """
+    timer = timer or StageTimer()
     if target not in df.columns:
         raise ValueError(f"Target column '{target}' not in dataset.")
 
     # optional sampling (deterministic)
-    df = _maybe_sample(df, sample_n, random_state)
+    with timer.stage("sample"):
+        df = _maybe_sample(
+            df, sample_n, random_state, target if stratified_sample else None
+        )
 
     # ensure at least a few rows for split
     min_rows = max(5, int(1 / (1 - test_size)) + 1)
@@ -178,77 +274,531 @@ def train_and_save(
 
     stratify = y if y.nunique() > 1 else None
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X,
-        y,
+    with timer.stage("split"):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X,
+            y,
+            test_size=test_size,
+            random_state=random_state,
+            stratify=stratify,
+        )
+
+    pipe = _build_pipeline(numeric_cols, categorical_cols, random_state, use_sparse)
+    prep = pipe.named_steps["prep"]
+    with timer.stage("encode"):
+        X_train_t = prep.fit_transform(X_train, y_train)
+        X_test_t = prep.transform(X_test)
+    return {
+        "prep": prep,
+        "X_train": X_train_t,
+        "X_test": X_test_t,
+        "y_train": y_train,
+        "y_test": y_test,
+        "numeric_cols": numeric_cols,
+        "categorical_cols": categorical_cols,
+    }
+
+
+def fit_prepared(
+    prepared: dict,
+    random_state: int,
+    use_sparse: bool = False,
+    clf_params: Optional[dict] = None,
+    timer: Optional[StageTimer] = None,
+) -> dict:
+    """
+    Fit the classifier on a prepare() result and score it. `clf_params`
+    overrides LogisticRegression settings (e.g. a tuned C / penalty).
+
+    Returns a dict with the fitted `pipe`, `metrics`, the column lists and the
+    test-set arrays (`y_test`, `y_pred`, `y_proba`) needed for the artifacts.
+    """
+    timer = timer or StageTimer()
+    numeric_cols = prepared["numeric_cols"]
+    categorical_cols = prepared["categorical_cols"]
+    pipe = _build_pipeline(numeric_cols, categorical_cols, random_state, use_sparse)
+    pipe.steps[0] = ("prep", prepared["prep"])
+    clf = pipe.named_steps["clf"]
+    clf.set_params(**(clf_params or {}))
+    with timer.stage("fit"):
+        clf.fit(prepared["X_train"], prepared["y_train"])
+    design = design_matrix_stats(prepared["X_train"])
+
+    # Evaluate (X_test is already encoded)
+    X_test, y_test = prepared["X_test"], prepared["y_test"]
+    # ROC-AUC needs predict_proba
+    with_proba = hasattr(clf, "predict_proba") and y_test.nunique() > 1
+    with timer.stage("predict"):
+        y_pred = clf.predict(X_test)
+        y_proba = clf.predict_proba(X_test)[:, 1] if with_proba else None
+    with timer.stage("metrics"):
+        metrics = {
+            "accuracy": float(accuracy_score(y_test, y_pred)),
+            "precision": float(precision_score(y_test, y_pred, zero_division=0)),
+            "recall": float(recall_score(y_test, y_pred, zero_division=0)),
+            "f1": float(f1_score(y_test, y_pred, zero_division=0)),
+            "roc_auc": (float(roc_auc_score(y_test, y_proba)) if with_proba else None),
+        }
+
+    metrics["resources"] = {
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "design_matrix": design,
+    }
+
+    return {
+        "pipe": pipe,
+        "metrics": metrics,
+        "numeric_cols": numeric_cols,
+        "categorical_cols": categorical_cols,
+        "use_sparse": use_sparse,
+        "y_test": y_test,
+        "y_pred": y_pred,
+        "y_proba": y_proba,
+    }
+
+
+def fit_and_evaluate(
+    df: pd.DataFrame,
+    target: str,
+    test_size: float,
+    random_state: int,
+    sample_n: Optional[int] = None,
+    use_sparse: bool = False,
+    stratified_sample: bool = False,
+    timer: Optional[StageTimer] = None,
+) -> dict:
+    """Sample, split, fit and score one run on an in-memory frame."""
+    prepared = prepare(
+        df,
+        target,
+        test_size,
+        random_state,
+        sample_n,
+        use_sparse,
+        stratified_sample,
+        timer=timer,
+    )
+    return fit_prepared(prepared, random_state, use_sparse, timer=timer)
+
+
+def cached_prepare(
+    cache: PreprocessCache,
+    data_digest: str,
+    load_frame: Callable[[], pd.DataFrame],
+    target: str,
+    test_size: float,
+    random_state: int,
+    sample_n: Optional[int] = None,
+    use_sparse: bool = False,
+    stratified_sample: bool = False,
+) -> Tuple[dict, dict]:
+    """
+    prepare() through the cache: on a hit the frame is never loaded.
+
+    Returns (prepared, info) where info = {"key": ..., "hit": bool} goes to
+    params.json.
+    """
+    key = cache.key(
+        data_digest,
+        target=target,
         test_size=test_size,
         random_state=random_state,
-        stratify=stratify,
+        sample_n=sample_n,
+        stratified_sample=stratified_sample,
+        use_sparse=use_sparse,
+    )
+    prepared = cache.get(key)
+    if prepared is not None:
+        return prepared, {"key": key, "hit": True}
+    prepared = prepare(
+        load_frame(),
+        target,
+        test_size,
+        random_state,
+        sample_n,
+        use_sparse,
+        stratified_sample,
     )
+    cache.put(key, prepared, target)
+    return prepared, {"key": key, "hit": False}
 
-    pipe = _build_pipeline(numeric_cols, categorical_cols, random_state)
 
-    pipe.fit(X_train, y_train)
+def _score(metric: str, clf: LogisticRegression, X, y) -> float:
+    if metric == "roc_auc":
+        if len(np.unique(y)) < 2:
+            return float("nan")
+        return float(roc_auc_score(y, clf.predict_proba(X)[:, 1]))
+    scorer = {
+        "f1": f1_score,
+        "accuracy": accuracy_score,
+        "precision": precision_score,
+        "recall": recall_score,
+    }[metric]
+    kwargs = {} if metric == "accuracy" else {"zero_division": 0}
+    return float(scorer(y, clf.predict(X), **kwargs))
 
-    # Evaluate
-    y_pred = pipe.predict(X_test)
-    metrics = {
-        "accuracy": float(accuracy_score(y_test, y_pred)),
-        "precision": float(precision_score(y_test, y_pred, zero_division=0)),
-        "recall": float(recall_score(y_test, y_pred, zero_division=0)),
-        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
-    }
 
-    # ROC-AUC (need predict_proba)
-    if hasattr(pipe.named_steps["clf"], "predict_proba") and y_test.nunique() > 1:
-        y_proba = pipe.predict_proba(X_test)[:, 1]
-        metrics["roc_auc"] = float(roc_auc_score(y_test, y_proba))
-    else:
-        y_proba = None
-        metrics["roc_auc"] = None
+# Filled in each tuning worker by _init_tune_worker
+_TUNE: dict = {}
+
+
+def _init_tune_worker(workdir: str, matrix: dict):
+    # One BLAS thread per process; the pool provides the parallelism
+    _TUNE["limits"] = threadpool_limits(limits=1)
+    _TUNE["X"] = load_matrix(Path(workdir), "X_train", matrix)
+    for name in ("y", "order", "val"):
+        _TUNE[name] = np.load(Path(workdir) / f"{name}.npy")
+
 
+def _tune_path(
+    path: dict, Cs: list[float], n_rows: int, random_state: int, metric: str
+) -> list[dict]:
+    """
+    Fit one regularization path on the first n_rows of the tuning rows and
+    score each C on the validation rows. C ascends, so each fit starts from
+    the previous (more regularized) solution; liblinear ignores warm starts.
+    """
+    X, y = _TUNE["X"], _TUNE["y"]
+    fit_rows, val_rows = _TUNE["order"][:n_rows], _TUNE["val"]
+    X_fit, y_fit = X[fit_rows], y[fit_rows]
+    X_val, y_val = X[val_rows], y[val_rows]
+    clf = LogisticRegression(
+        max_iter=1000, warm_start=True, random_state=random_state, **path
+    )
+    trials = []
+    for C in sorted(Cs):
+        clf.set_params(C=C)
+        t0 = time.perf_counter()
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", ConvergenceWarning)
+                clf.fit(X_fit, y_fit)
+            score, n_iter = _score(metric, clf, X_val, y_val), int(clf.n_iter_.max())
+        except ValueError:  # e.g. a single class in a small rung
+            score, n_iter = float("nan"), 0
+        trials.append(
+            {
+                **path,
+                "C": C,
+                "rows": n_rows,
+                metric: score,
+                "n_iter": n_iter,
+                "seconds": round(time.perf_counter() - t0, 4),
+            }
+        )
+    return trials
+
+
+def tune(
+    prepared: dict,
+    random_state: int,
+    metric: str = "roc_auc",
+    eta: int = 3,
+    min_rows: int = 500,
+    val_size: float = 0.2,
+    jobs: Optional[int] = None,
+) -> Tuple[dict, list[dict], list[dict]]:
+    """
+    Successive halving over TUNE_PATHS x TUNE_C on the encoded training rows.
+
+    A validation split is held out of X_train (the test split is never
+    seen). Every candidate is scored on a small subset of the remaining rows;
+    the best 1/eta move on to a subset eta times larger, up to all of them.
+    Each rung fits one warm-started regularization path per surviving
+    (solver, penalty, class_weight) in a process pool that memory-maps the
+    shared design matrix.
+
+    Returns (best LogisticRegression params, all trials, per-rung summary).
+    """
+    y = np.asarray(prepared["y_train"])
+    fit_idx, val_idx = train_test_split(
+        np.arange(len(y)),
+        test_size=val_size,
+        random_state=random_state,
+        stratify=y if len(np.unique(y)) > 1 else None,
+    )
+    order = np.random.RandomState(random_state).permutation(fit_idx)
+    sizes = [len(order)]
+    while sizes[0] // eta >= min_rows:
+        sizes.insert(0, sizes[0] // eta)
+
+    candidates = [{**path, "C": C} for path in TUNE_PATHS for C in TUNE_C]
+    trials, rungs = [], []
+    with tempfile.TemporaryDirectory(prefix="churn-tune-") as workdir:
+        matrix = save_matrix(Path(workdir), "X_train", prepared["X_train"])
+        for name, arr in (("y", y), ("order", order), ("val", val_idx)):
+            np.save(Path(workdir) / f"{name}.npy", arr)
+        with ProcessPoolExecutor(
+            max_workers=jobs or os.cpu_count(),
+            initializer=_init_tune_worker,
+            initargs=(workdir, matrix),
+        ) as pool:
+            for n_rows in sizes:
+                paths: dict = {}
+                for c in candidates:
+                    key = (c["solver"], c["penalty"], c["class_weight"])
+                    paths.setdefault(key, []).append(c["C"])
+                futures = [
+                    pool.submit(
+                        _tune_path,
+                        dict(zip(("solver", "penalty", "class_weight"), key)),
+                        Cs,
+                        n_rows,
+                        random_state,
+                        metric,
+                    )
+                    for key, Cs in paths.items()
+                ]
+                results = [t for fut in futures for t in fut.result()]
+                trials.extend(results)
+                # NaN scores rank last
+                results.sort(
+                    key=lambda t: -t[metric] if not math.isnan(t[metric]) else math.inf
+                )
+                keep = max(1, math.ceil(len(results) / eta))
+                candidates = [
+                    {k: t[k] for k in ("solver", "penalty", "class_weight", "C")}
+                    for t in results[:keep]
+                ]
+                rungs.append(
+                    {
+                        "rows": n_rows,
+                        "trials": len(results),
+                        f"best_{metric}": results[0][metric],
+                    }
+                )
+                print(
+                    f"tune: {len(results):>2} trials on {n_rows} rows, "
+                    f"best {metric}={results[0][metric]:.4f} ({candidates[0]})"
+                )
+
+    return candidates[0], trials, rungs
+
+
+def save_artifacts(
+    result: dict,
+    outdir: str,
+    input_path: str,
+    target: str,
+    test_size: float,
+    random_state: int,
+    plots: bool = True,
+    timer: Optional[StageTimer] = None,
+):
+    """Write the artifacts of one fit_and_evaluate() run to outdir."""
+    timer = timer or StageTimer()
+    pipe = result["pipe"]
     out = Path(outdir)
     out.mkdir(parents=True, exist_ok=True)
 
     # Save model
-    joblib.dump(pipe, out / "model.pkl")
+    with timer.stage("dump_model"):
+        joblib.dump(pipe, out / "model.pkl")
+        # Memory-mappable copy; the digest ties it to this model.pkl
+        digest = hashlib.blake2b((out / "model.pkl").read_bytes()).hexdigest()
+        FastScorer.from_pipeline(pipe).save(out / "scorer", model_digest=digest)
 
     # Save metrics & params
     with open(out / "metrics.json", "w") as f:
-        json.dump(metrics, f, indent=2)
+        json.dump(result["metrics"], f, indent=2)
 
     params = {
         "model": "LogisticRegression",
         "random_state": int(random_state),
         "test_size": float(test_size),
-        "solver": "liblinear",
+        "solver": _solver(result["use_sparse"]),
+        "sparse": result["use_sparse"],
         "features": {
-            "numeric": numeric_cols,
-            "categorical": categorical_cols,
+            "numeric": result["numeric_cols"],
+            "categorical": result["categorical_cols"],
         },
         "input_path": input_path,
         "target": target,
     }
+    params.update(result.get("params", {}))
     with open(out / "params.json", "w") as f:
         json.dump(params, f, indent=2)
 
     # Save coefficients as DataFrame (maps to expanded feature names)
-    feature_names = _extract_feature_names(pipe)
-    coef = pipe.named_steps["clf"].coef_.ravel()
-    coef_df = pd.DataFrame({"feature": feature_names, "coefficient": coef})
-    coef_df.sort_values("coefficient", key=abs, ascending=False).to_csv(
-        out / "coefficients.csv", index=False
-    )
+    with timer.stage("coefficients"):
+        feature_names = _extract_feature_names(pipe)
+        coef = pipe.named_steps["clf"].coef_.ravel()
+        coef_df = pd.DataFrame({"feature": feature_names, "coefficient": coef})
+        coef_df.sort_values("coefficient", key=abs, ascending=False).to_csv(
+            out / "coefficients.csv", index=False
+        )
+
+    if not plots:
+        return
 
     # Plots
-    _save_confusion_matrix_png(y_test, y_pred, out / "confusion_matrix.png")
-    if y_proba is not None:
-        _save_roc_curve_png(y_test, y_proba, out / "roc_curve.png")
-    else:
-        # Write a placeholder ROC image for determinism
-        _save_roc_curve_png(
-            y_test, np.zeros_like(y_test, dtype=float), out / "roc_curve.png"
+    y_test, y_proba = result["y_test"], result["y_proba"]
+    with timer.stage("plot_confusion_matrix"):
+        _save_confusion_matrix_png(
+            y_test, result["y_pred"], out / "confusion_matrix.png"
         )
+    with timer.stage("plot_roc_curve"):
+        if y_proba is not None:
+            _save_roc_curve_png(y_test, y_proba, out / "roc_curve.png")
+        else:
+            # Write a placeholder ROC image for determinism
+            _save_roc_curve_png(
+                y_test, np.zeros_like(y_test, dtype=float), out / "roc_curve.png"
+            )
+
+
+def train_and_save(
+    input_path: Optional[str],
+    target: str,
+    test_size: float,
+    random_state: int,
+    outdir: str,
+    sample_n: Optional[int] = None,
+    use_sparse: bool = False,
+    stratified_sample: bool = False,
+    out_of_core: bool = False,
+    batch_rows: int = 65_536,
+    epochs: int = 5,
+    cache_dir: Optional[str] = None,
+    cache_max_mb: int = 2048,
+    mode: str = "train",
+    tune_metric: str = "roc_auc",
+    jobs: Optional[int] = None,
+    bootstrap: int = 0,
+    confidence: float = 0.95,
+    profile: Optional[str] = None,
+    db_snapshot: Optional[str] = None,
+    db_query: Optional[str] = None,
+    db_cache_dir: Optional[str] = None,
+):
+    timer = StageTimer()
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+
+    frame, source = None, input_path
+    if db_snapshot or db_query:
+        from src.pipelines.db_features import load_features
+
+        with timer.stage("read_db"):
+            table, cached, source = load_features(
+                db_snapshot, db_query, target, db_cache_dir
+            )
+        if cached is not None:
+            input_path = str(cached)
+        else:
+            if out_of_core:
+                raise ValueError(
+                    "--out-of-core with a database source needs --db-cache-dir"
+                )
+            frame = table.to_pandas()
+            del table
+
+    if out_of_core:
+        from src.cli.out_of_core import fit_out_of_core
+
+        with timer.stage("fit_out_of_core"):
+            result = fit_out_of_core(
+                input_path, target, test_size, random_state, batch_rows, epochs
+            )
+        trials = None
+    else:
+        if mode == "tune":
+            # saga is in the search space: use the scaled (sparse) encoding
+            use_sparse = True
+
+        def load_frame() -> pd.DataFrame:
+            if frame is not None:
+                return _maybe_sample(
+                    frame,
+                    sample_n,
+                    random_state,
+                    target if stratified_sample else None,
+                )
+            # Only the row groups holding sampled rows are decoded
+            return read_sample(
+                input_path,
+                sample_n,
+                random_state,
+                stratify_on=target if stratified_sample else None,
+            )
+
+        cache_info = None
+        if cache_dir:
+            cache = PreprocessCache(cache_dir, cache_max_mb * 2**20)
+            with timer.stage("prepare_cached"):
+                prepared, info = cached_prepare(
+                    cache,
+                    file_digest(input_path) if frame is None else _frame_digest(frame),
+                    load_frame,
+                    target,
+                    test_size,
+                    random_state,
+                    sample_n,
+                    use_sparse,
+                    stratified_sample,
+                )
+            cache_info = {"preprocess_cache": info}
+        else:
+            with timer.stage("read"):
+                df = load_frame()
+            prepared = prepare(
+                df,
+                target,
+                test_size,
+                random_state,
+                sample_n,
+                use_sparse=use_sparse,
+                stratified_sample=stratified_sample,
+                timer=timer,
+            )
+
+        trials = None
+        if mode == "tune":
+            with timer.stage("tune"):
+                best, trials, rungs = tune(
+                    prepared, random_state, metric=tune_metric, jobs=jobs
+                )
+            result = fit_prepared(
+                prepared, random_state, use_sparse, clf_params=best, timer=timer
+            )
+            result["params"] = {
+                **best,
+                "tune": {
+                    "metric": tune_metric,
+                    "rungs": rungs,
+                    "trials": len(trials),
+                },
+            }
+        else:
+            result = fit_prepared(prepared, random_state, use_sparse, timer=timer)
+            result["params"] = {}
+        result["params"].update(cache_info or {})
+        if sample_n is not None:
+            result["params"]["sample"] = {
+                "n": sample_n,
+                "stratified": stratified_sample,
+            }
+
+    if bootstrap:
+        with timer.stage("bootstrap"):
+            result["metrics"]["bootstrap"] = bootstrap_intervals(
+                result["y_test"],
+                result["y_pred"],
+                result["y_proba"],
+                resamples=bootstrap,
+                confidence=confidence,
+                seed=random_state,
+            )
+    save_artifacts(result, outdir, source, target, test_size, random_state, timer=timer)
+    if trials is not None:
+        pd.DataFrame(trials).to_csv(Path(outdir) / "tune_trials.csv", index=False)
+
+    extra = {}
+    if profiler:
+        profiler.disable()
+        extra["profile"] = profile_summary(profiler, profile)
+    timer.write(Path(outdir) / "timings.json", **extra)
 
 
 def parse_args():
@@ -257,9 +807,32 @@ def parse_args():
     )
     p.add_argument(
         "--input",
-        required=True,
+        default=None,
         help="Path to processed features parquet (includes target column).",
     )
+    p.add_argument(
+        "--db-snapshot",
+        default=None,
+        metavar="DATE",
+        help="Read features from Postgres: customers labelled on DATE "
+        "(YYYY-MM-DD or 'latest') instead of --input, with their attributes as "
+        "of DATE from churn.customer_history. Without that table "
+        "(sql/004_customer_history.sql) the current attributes are used, "
+        "which can leak changes made after DATE.",
+    )
+    p.add_argument(
+        "--db-query",
+        default=None,
+        metavar="SQL",
+        help="Read features from Postgres: rows of this query (feature columns "
+        "plus the target) instead of --input.",
+    )
+    p.add_argument(
+        "--db-cache-dir",
+        default=None,
+        help="Keep database reads as parquet here, reused while the snapshot's "
+        "customers and labels are unchanged.",
+    )
     p.add_argument("--target", required=True, help="Target column name (binary 0/1).")
     p.add_argument(
         "--test-size", type=float, default=0.2, help="Test split size. Default: 0.2"
@@ -272,9 +845,110 @@ def parse_args():
         "--sample",
         type=int,
         default=None,
-        help="Optional row cap for quick tests (e.g., 50).",
+        help="Optional row cap for quick tests (e.g., 50); only the parquet row "
+        "groups holding sampled rows are read.",
+    )
+    p.add_argument(
+        "--stratified-sample",
+        action="store_true",
+        help="With --sample, keep the target's class proportions in the sample.",
+    )
+    p.add_argument(
+        "--sparse",
+        action="store_true",
+        help="CSR one-hot design matrix + saga solver (for high-cardinality data); "
+        "memory scales with non-zeros, not rows x categories.",
+    )
+    p.add_argument(
+        "--out-of-core",
+        action="store_true",
+        help="Stream the parquet in batches and train with SGD partial_fit "
+        "(src/cli/out_of_core.py); the artifacts are the same.",
+    )
+    p.add_argument(
+        "--batch-rows",
+        type=int,
+        default=65_536,
+        help="Rows per batch with --out-of-core. Default: 65536",
+    )
+    p.add_argument(
+        "--epochs",
+        type=int,
+        default=5,
+        help="Passes over the training rows with --out-of-core. Default: 5",
+    )
+    p.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Reuse encoded design matrices from this preprocessing cache, keyed "
+        "by the input file (path, size, mtime, parquet footer) and the split; "
+        "a hit skips reading and encoding.",
+    )
+    p.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=2048,
+        help="Evict least recently used cache entries above this size. Default: 2048",
+    )
+    p.add_argument(
+        "--mode",
+        choices=["train", "tune"],
+        default="train",
+        help="tune = successive-halving search over C, penalty, class weight "
+        "and solver; the best configuration is refit and saved. Default: train",
+    )
+    p.add_argument(
+        "--tune-metric",
+        choices=TUNE_METRICS,
+        default="roc_auc",
+        help="Validation metric that ranks tuning trials. Default: roc_auc",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes for --mode tune. Default: all CPUs",
+    )
+    p.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Bootstrap resamples of the test set for metric confidence "
+        "intervals in metrics.json (e.g. 2000); the model is not refit. "
+        "Default: 0 (off)",
+    )
+    p.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level of the --bootstrap intervals. Default: 0.95",
+    )
+    p.add_argument(
+        "--profile",
+        default=None,
+        metavar="PATH",
+        help="cProfile the run and dump the stats to PATH (pstats / snakeviz); "
+        "the top functions also go into timings.json",
     )
-    return p.parse_args()
+    args = p.parse_args()
+    if not 0 < args.confidence < 1:
+        p.error("--confidence must be between 0 and 1")
+    sources = [args.input, args.db_snapshot, args.db_query]
+    if sum(s is not None for s in sources) != 1:
+        p.error("pass exactly one of --input, --db-snapshot or --db-query")
+    if args.out_of_core and args.input is None and args.db_cache_dir is None:
+        p.error("--out-of-core with a database source requires --db-cache-dir")
+    if args.stratified_sample and args.sample is None:
+        p.error("--stratified-sample requires --sample")
+    if args.out_of_core and args.sample is not None:
+        p.error("--sample cannot be combined with --out-of-core")
+    if args.out_of_core and args.mode == "tune":
+        p.error("--mode tune cannot be combined with --out-of-core")
+    if args.out_of_core and args.sparse:
+        p.error("--sparse cannot be combined with --out-of-core (always CSR)")
+    if args.out_of_core and args.cache_dir is not None:
+        p.error("--cache-dir cannot be combined with --out-of-core")
+    return args
 
 
 def main():
@@ -286,6 +960,22 @@ def main():
         random_state=args.random_state,
         outdir=args.outdir,
         sample_n=args.sample,
+        use_sparse=args.sparse,
+        stratified_sample=args.stratified_sample,
+        out_of_core=args.out_of_core,
+        batch_rows=args.batch_rows,
+        epochs=args.epochs,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        mode=args.mode,
+        tune_metric=args.tune_metric,
+        jobs=args.jobs,
+        bootstrap=args.bootstrap,
+        confidence=args.confidence,
+        profile=args.profile,
+        db_snapshot=args.db_snapshot,
+        db_query=args.db_query,
+        db_cache_dir=args.db_cache_dir,
     )
 
 
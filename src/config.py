@@ -27,6 +27,15 @@ class Settings:
     pg_port: int = int(os.getenv("POSTGRES_PORT", "5432"))
     pg_db: str = os.getenv("POSTGRES_DB", "churn")
 
+    # Connection pool (src/db.py); shared by the app and the ETL
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+    db_connect_timeout: int = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))  # seconds
+    # 0 disables; long ETL merges may need a generous value
+    db_statement_timeout_ms: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
     @property
     def sqlalchemy_url(self) -> str:
         """SQLAlchemy DSN using psycopg (v3) driver."""
@@ -1,4 +1,75 @@
 """
-Placeholder for future database utilities (currently unused).
-ETL logic lives in src/pipelines/ingest_csv.py instead.
+Shared database layer for the app and the ETL.
+
+- One process-wide SQLAlchemy engine (psycopg v3 driver) built from `settings`,
+  so connections are pooled and reused instead of opened per operation.
+- Pool size, overflow, timeouts and the server-side statement timeout come from
+  `src/config.py` (DB_* environment variables).
+- `connection()` hands out the raw psycopg connection for driver-level work
+  such as COPY; SQLAlchemy users call `get_engine()` directly.
 """
+
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from src.config import settings
+
+_engine: Engine | None = None
+
+
+def _connect_args() -> dict:
+    args = {"connect_timeout": settings.db_connect_timeout}
+    if settings.db_statement_timeout_ms > 0:
+        args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return args
+
+
+def get_engine() -> Engine:
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            settings.sqlalchemy_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,  # drop stale connections at checkout
+            connect_args=_connect_args(),
+        )
+    return _engine
+
+
+@contextmanager
+def connection():
+    """
+    Check out a pooled psycopg (v3) connection.
+    Uncommitted work is rolled back when the connection returns to the pool.
+    """
+    pooled = get_engine().raw_connection()
+    try:
+        yield pooled.driver_connection
+    finally:
+        pooled.close()  # returns to the pool (reset-on-return rolls back)
+
+
+def pool_stats() -> dict:
+    """Snapshot of the pool counters (for health checks and logs)."""
+    pool = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def reset_after_fork():
+    """
+    Pool initializer for child processes: forget connections inherited from the
+    parent (without closing them) so the child opens its own.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
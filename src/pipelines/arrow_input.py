@@ -0,0 +1,297 @@
+"""
+Typed Parquet / Arrow IPC input for the Postgres loader.
+
+- Declares the Arrow schema of each loader input (customers, churn_labels)
+- Reads inputs in record batches and conforms them to that schema
+- Encodes batches straight into PostgreSQL's binary COPY format with NumPy,
+  so values are never parsed or cast row by row (client or server side)
+
+Binary COPY layout (per row): int16 field count, then per field an int32 byte
+length (-1 for NULL) followed by the value in the type's binary send format.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+ARROW_SUFFIXES = (".parquet", ".arrow", ".feather", ".ipc")
+
+# Declared input schemas. `attributes` may also arrive as a struct, which is
+# serialised to JSON (the one per-row step on this path).
+CUSTOMERS_SCHEMA = pa.schema(
+    [
+        ("external_id", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("signup_source", pa.string()),
+        ("country", pa.string()),
+        ("region", pa.string()),
+        ("city", pa.string()),
+        ("plan_tier", pa.string()),
+        ("is_active", pa.bool_()),
+        ("attributes", pa.string()),
+    ]
+)
+
+CHURN_SCHEMA = pa.schema(
+    [
+        ("external_id", pa.string()),
+        ("label", pa.bool_()),
+        ("label_date", pa.date32()),
+        ("reason_code", pa.string()),
+        ("notes", pa.string()),
+    ]
+)
+
+# Postgres column type for each Arrow type used above (for staging DDL)
+PG_TYPES = {
+    pa.string(): "TEXT",
+    pa.timestamp("us", tz="UTC"): "TIMESTAMPTZ",
+    pa.bool_(): "BOOLEAN",
+    pa.date32(): "DATE",
+    pa.float64(): "FLOAT8",
+}
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+COPY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+
+PG_EPOCH_US = 946_684_800_000_000  # 2000-01-01 in Unix microseconds
+PG_EPOCH_DAYS = 10_957  # 2000-01-01 in Unix days
+_JSONB_VERSION = 1
+
+
+def is_arrow_input(path: Path) -> bool:
+    return path.suffix.lower() in ARROW_SUFFIXES
+
+
+def pg_types(schema: pa.Schema, json_cols=("attributes",)) -> list[str]:
+    """Postgres type of each field; `json_cols` are string fields holding JSON."""
+    return ["JSONB" if f.name in json_cols else PG_TYPES[f.type] for f in schema]
+
+
+def pg_column_defs(schema: pa.Schema, types) -> str:
+    """Typed column list for a staging table matching `schema`."""
+    return ", ".join(f"{f.name} {t}" for f, t in zip(schema, types))
+
+
+def _conform(batch: pa.RecordBatch, schema: pa.Schema, file: str) -> pa.RecordBatch:
+    missing = [f.name for f in schema if f.name not in batch.schema.names]
+    if missing:
+        raise ValueError(f"{file}: missing required columns {missing}")
+    arrays = []
+    for field in schema:
+        col = batch.column(batch.schema.get_field_index(field.name))
+        if pa.types.is_struct(col.type) and field.type == pa.string():
+            col = _struct_to_json(col)
+        elif col.type != field.type:
+            col = col.cast(field.type)
+        arrays.append(col)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _struct_to_json(col: pa.Array) -> pa.Array:
+    return pa.array(
+        [None if v is None else json.dumps(v) for v in col.to_pylist()],
+        type=pa.string(),
+    )
+
+
+def _parquet_batches(path: Path, columns, batch_size: int, skip_rows: int):
+    pf = pq.ParquetFile(path)
+    meta = pf.metadata
+    # Skip whole row groups from the footer metadata; slice into the first one
+    start_group, seen = 0, 0
+    while (
+        start_group < meta.num_row_groups
+        and seen + meta.row_group(start_group).num_rows <= skip_rows
+    ):
+        seen += meta.row_group(start_group).num_rows
+        start_group += 1
+    groups = list(range(start_group, meta.num_row_groups))
+    if not groups:
+        return
+    to_skip = skip_rows - seen
+    for batch in pf.iter_batches(
+        batch_size=batch_size, row_groups=groups, columns=columns
+    ):
+        if to_skip:
+            if to_skip >= batch.num_rows:
+                to_skip -= batch.num_rows
+                continue
+            batch, to_skip = batch.slice(to_skip), 0
+        yield batch
+
+
+def _ipc_batches(path: Path, skip_rows: int):
+    source = pa.memory_map(str(path), "r")
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        source.seek(0)
+        batches = iter(pa.ipc.open_stream(source))
+    to_skip = skip_rows
+    for batch in batches:
+        if to_skip:
+            if to_skip >= batch.num_rows:
+                to_skip -= batch.num_rows
+                continue
+            batch, to_skip = batch.slice(to_skip), 0
+        yield batch
+
+
+def read_batches(path: Path, schema: pa.Schema, batch_size=65_536, skip_rows=0):
+    """
+    Yield record batches of at most `batch_size` rows conformed to `schema`,
+    starting after `skip_rows` rows (for checkpoint resume).
+    """
+    if path.suffix.lower() == ".parquet":
+        present = set(pq.read_schema(path).names)
+        columns = [f.name for f in schema if f.name in present]
+        batches = _parquet_batches(path, columns, batch_size, skip_rows)
+    else:
+        batches = _ipc_batches(path, skip_rows)
+    for batch in batches:
+        # IPC files keep their writer's batch size; re-slice to ours
+        for start in range(0, batch.num_rows, batch_size):
+            yield _conform(batch.slice(start, batch_size), schema, path.name)
+
+
+def distinct_strings(path: Path, column: str) -> set[str]:
+    """Distinct non-null values of one column as strings (Parquet reads only it)."""
+    if path.suffix.lower() == ".parquet":
+        col = pq.read_table(path, columns=[column]).column(column)
+    else:
+        col = pa.Table.from_batches(list(_ipc_batches(path, 0))).column(column)
+    return set(pc.unique(col.cast(pa.string())).drop_null().to_pylist())
+
+
+def iter_chunks(path: Path, offset: int, size: int, schema: pa.Schema):
+    """Arrow counterpart of ingest_csv.iter_chunks; offsets are row counts."""
+    end = offset
+    for batch in read_batches(path, schema, batch_size=size, skip_rows=offset):
+        end += batch.num_rows
+        yield batch, end
+
+
+def _valid_mask(col: pa.Array) -> np.ndarray:
+    if col.null_count == 0:
+        return np.ones(len(col), dtype=bool)
+    return col.is_valid().to_numpy(zero_copy_only=False)
+
+
+def _fixed_width(values: np.ndarray, valid: np.ndarray, be_dtype: str):
+    """(lengths, starts, data) for a fixed-width big-endian encoding."""
+    data = values.astype(be_dtype).view(np.uint8)
+    width = np.dtype(be_dtype).itemsize
+    starts = np.arange(len(values), dtype=np.int64) * width
+    lengths = np.where(valid, width, -1).astype(np.int64)
+    return lengths, starts, data
+
+
+def _field_bytes(col: pa.Array, pg_type: str):
+    """
+    Encode one column into (lengths, starts, data, prefix): per-row byte length
+    (-1 = NULL), start offset of each value inside `data`, and an optional
+    one-byte prefix (the jsonb format version).
+    """
+    valid = _valid_mask(col)
+    if pg_type in ("TEXT", "JSONB"):
+        col = col.cast(pa.large_string())
+        offsets = np.frombuffer(col.buffers()[1], dtype=np.int64)[
+            col.offset : col.offset + len(col) + 1
+        ]
+        buf = col.buffers()[2]
+        data = (
+            np.frombuffer(buf, np.uint8) if buf is not None else np.empty(0, np.uint8)
+        )
+        lengths = np.where(valid, np.diff(offsets), -1)
+        prefix = _JSONB_VERSION if pg_type == "JSONB" else None
+        return lengths, offsets[:-1], data, prefix
+    if pg_type == "BOOLEAN":
+        values = col.fill_null(False).to_numpy(zero_copy_only=False)
+        return (*_fixed_width(values.astype(np.uint8), valid, "u1"), None)
+    if pg_type == "TIMESTAMPTZ":
+        us = col.cast(pa.timestamp("us", tz="UTC")).cast(pa.int64()).fill_null(0)
+        values = us.to_numpy(zero_copy_only=False) - PG_EPOCH_US
+        return (*_fixed_width(values, valid, ">i8"), None)
+    if pg_type == "DATE":
+        days = col.cast(pa.int32()).fill_null(0).to_numpy(zero_copy_only=False)
+        return (*_fixed_width(days - PG_EPOCH_DAYS, valid, ">i4"), None)
+    if pg_type == "FLOAT8":
+        values = col.cast(pa.float64()).fill_null(0).to_numpy(zero_copy_only=False)
+        return (*_fixed_width(values, valid, ">f8"), None)
+    if pg_type == "UUID":
+        # Canonical text UUIDs -> 16 raw bytes each; hex-decode the whole buffer
+        hexed = pc.replace_substring(col.cast(pa.large_string()), "-", "")
+        offsets = np.frombuffer(hexed.buffers()[1], dtype=np.int64)[
+            hexed.offset : hexed.offset + len(hexed) + 1
+        ]
+        if not np.all(np.diff(offsets)[valid] == 32):
+            raise ValueError("UUID column holds values that are not 32 hex digits")
+        buf = hexed.buffers()[2]
+        hex_bytes = bytes(buf)[offsets[0] : offsets[-1]] if buf is not None else b""
+        data = np.frombuffer(bytes.fromhex(hex_bytes.decode("ascii")), np.uint8)
+        lengths = np.where(valid, 16, -1).astype(np.int64)
+        sizes = np.maximum(lengths, 0)
+        return lengths, np.cumsum(sizes) - sizes, data, None
+    raise TypeError(f"No binary COPY encoder for {pg_type}")
+
+
+def _scatter(out, dest, src_starts, lengths, data):
+    """Copy data[src_starts[i] : src_starts[i] + lengths[i]] to out[dest[i]:] for all i."""
+    total = int(lengths.sum())
+    if total == 0:
+        return
+    before = np.cumsum(lengths) - lengths
+    within = np.arange(total, dtype=np.int64) - np.repeat(before, lengths)
+    out[np.repeat(dest, lengths) + within] = data[
+        np.repeat(src_starts, lengths) + within
+    ]
+
+
+def encode_batch(batch: pa.RecordBatch, pg_types) -> bytes:
+    """Encode a record batch as binary COPY tuples (no header/trailer)."""
+    n, n_fields = batch.num_rows, batch.num_columns
+    fields = []
+    for i, pg_type in enumerate(pg_types):
+        lengths, starts, data, prefix = _field_bytes(batch.column(i), pg_type)
+        value_size = np.maximum(lengths, 0)
+        if prefix is not None:  # on-wire length includes the prefix byte
+            lengths = np.where(lengths >= 0, lengths + 1, -1)
+        fields.append((lengths, starts, data, prefix, value_size))
+
+    row_size = 2 + sum(4 + np.maximum(f[0], 0) for f in fields)
+    row_start = np.cumsum(row_size) - row_size
+    out = np.empty(int(row_size.sum()), dtype=np.uint8)
+
+    header = np.array([n_fields], dtype=">i2").view(np.uint8)
+    out[row_start[:, None] + np.arange(2)] = header
+    pos = row_start + 2
+    for lengths, starts, data, prefix, value_size in fields:
+        out[pos[:, None] + np.arange(4)] = (
+            lengths.astype(">i4").view(np.uint8).reshape(n, 4)
+        )
+        value_pos = pos + 4
+        if prefix is not None:
+            out[value_pos[lengths >= 0]] = prefix
+            value_pos = value_pos + (lengths >= 0)
+        _scatter(out, value_pos, starts, value_size, data)
+        pos = value_pos + value_size
+    return out.tobytes()
+
+
+def copy_binary(cur, table: str, schema: pa.Schema, batches, types) -> int:
+    """Stream record batches into `table` with COPY ... (FORMAT BINARY)."""
+    staged = 0
+    cols = ", ".join(schema.names)
+    with cur.copy(f"COPY {table} ({cols}) FROM STDIN (FORMAT BINARY)") as copy:
+        copy.write(COPY_HEADER)
+        for batch in batches:
+            copy.write(encode_batch(batch, types))
+            staged += batch.num_rows
+        copy.write(COPY_TRAILER)
+    return staged
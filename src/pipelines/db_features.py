@@ -0,0 +1,456 @@
+"""
+Training features straight from Postgres: binary COPY -> Arrow record batches.
+
+- A source is a label snapshot (churn_labels at one label_date, Telco
+  features pulled out of `attributes` the way score.py does) or any SQL
+  query returning feature columns plus the target
+- Snapshot features are point-in-time when churn.customer_history exists
+  (sql/004_customer_history.sql): each label gets the attributes version
+  valid at the start of its label_date, via training_sets' as-of join.
+  Without it they come from the current churn.customers row, which leaks
+  any change made after the label_date (a warning says so)
+- The query runs once, as COPY (...) TO STDOUT (FORMAT BINARY). Its first
+  output column is each row's own byte offset in the stream, a running sum
+  of the row sizes computed by the server. Rows are found by matching that
+  self-referencing marker over the whole buffer, then every field of every
+  row is located with vectorized NumPy, field by field. The only per-row
+  Python work is appending each CopyData message to the buffer
+- Memory: the raw stream is decoded BATCH_BYTES at a time, never held
+  whole. read_query keeps every decoded batch (text dictionary-encoded) to
+  return one table, so its peak is about the Arrow size of the result;
+  iter_query yields the batches instead, and write_query streams them to
+  parquet. With a cache dir, load_features writes a query or a
+  current-attributes snapshot that way, holding one batch at a time; the
+  point-in-time snapshot needs its history and labels tables whole for the
+  as-of join
+- Fixed-width types (bool, ints, floats, date; numeric as float8) become
+  Arrow arrays with their null masks; everything else is cast to text and
+  arrives dictionary-encoded (pandas `category`, as archive_to_parquet
+  writes it)
+- Optional local parquet cache: <cache_dir>/<key>.parquet, where the key
+  hashes the snapshot date (or query text), the target name, the newest
+  customers.updated_at and, for a snapshot, the label count and newest
+  inserted_at of that label_date (plus the count and newest recorded_at of
+  the history versions valid by then). Reloaded labels or customers make a
+  new key; nothing is read from the database but those watermarks on a hit
+
+Binary COPY layout: an 11-byte signature, int32 flags, int32 header
+extension length (+ extension), then per row an int16 field count and per
+field an int32 byte length (-1 = NULL) and the value; -1 as the field count
+ends the data.
+"""
+
+import hashlib
+import os
+import warnings
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg import sql
+
+from src import db
+from src.pipelines.arrow_input import COPY_HEADER, PG_EPOCH_DAYS
+from src.pipelines.score import feature_exprs
+
+# Telco fields in archive CSV order (archive_to_parquet's column order)
+TELCO_FEATURES = [
+    "gender",
+    "SeniorCitizen",
+    "Partner",
+    "Dependents",
+    "tenure",
+    "PhoneService",
+    "MultipleLines",
+    "InternetService",
+    "OnlineSecurity",
+    "OnlineBackup",
+    "DeviceProtection",
+    "TechSupport",
+    "StreamingTV",
+    "StreamingMovies",
+    "Contract",
+    "PaperlessBilling",
+    "PaymentMethod",
+    "MonthlyCharges",
+    "TotalCharges",
+]
+TELCO_NUMERIC = ["SeniorCitizen", "tenure", "MonthlyCharges", "TotalCharges"]
+
+# type OID -> (SQL type sent, big-endian NumPy dtype, Arrow type)
+FIXED_TYPES = {
+    16: ("boolean", ">u1", pa.bool_()),
+    21: ("int2", ">i2", pa.int16()),
+    23: ("int4", ">i4", pa.int32()),
+    20: ("int8", ">i8", pa.int64()),
+    700: ("float4", ">f4", pa.float32()),
+    701: ("float8", ">f8", pa.float64()),
+    1700: ("float8", ">f8", pa.float64()),  # numeric
+    1082: ("date", ">i4", pa.date32()),
+}
+BATCH_BYTES = 1 << 20  # per decoded batch; larger batches stop fitting in cache
+
+
+def snapshot_query(snapshot_date, target: str = "churned") -> sql.Composed:
+    """
+    Telco features and the label of every customer labelled on snapshot_date,
+    features from the *current* customers row (not point-in-time; see
+    snapshot_as_of for the history-based read).
+    """
+    numeric = [c for c in TELCO_FEATURES if c in TELCO_NUMERIC]
+    categorical = [c for c in TELCO_FEATURES if c not in TELCO_NUMERIC]
+    exprs = dict(zip(numeric + categorical, feature_exprs(numeric, categorical)))
+    # label_date = literal: the planner reads one partition
+    return sql.SQL(
+        "SELECT {}, l.label::int4 AS {} FROM churn.churn_labels l "
+        "JOIN churn.customers c USING (customer_id) WHERE l.label_date = {}"
+    ).format(
+        sql.SQL(", ").join(exprs[c] for c in TELCO_FEATURES),
+        sql.Identifier(target),
+        sql.Literal(snapshot_date),
+    )
+
+
+def _describe(cur, query) -> list[tuple[str, int]]:
+    cur.execute(sql.SQL("SELECT * FROM ({}) q LIMIT 0").format(query))
+    columns = [(d.name, d.type_code) for d in cur.description]
+    names = [name for name, _ in columns]
+    if len(set(names)) != len(names):
+        raise ValueError(f"query returns duplicate column names: {names}")
+    return columns
+
+
+def copy_query(query, columns) -> tuple[sql.Composed, list]:
+    """
+    COPY statement for `query` with the row-offset column in front, and the
+    layout of the remaining fields: [(name, NumPy dtype or None for text,
+    Arrow type)].
+    """
+    select, sizes, layout = [], [], []
+    for name, oid in columns:
+        col = sql.SQL("q.{}").format(sql.Identifier(name))
+        if oid in FIXED_TYPES:
+            pg_type, dtype, arrow_type = FIXED_TYPES[oid]
+            value = sql.SQL("{}::{}").format(col, sql.SQL(pg_type))
+            size = sql.SQL("CASE WHEN {} IS NULL THEN 0 ELSE {} END").format(
+                col, sql.Literal(np.dtype(dtype).itemsize)
+            )
+            layout.append((name, dtype, arrow_type))
+        else:
+            value = sql.SQL("{}::text").format(col)
+            size = sql.SQL("coalesce(octet_length({}), 0)").format(value)
+            layout.append((name, None, pa.string()))
+        select.append(value)
+        sizes.append(size)
+    # field count + (length word + value) per field, the offset being int8
+    fixed = 2 + 4 * (len(columns) + 1) + 8
+    row_size = sql.SQL(" + ").join([sql.Literal(fixed)] + sizes)
+    offset = sql.SQL(
+        "coalesce(sum({}) OVER (ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)"
+        "::int8"
+    ).format(row_size)
+    # OFFSET 0 keeps the query a subquery, so its expressions run once per row
+    statement = sql.SQL(
+        "COPY (SELECT {}, {} FROM ({} OFFSET 0) q) TO STDOUT (FORMAT BINARY)"
+    ).format(offset, sql.SQL(", ").join(select), query)
+    return statement, layout
+
+
+def _at(data: np.ndarray, pos: np.ndarray, dtype) -> np.ndarray:
+    """The `dtype` value starting at each byte position of data."""
+    dtype = np.dtype(dtype)
+    # Overlapping view: element i is the value at byte i (unaligned reads)
+    view = np.ndarray(
+        (max(len(data) - dtype.itemsize + 1, 0),), dtype, data, strides=(1,)
+    )
+    return view[pos]
+
+
+def find_rows(data: np.ndarray, base: int, n_fields: int) -> np.ndarray:
+    """
+    Start of every row in data whose marker (field count, int8 length word,
+    offset) says it begins at base + its position.
+    """
+    marker = np.array([n_fields >> 8, n_fields & 0xFF, 0, 0, 0, 8], np.uint8)
+    n = len(data) - 14
+    if n < 0:
+        return np.empty(0, np.int64)
+    hit = data[:n] == marker[0]
+    for j in range(1, len(marker)):
+        hit &= data[j : n + j] == marker[j]
+    candidates = np.flatnonzero(hit)
+    return candidates[_at(data, candidates + 6, ">i8") == candidates + base]
+
+
+def _walk(data: np.ndarray, starts: np.ndarray, n_fields: int):
+    """(length, value position) of every field of the rows at `starts`, and the row ends."""
+    pos = starts + 2
+    fields = []
+    for _ in range(n_fields):
+        length = _at(data, pos, ">i4").astype(np.int64)
+        fields.append((length, pos + 4))
+        pos = pos + 4 + np.maximum(length, 0)
+    return fields, pos
+
+
+def _column(data, length, pos, dtype, arrow_type) -> pa.Array:
+    valid = length >= 0
+    n = len(length)
+    if dtype is None:
+        sizes = np.maximum(length, 0)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        # byte k of the column is data[pos[i] + k - offsets[i]] for its row i
+        shift = np.repeat(pos - offsets[:-1], sizes)
+        chars = data[shift + np.arange(offsets[-1], dtype=np.int64)]
+        strings = pa.LargeStringArray.from_buffers(
+            n,
+            pa.py_buffer(offsets),
+            pa.py_buffer(chars),
+            pa.py_buffer(np.packbits(valid, bitorder="little")),
+        )
+        return strings.cast(pa.string()).dictionary_encode()
+    if not np.all(length[valid] == np.dtype(dtype).itemsize):
+        raise ValueError(f"unexpected field width for {dtype}")
+    values = np.zeros(n, np.dtype(dtype).newbyteorder("="))
+    values[valid] = _at(data, pos[valid], dtype)
+    if arrow_type == pa.bool_():
+        values = values.astype(bool)
+    elif arrow_type == pa.date32():
+        values = values + PG_EPOCH_DAYS
+    return pa.array(values, type=arrow_type, mask=~valid)
+
+
+def _rows(data: np.ndarray, base: int, n_fields: int, end: int):
+    """
+    (starts, fields) of the complete rows before `end`. The marker matches
+    are checked against the row ends they imply; if one was a false hit (the
+    marker bytes inside a text value) the rows are walked one at a time.
+    """
+    starts = find_rows(data, base, n_fields)
+    starts = starts[starts < end]
+    fields, ends = _walk(data, starts, n_fields)
+    if len(starts) and starts[0] == 0 and np.array_equal(ends[:-1], starts[1:]):
+        if ends[-1] == end:
+            return starts, fields
+    walked, pos = [], 0
+    while pos < end:
+        walked.append(pos)
+        pos = int(_walk(data, np.array([pos]), n_fields)[1][0])
+    if pos != end:
+        raise ValueError("COPY rows do not line up with the stream")
+    starts = np.array(walked, np.int64)
+    return starts, _walk(data, starts, n_fields)[0]
+
+
+def decode_rows(data: np.ndarray, fields, layout) -> pa.RecordBatch:
+    """Arrow batch from the walked fields (the offset column is dropped)."""
+    arrays = [
+        _column(data, length, pos, dtype, arrow_type)
+        for (length, pos), (_, dtype, arrow_type) in zip(fields[1:], layout)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=[name for name, _, _ in layout])
+
+
+def iter_copy_batches(
+    chunks, layout, batch_bytes: int = BATCH_BYTES
+) -> Iterator[pa.RecordBatch]:
+    """Record batches from the raw binary COPY stream `chunks` (bytes-likes)."""
+    n_fields = len(layout) + 1
+    buf = bytearray()
+    header = None
+    base = 0  # stream offset of buf[0] (rows counted from the first one)
+    for chunk in chunks:
+        buf += chunk
+        if header is None:
+            if len(buf) < len(COPY_HEADER):
+                continue
+            if not buf.startswith(COPY_HEADER[:11]):
+                raise ValueError("not a binary COPY stream")
+            header = 19 + int.from_bytes(buf[15:19], "big")
+            del buf[:header]
+        if len(buf) < batch_bytes:
+            continue
+        data = np.frombuffer(buf, np.uint8)
+        starts = find_rows(data, base, n_fields)
+        if len(starts) < 2:
+            del data  # buf cannot grow while a view of it is alive
+            continue
+        # The last row found may still be incomplete: keep it for later
+        last = int(starts[-1])
+        batch = decode_rows(data, _rows(data, base, n_fields, last)[1], layout)
+        del data
+        yield batch
+        del buf[:last]
+        base += last
+    if header is None:
+        raise ValueError("empty COPY stream")
+    if buf[-2:] != b"\xff\xff":
+        raise ValueError("truncated COPY stream")
+    data = np.frombuffer(buf, np.uint8)
+    starts, fields = _rows(data, base, n_fields, len(data) - 2)
+    if len(starts):
+        yield decode_rows(data, fields, layout)
+
+
+def iter_query(conn, query, batch_bytes: int = BATCH_BYTES) -> Iterator[pa.RecordBatch]:
+    """Run `query` once and yield its rows as Arrow record batches via binary COPY."""
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL client_encoding TO 'UTF8'")
+        columns = _describe(cur, query)
+        statement, layout = copy_query(query, columns)
+        with cur.copy(statement) as copy:
+            yield from iter_copy_batches(copy, layout, batch_bytes)
+
+
+def read_query(conn, query, batch_bytes: int = BATCH_BYTES) -> pa.Table:
+    """All rows of `query` as one Arrow table (held in memory; see iter_query)."""
+    batches = list(iter_query(conn, query, batch_bytes))
+    if not batches:
+        raise ValueError("query returned no rows")
+    return pa.Table.from_batches(batches).unify_dictionaries()
+
+
+def write_query(conn, query, path, batch_bytes: int = BATCH_BYTES) -> int:
+    """
+    Stream the rows of `query` into the parquet file `path`, one batch at a
+    time, and return the row count. Written to a temporary name and renamed,
+    so concurrent runs never read half a file.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    writer, rows = None, 0
+    try:
+        for batch in iter_query(conn, query, batch_bytes):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, batch.schema, compression="zstd")
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        if writer is None:
+            raise ValueError("query returned no rows")
+        writer.close()
+        os.replace(tmp, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    return rows
+
+
+def has_history(cur) -> bool:
+    cur.execute("SELECT to_regclass('churn.customer_history') IS NOT NULL")
+    return cur.fetchone()[0]
+
+
+def snapshot_as_of(conn, snapshot_date, target: str = "churned") -> pa.Table:
+    """
+    Telco features as they were at the start of snapshot_date plus the label,
+    for every customer labelled on it (from churn.customer_history; labels of
+    customers with no version by then are dropped, as in training sets).
+    """
+    # training_sets builds on this module; import here to avoid the cycle
+    from src.pipelines import training_sets
+
+    history = read_query(
+        conn, training_sets.history_query(snapshot_date, labelled_on=snapshot_date)
+    )
+    conn.rollback()
+    labels = read_query(conn, training_sets.labels_query([snapshot_date], target))
+    conn.rollback()
+    joined = training_sets.join_snapshots(history, labels, target)
+    return joined.drop_columns(["label_date"])
+
+
+def _fingerprint(cur, snapshot_date, history: bool) -> list:
+    cur.execute("SELECT max(updated_at)::text FROM churn.customers")
+    marks = [cur.fetchone()[0]]
+    if snapshot_date is not None:
+        cur.execute(
+            "SELECT count(*), max(inserted_at)::text FROM churn.churn_labels "
+            "WHERE label_date = %s",
+            (snapshot_date,),
+        )
+        marks += list(cur.fetchone())
+        if history:
+            cur.execute(
+                "SELECT count(*), max(recorded_at)::text "
+                "FROM churn.customer_history "
+                "WHERE valid_from <= (%s::date::timestamp AT TIME ZONE 'UTC')",
+                (snapshot_date,),
+            )
+            marks += ["history"] + list(cur.fetchone())
+    return marks
+
+
+def resolve_snapshot(cur, snapshot: str):
+    """'latest' -> churn.latest_label_date(); otherwise the date as given."""
+    if snapshot != "latest":
+        return snapshot
+    cur.execute("SELECT churn.latest_label_date()::text")
+    latest = cur.fetchone()[0]
+    if latest is None:
+        raise ValueError("churn.churn_labels has no labels")
+    return latest
+
+
+def load_features(
+    snapshot: Optional[str] = None,
+    query: Optional[str] = None,
+    target: str = "churned",
+    cache_dir: Optional[str] = None,
+) -> tuple[Optional[pa.Table], Optional[Path], str]:
+    """
+    (table, cache path, source description). With cache_dir the features are
+    (or already were) written to the cache parquet and the table is None:
+    read the path instead, so --sample only decodes what it needs.
+    """
+    if (snapshot is None) == (query is None):
+        raise ValueError("pass exactly one of snapshot or query")
+    with db.connection() as conn, conn.cursor() as cur:
+        history = False
+        if snapshot is not None:
+            snapshot = resolve_snapshot(cur, snapshot)
+            source = f"postgres:snapshot={snapshot}"
+            history = has_history(cur)
+            if not history:
+                warnings.warn(
+                    "churn.customer_history not found (apply "
+                    "sql/004_customer_history.sql): --db-snapshot uses the "
+                    "current customer attributes, which may postdate the labels",
+                    stacklevel=2,
+                )
+                source += ",current-attributes"
+            statement = snapshot_query(snapshot, target)
+        else:
+            source = "postgres:query"
+            statement = sql.SQL(query.strip().rstrip(";"))
+
+        path = None
+        if cache_dir:
+            marks = _fingerprint(cur, snapshot, history)
+            key = hashlib.blake2b(
+                repr([snapshot, query, target, marks]).encode("utf-8"),
+                digest_size=16,
+            ).hexdigest()
+            path = Path(cache_dir) / f"{key}.parquet"
+            if path.exists():
+                return None, path, source
+            path.parent.mkdir(parents=True, exist_ok=True)
+        conn.rollback()  # the COPY transaction starts fresh
+        if history:
+            table = snapshot_as_of(conn, snapshot, target)
+        elif path is not None:
+            # straight from the COPY stream to the cache, one batch in memory
+            write_query(conn, statement, path)
+            return None, path, source
+        else:
+            table = read_query(conn, statement)
+
+    if path is None:
+        return table, None, source
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)  # concurrent runs never read half a file
+    return None, path, source
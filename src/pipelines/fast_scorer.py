@@ -0,0 +1,272 @@
+"""
+Compile a fitted baseline pipeline into lookup tables for low-latency scoring.
+
+Pipeline.predict_proba on one row goes through pandas, the ColumnTransformer,
+SimpleImputer and OneHotEncoder; for a linear model the same score is
+
+    z = intercept + sum_j w_j * scale_j(fill_j(x_j)) + sum_c w[index_c[x_c]]
+
+so FastScorer keeps only:
+- numeric columns: imputation fill values, with any MaxAbsScaler /
+  StandardScaler folded into the weights and intercept
+- categorical columns: imputation fill value and a category -> position map
+  into one weight vector whose last slot is 0 (unknown category, as
+  handle_unknown="ignore")
+- the classifier's coef_ and intercept_
+
+Supports what train_baseline builds: LogisticRegression or log-loss
+SGDClassifier behind a ColumnTransformer of numeric (imputer [+ scaler]) and
+categorical (imputer + OneHotEncoder) pipelines. Anything else raises
+ValueError. Missing values follow the pipeline on a DataFrame built from the
+same records: absent keys and NaN / None numerics are imputed, while an
+explicit None in a categorical column is a category of its own (unknown
+unless the training data had it).
+
+Saved form (save() / load(), written by train_baseline as <outdir>/scorer/):
+- manifest.json            column lists, imputation fills, categories,
+                           intercept and the blake2b of model.pkl
+- numeric_fill.npy, numeric_weights.npy, categorical_weights.npy
+                           loaded with mmap_mode="r": no unpickling, and
+                           every process maps the same page-cache copy
+to_pipeline() rebuilds an equivalent sklearn Pipeline (imputers, one-hot
+encoder, LogisticRegression with the folded weights) for DataFrame callers.
+scikit-learn and pandas are imported only by from_pipeline() / to_pipeline(),
+so a process that just loads and scores needs nothing beyond NumPy.
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ARRAYS = ("numeric_fill", "numeric_weights", "categorical_weights")
+
+
+def _steps(transformer):
+    if hasattr(transformer, "steps"):  # a Pipeline
+        return [s for _, s in transformer.steps]
+    return [transformer]
+
+
+def _is_nan(v) -> bool:
+    return isinstance(v, float) and math.isnan(v)
+
+
+class FastScorer:
+    def __init__(
+        self,
+        numeric_cols: list[str],
+        numeric_fill: np.ndarray,
+        numeric_weights: np.ndarray,
+        categorical_cols: list[str],
+        categorical_fill: list,
+        categories: list[list],
+        categorical_weights: np.ndarray,
+        intercept: float,
+    ):
+        self.numeric_cols = numeric_cols
+        self.numeric_fill = np.asarray(numeric_fill, dtype=np.float64)
+        self.numeric_weights = np.asarray(numeric_weights, dtype=np.float64)
+        self.categorical_cols = categorical_cols
+        self.categorical_fill = categorical_fill
+        self.categories = categories
+        # One weight per category, then a 0 where unknown categories point
+        self.categorical_weights = np.asarray(categorical_weights, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.unknown = len(self.categorical_weights) - 1
+        self.meta = {}  # manifest.json contents when loaded from disk
+        self.index = []
+        offset = 0
+        for cats in categories:
+            self.index.append({c: offset + i for i, c in enumerate(cats)})
+            offset += len(cats)
+
+    @classmethod
+    def from_pipeline(cls, pipe) -> "FastScorer":
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import MaxAbsScaler, OneHotEncoder, StandardScaler
+
+        prep, clf = pipe.steps[0][1], pipe.steps[-1][1]
+        if not isinstance(prep, ColumnTransformer):
+            raise ValueError("expected a ColumnTransformer as the first step")
+        if getattr(clf, "loss", "log_loss") != "log_loss" or clf.coef_.shape[0] != 1:
+            raise ValueError(
+                f"cannot compile {type(clf).__name__}: not binary log-loss"
+            )
+        if list(clf.classes_) != [0, 1]:
+            raise ValueError(f"expected classes [0, 1], got {list(clf.classes_)}")
+        coef = clf.coef_.ravel()
+        intercept = float(clf.intercept_[0])
+
+        numeric_cols, numeric_fill, numeric_weights = [], [], []
+        categorical_cols, categorical_fill, categories, cat_weights = [], [], [], []
+        for name, transformer, cols in prep.transformers_:
+            block = prep.output_indices_[name]
+            if transformer == "drop" or block.stop == block.start:
+                continue
+            steps = _steps(transformer)
+            imputer = steps[0] if isinstance(steps[0], SimpleImputer) else None
+            fill = imputer.statistics_ if imputer else [np.nan] * len(cols)
+            w = coef[block]
+            if isinstance(steps[-1], OneHotEncoder):
+                encoder = steps[-1]
+                if encoder.drop_idx_ is not None or len(steps) > 2:
+                    raise ValueError(f"cannot compile categorical block '{name}'")
+                categorical_cols += list(cols)
+                categorical_fill += [
+                    v.item() if hasattr(v, "item") else v for v in fill
+                ]
+                categories += [c.tolist() for c in encoder.categories_]
+                cat_weights.append(w)
+                continue
+            scale, shift = np.ones(len(cols)), np.zeros(len(cols))
+            for step in steps[1 if imputer else 0 :]:
+                if isinstance(step, MaxAbsScaler):
+                    scale = scale / step.scale_
+                    shift = shift / step.scale_
+                elif isinstance(step, StandardScaler):
+                    mean = step.mean_ if step.with_mean else 0.0
+                    std = step.scale_ if step.with_std else 1.0
+                    scale, shift = scale / std, (shift - mean) / std
+                else:
+                    raise ValueError(f"cannot compile step {type(step).__name__}")
+            # w * (scale * x + shift) = (w * scale) * x + w * shift
+            numeric_cols += list(cols)
+            numeric_fill += [float(v) for v in fill]
+            numeric_weights.append(w * scale)
+            intercept += float(w @ shift)
+
+        return cls(
+            numeric_cols,
+            np.array(numeric_fill),
+            np.concatenate(numeric_weights) if numeric_weights else np.zeros(0),
+            categorical_cols,
+            categorical_fill,
+            categories,
+            np.append(np.concatenate(cat_weights) if cat_weights else [], 0.0),
+            intercept,
+        )
+
+    def save(self, outdir, **meta) -> None:
+        """Write the arrays, then manifest.json (its presence marks a complete save)."""
+        out = Path(outdir)
+        out.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(out / f"{name}.npy", getattr(self, name))
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "numeric_cols": self.numeric_cols,
+            "categorical_cols": self.categorical_cols,
+            "categorical_fill": self.categorical_fill,
+            "categories": self.categories,
+            "intercept": self.intercept,
+            **meta,
+        }
+        (out / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+    @classmethod
+    def load(cls, path, mmap: bool = True) -> "FastScorer":
+        """Scorer saved by save(); arrays are memory-mapped read-only by default."""
+        path = Path(path)
+        manifest = json.loads((path / MANIFEST).read_text())
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"{path}: scorer format {manifest.get('format_version')}, "
+                f"expected {FORMAT_VERSION}"
+            )
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in ARRAYS
+        }
+        scorer = cls(
+            numeric_cols=manifest["numeric_cols"],
+            categorical_cols=manifest["categorical_cols"],
+            categorical_fill=manifest["categorical_fill"],
+            categories=manifest["categories"],
+            intercept=manifest["intercept"],
+            **arrays,
+        )
+        scorer.meta = manifest
+        return scorer
+
+    def to_pipeline(self):
+        """
+        Fitted Pipeline with the same predict_proba: median / most-frequent
+        imputers fitted on one row of fill values (so they learn exactly those),
+        a one-hot encoder with fixed categories, and a LogisticRegression
+        holding the folded weights (numeric scaling is already in them).
+        """
+        import pandas as pd
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder
+
+        prep = ColumnTransformer(
+            transformers=[
+                ("num", SimpleImputer(strategy="median"), self.numeric_cols),
+                (
+                    "cat",
+                    Pipeline(
+                        steps=[
+                            ("imputer", SimpleImputer(strategy="most_frequent")),
+                            (
+                                "onehot",
+                                OneHotEncoder(
+                                    categories=self.categories,
+                                    handle_unknown="ignore",
+                                ),
+                            ),
+                        ]
+                    ),
+                    self.categorical_cols,
+                ),
+            ],
+            remainder="drop",
+            verbose_feature_names_out=False,
+        )
+        fills = pd.DataFrame(
+            {c: [v] for c, v in zip(self.numeric_cols, self.numeric_fill)}
+            | {
+                c: pd.Series([v], dtype=object)
+                for c, v in zip(self.categorical_cols, self.categorical_fill)
+            }
+        )
+        prep.fit(fills)
+        weights = np.concatenate([self.numeric_weights, self.categorical_weights[:-1]])
+        clf = LogisticRegression()
+        clf.classes_ = np.array([0, 1])
+        clf.coef_ = weights.reshape(1, -1)
+        clf.intercept_ = np.array([self.intercept])
+        clf.n_features_in_ = len(weights)
+        return Pipeline(steps=[("prep", prep), ("clf", clf)])
+
+    def decision_function(self, rows: list[dict]) -> np.ndarray:
+        n = len(rows)
+        z = np.full(n, self.intercept)
+        if self.numeric_cols:
+            X = np.array(
+                [[r.get(c, np.nan) for c in self.numeric_cols] for r in rows],
+                dtype=np.float64,
+            )
+            X = np.where(np.isnan(X), self.numeric_fill, X)
+            z += X @ self.numeric_weights
+        if self.categorical_cols:
+            idx = np.empty((n, len(self.categorical_cols)), dtype=np.intp)
+            for j, (c, index, fill) in enumerate(
+                zip(self.categorical_cols, self.index, self.categorical_fill)
+            ):
+                for i, r in enumerate(rows):
+                    v = r.get(c, np.nan)  # absent key = NaN, as in a DataFrame
+                    idx[i, j] = index.get(fill if _is_nan(v) else v, self.unknown)
+            z += self.categorical_weights[idx].sum(axis=1)
+        return z
+
+    def predict_proba(self, rows: list[dict]) -> np.ndarray:
+        """P(churn) per row (the pipeline's predict_proba(...)[:, 1])."""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(rows)))
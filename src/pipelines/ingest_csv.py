@@ -1,19 +1,47 @@
 """
 CSV → Postgres loader for the churn project.
 
-- Reads .env for DB connection: PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD
+- Connects through the shared pool in src/db.py (POSTGRES_* settings)
 - Loads CSVs from data/raw/: customers.csv, churn_labels.csv
 - Upserts customers by external_id
+- `--mode copy` streams rows into temp staging tables with COPY FROM STDIN and
+  merges them with one set-based statement per table (same upsert semantics)
+- `--chunk-size N` streams each file in N-row chunks with a commit per chunk;
+  `--checkpoint PATH` records committed byte offsets so a crashed load resumes
+- `--delta` compares each row's content hash with churn.customers.row_hash and
+  only sends new or changed customers to the database
+- `--workers N` parses N byte ranges of each file in parallel, routes the rows
+  by a hash of external_id and loads the shards concurrently over N
+  connections (customers first, then labels)
+- Also accepts typed Parquet / Arrow IPC inputs (customers.parquet, ...; see
+  arrow_input.py), which are binary-COPYed without text parsing or casting
+- `--valid-from DATE` stamps the customer_history versions the load writes
+  (sql/004_customer_history.sql) with the extract's date instead of now
+- Labels go straight into their monthly partition of churn.churn_labels
+  (created on demand); `--full-refresh` drops only the partitions covered by
+  the label input instead of truncating every snapshot
+- `--stats-json PATH` writes row counts, wall time, time per phase and peak RSS
+  (used by scripts/bench_ingest.py)
 """
 
 import argparse
 import csv
+import datetime as dt
+import hashlib
+import json
 import os
+import pickle
+import resource
+import tempfile
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-import psycopg2
-from psycopg2.extras import execute_values
-from dotenv import load_dotenv
+from src import db
+from src.pipelines import arrow_input
 
 REQUIRED_FILES = {
     "customers": "customers.csv",
@@ -34,18 +62,77 @@ CUSTOMERS_COLS = [
 
 CHURN_COLS = ["external_id", "label", "label_date", "reason_code", "notes"]
 
+TABLE_COLS = {"customers": CUSTOMERS_COLS, "churn_labels": CHURN_COLS}
+
+ARROW_SCHEMAS = {
+    "customers": arrow_input.CUSTOMERS_SCHEMA,
+    "churn_labels": arrow_input.CHURN_SCHEMA,
+}
+
+
+class PhaseTimer:
+    """
+    Accumulates wall time per load phase. Phases nest: entering an inner phase
+    pauses the outer one, so every second is charged to exactly one phase
+    (e.g. parsing a typed batch while it is being COPYed counts as parse).
+    """
+
+    def __init__(self):
+        self.seconds = Counter()
+        self._stack = []
+        self._mark = 0.0
+
+    def _switch(self):
+        now = time.perf_counter()
+        if self._stack:
+            self.seconds[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def phase(self, name):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def timed(self, iterable, name):
+        """Charge the time spent producing each item of `iterable` to `name`."""
+        it = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def reset(self):
+        self.seconds.clear()
 
-def connect_from_env():
-    load_dotenv(override=True)
-    conn = psycopg2.connect(
-        host=os.getenv("PGHOST", "localhost"),
-        port=os.getenv("PGPORT", "5432"),
-        dbname=os.getenv("PGDATABASE", "postgres"),
-        user=os.getenv("PGUSER", "postgres"),
-        password=os.getenv("PGPASSWORD", "postgres"),
-    )
-    conn.autocommit = False
-    return conn
+
+# Phases: parse, spool (--workers: rows passed from parse to load workers),
+# delta_filter, customer_upsert, label_load (rows sent to the server),
+# partitions (label partition lookup/creation), id_mapping (external_id
+# resolution + label merge), commit.
+PHASES = PhaseTimer()
+
+
+def resolve_inputs(data_dir: Path):
+    """
+    Map each table to its input file: the CSV if present, otherwise the first
+    typed input found (e.g. customers.parquet). Missing inputs map to the CSV path.
+    """
+    files = {}
+    for name, csv_name in REQUIRED_FILES.items():
+        path = data_dir / csv_name
+        if not path.exists():
+            typed = (data_dir / f"{name}{sfx}" for sfx in arrow_input.ARROW_SUFFIXES)
+            path = next((p for p in typed if p.exists()), path)
+        files[name] = path
+    return files
 
 
 def read_csv_rows(path: Path):
@@ -53,6 +140,77 @@ def read_csv_rows(path: Path):
         return list(csv.DictReader(f))
 
 
+def read_csv_header(path: Path):
+    with path.open("r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def iter_csv_rows(path: Path, offset: int = 0, end=None):
+    """
+    Stream rows as dicts (DictReader semantics), starting at byte `offset`
+    and, with `end` (a record boundary, see shard_ranges), stopping there.
+    Yields (row, end_offset) where end_offset is the byte position just after
+    the record, i.e. a safe place to resume from.
+    """
+    header = read_csv_header(path)
+    with path.open("rb") as f:
+        if offset:
+            f.seek(offset)
+        else:
+            f.readline()  # header
+        lines = iter(f.readline, b"")
+        if end is not None:
+            lines = iter(lambda: f.readline() if f.tell() < end else b"", b"")
+        # csv.reader pulls whole lines, so f.tell() sits on a record boundary
+        for rec in csv.reader(line.decode("utf-8") for line in lines):
+            if not rec:
+                continue
+            yield dict(zip(header, rec)), f.tell()
+
+
+def iter_chunks(path: Path, offset: int, size: int):
+    """Group iter_csv_rows into lists of `size` rows; yields (rows, end_offset)."""
+    chunk, end = [], offset
+    for row, end in iter_csv_rows(path, offset):
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk, end
+            chunk = []
+    if chunk:
+        yield chunk, end
+
+
+def _file_identity(path: Path):
+    st = path.stat()
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_checkpoint(path, files):
+    """
+    Return the saved per-file progress, or {} when there is nothing to resume.
+    Refuses to resume if an input file changed since the checkpoint was written.
+    """
+    if path is None or not path.exists():
+        return {}
+    state = json.loads(path.read_text())
+    for name, progress in state.items():
+        ident = _file_identity(files[name]) if files[name].exists() else None
+        if ident != progress.get("file"):
+            raise ValueError(
+                f"Checkpoint {path} does not match current {files[name].name}; "
+                "delete it to restart the load."
+            )
+    return state
+
+
+def save_checkpoint(path, state):
+    if path is None:
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)  # atomic: a crash never leaves a torn checkpoint
+
+
 def ensure_columns(rows, required, file):
     if rows and any(col not in rows[0] for col in required):
         missing = [c for c in required if c not in rows[0]]
@@ -74,13 +232,14 @@ def upsert_customers(cur, rows):
                 r.get("plan_tier"),
                 r.get("is_active"),
                 attrs,
+                row_hash(r),
             ]
         )
     sql = """
         INSERT INTO churn.customers (
             external_id, created_at, signup_source, country, region, city, plan_tier,
-            is_active, attributes
-        ) VALUES %s
+            is_active, attributes, row_hash
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT (external_id) DO UPDATE SET
             created_at = EXCLUDED.created_at,
             signup_source = EXCLUDED.signup_source,
@@ -90,92 +249,794 @@ def upsert_customers(cur, rows):
             plan_tier = EXCLUDED.plan_tier,
             is_active = EXCLUDED.is_active,
             attributes = EXCLUDED.attributes,
+            row_hash = EXCLUDED.row_hash,
             updated_at = NOW();
     """
-    execute_values(cur, sql, values, page_size=500)
+    # psycopg pipelines executemany, so this is not one round trip per row
+    with PHASES.phase("customer_upsert"):
+        cur.executemany(sql, values)
 
 
-def map_external_to_uuid(cur):
-    cur.execute(
-        "SELECT external_id, customer_id FROM churn.customers WHERE external_id IS NOT NULL;"
-    )
-    return {ext: uuid for ext, uuid in cur.fetchall()}
+def row_hash(r):
+    """Stable content hash of a customer row (all loader columns, in order)."""
+    payload = json.dumps([r.get(c) for c in CUSTOMERS_COLS], separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
 
 
-def load_churn_labels(cur, rows, ext2uuid):
-    values = []
+def filter_delta(cur, rows):
+    """
+    Drop customers whose content hash matches the stored row_hash, so unchanged
+    rows never reach the upsert. Only external_ids and hashes cross the wire.
+
+    Rows without an external_id, and earlier duplicates of an external_id within
+    the batch, are skipped. Returns (rows_to_write, counts).
+    """
+    counts = Counter(inserted=0, updated=0, unchanged=0, skipped=0)
+    latest = {}
     for r in rows:
-        cust_uuid = ext2uuid.get(r.get("external_id"))
-        if not cust_uuid:
+        ext = r.get("external_id")
+        if not ext:
+            counts["skipped"] += 1
             continue
-        values.append(
-            [
-                cust_uuid,
-                r.get("label"),
-                r.get("label_date"),
-                r.get("reason_code"),
-                r.get("notes"),
-            ]
+        if ext in latest:
+            counts["skipped"] += 1
+        latest[ext] = r
+    if not latest:
+        return [], counts
+
+    with PHASES.phase("delta_filter"):
+        cur.execute(
+            "SELECT external_id, row_hash FROM churn.customers "
+            "WHERE external_id = ANY(%s);",
+            (list(latest),),
+        )
+        stored = dict(cur.fetchall())
+    changed = []
+    for ext, r in latest.items():
+        if ext not in stored:
+            counts["inserted"] += 1
+        elif stored[ext] == row_hash(r):
+            counts["unchanged"] += 1
+            continue
+        else:
+            counts["updated"] += 1
+        changed.append(r)
+    return changed, counts
+
+
+# Resolves staged label rows against churn.customers inside Postgres and merges
+# them, returning (labels written, labels whose external_id matched no customer).
+# {source} is an unnest() of arrays or a staging table exposing CHURN_COLS as
+# text plus an `ord` column giving file order. {target} is churn.churn_labels
+# or one of its partitions (see label_target).
+_MERGE_LABELS_SQL = """
+    WITH resolved AS (
+        SELECT c.customer_id, s.label, s.label_date, s.reason_code, s.notes, s.ord
+        FROM {source}
+        LEFT JOIN churn.customers c ON c.external_id = s.external_id
+    ),
+    merged AS (
+        INSERT INTO {target} (customer_id, label, label_date, reason_code, notes)
+        SELECT DISTINCT ON (customer_id, label_date::date)
+            customer_id, label::boolean, label_date::date, reason_code, notes
+        FROM resolved
+        WHERE customer_id IS NOT NULL
+        ORDER BY customer_id, label_date::date, ord DESC
+        ON CONFLICT (customer_id, label_date) DO UPDATE SET
+          label = EXCLUDED.label,
+          reason_code = EXCLUDED.reason_code,
+          notes = EXCLUDED.notes
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM merged),
+           (SELECT COUNT(*) FROM resolved WHERE customer_id IS NULL);
+"""
+
+
+def label_target(cur, dates_sql, params=()):
+    """
+    Ensure the monthly partitions for a batch's label dates exist and return the
+    table to insert into: the partition itself when the batch falls in a single
+    month (no per-row tuple routing), otherwise the partitioned parent.
+    `dates_sql` is a query yielding the batch's label_date values.
+    """
+    with PHASES.phase("partitions"):
+        cur.execute(
+            "SELECT DISTINCT churn.ensure_label_partition(d::date) "
+            f"FROM ({dates_sql}) AS t(d) WHERE d IS NOT NULL;",
+            params,
         )
-    if values:
-        sql = """
-            INSERT INTO churn.churn_labels (customer_id, label, label_date, reason_code, notes)
-            VALUES %s
-            ON CONFLICT (customer_id, label_date) DO UPDATE SET
-              label = EXCLUDED.label,
-              reason_code = EXCLUDED.reason_code,
-              notes = EXCLUDED.notes;
-        """
-        execute_values(cur, sql, values, page_size=500)
+        parts = [r[0] for r in cur.fetchall()]
+    return parts[0] if len(parts) == 1 else "churn.churn_labels"
 
 
-def truncate_tables(cur):
-    cur.execute("TRUNCATE churn.churn_labels;")
+def load_churn_labels(cur, rows):
+    """
+    Upsert labels, resolving external_id -> customer_id server-side.
+    Returns (loaded, unmatched); unmatched rows are dropped.
 
+    Rows and resolution travel in one statement, so its time is all label_load.
+    """
+    if not rows:
+        return 0, 0
+    # One statement per batch: each column travels as a text[] parameter
+    source = (
+        "unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::text[]) "
+        "WITH ORDINALITY AS s(external_id, label, label_date, reason_code, notes, ord)"
+    )
+    columns = [[r.get(c) for r in rows] for c in CHURN_COLS]
+    dates = sorted(
+        {d for d in columns[CHURN_COLS.index("label_date")] if d is not None}
+    )
+    target = label_target(cur, "SELECT unnest(%s::text[])", (dates,))
+    with PHASES.phase("label_load"):
+        cur.execute(_MERGE_LABELS_SQL.format(source=source, target=target), columns)
+        return cur.fetchone()
+
+
+def copy_into_staging(cur, table, cols, rows):
+    """Create an all-TEXT temp table and COPY rows into it. Returns rows staged."""
+    col_defs = ", ".join(f"{c} TEXT" for c in cols)
+    cur.execute(f"CREATE TEMP TABLE {table} ({col_defs}) ON COMMIT DROP;")
+    staged = 0
+    with cur.copy(f"COPY {table} ({', '.join(cols)}) FROM STDIN") as copy:
+        for r in rows:
+            copy.write_row([r.get(c) for c in cols])
+            staged += 1
+    return staged
+
+
+# Merges staged customers into churn.customers. {source} exposes the loader
+# columns (text or already typed; the casts are no-ops on typed columns), a
+# row_hash and an `ord` column giving file order: the last duplicate wins.
+_MERGE_CUSTOMERS_SQL = """
+    INSERT INTO churn.customers (
+        external_id, created_at, signup_source, country, region, city, plan_tier,
+        is_active, attributes, row_hash
+    )
+    SELECT DISTINCT ON (s.external_id, CASE WHEN s.external_id IS NULL THEN s.ord END)
+        s.external_id, s.created_at::timestamptz, s.signup_source, s.country,
+        s.region, s.city, s.plan_tier, s.is_active::boolean, s.attributes::jsonb,
+        s.row_hash
+    FROM {source}
+    ORDER BY s.external_id, CASE WHEN s.external_id IS NULL THEN s.ord END,
+             s.ord DESC
+    ON CONFLICT (external_id) DO UPDATE SET
+        created_at = EXCLUDED.created_at,
+        signup_source = EXCLUDED.signup_source,
+        country = EXCLUDED.country,
+        region = EXCLUDED.region,
+        city = EXCLUDED.city,
+        plan_tier = EXCLUDED.plan_tier,
+        is_active = EXCLUDED.is_active,
+        attributes = EXCLUDED.attributes,
+        row_hash = EXCLUDED.row_hash,
+        updated_at = NOW();
+"""
+
+
+def copy_customers(cur, rows):
+    """
+    Bulk path for upsert_customers: COPY into staging, then a single merge.
+    Duplicate external_ids keep the last row in file order.
+    """
+    with PHASES.phase("customer_upsert"):
+        staged = copy_into_staging(
+            cur,
+            "stg_customers",
+            CUSTOMERS_COLS + ["row_hash"],
+            ({**r, "row_hash": row_hash(r)} for r in rows),
+        )
+        source = "(SELECT *, ctid AS ord FROM stg_customers) AS s"
+        cur.execute(_MERGE_CUSTOMERS_SQL.format(source=source))
+    return staged
+
+
+def copy_churn_labels(cur, rows):
+    """
+    Bulk path for load_churn_labels: COPY into staging, then resolve external_id
+    against churn.customers and merge in one statement.
+    Returns (loaded, unmatched); unmatched rows are dropped.
+    """
+    with PHASES.phase("label_load"):
+        copy_into_staging(cur, "stg_churn_labels", CHURN_COLS, rows)
+    return _merge_staged_labels(cur)
+
+
+def _merge_staged_labels(cur):
+    target = label_target(cur, "SELECT DISTINCT label_date FROM stg_churn_labels")
+    source = "(SELECT *, ctid AS ord FROM stg_churn_labels) AS s"
+    with PHASES.phase("id_mapping"):
+        cur.execute(_MERGE_LABELS_SQL.format(source=source, target=target))
+        return cur.fetchone()
+
+
+def copy_typed_staging(cur, table, schema, batches):
+    """Create a typed temp table for `schema` and binary-COPY record batches in."""
+    types = arrow_input.pg_types(schema)
+    cur.execute(
+        f"CREATE TEMP TABLE {table} ({arrow_input.pg_column_defs(schema, types)}) "
+        "ON COMMIT DROP;"
+    )
+    return arrow_input.copy_binary(cur, table, schema, batches, types)
+
+
+def copy_customers_arrow(cur, batches):
+    """
+    Typed path for copy_customers: record batches arrive already typed and are
+    binary-COPYed, so Postgres does no text parsing or casting. row_hash is left
+    NULL (a later --delta CSV run rewrites these rows once).
+    """
+    with PHASES.phase("customer_upsert"):
+        staged = copy_typed_staging(
+            cur, "stg_customers", arrow_input.CUSTOMERS_SCHEMA, batches
+        )
+        source = (
+            "(SELECT *, NULL::text AS row_hash, ctid AS ord FROM stg_customers) AS s"
+        )
+        cur.execute(_MERGE_CUSTOMERS_SQL.format(source=source))
+    return staged
+
+
+def copy_churn_labels_arrow(cur, batches):
+    """Typed path for copy_churn_labels. Returns (loaded, unmatched)."""
+    with PHASES.phase("label_load"):
+        copy_typed_staging(cur, "stg_churn_labels", arrow_input.CHURN_SCHEMA, batches)
+    return _merge_staged_labels(cur)
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--data-dir", type=str, default="data/raw")
-    ap.add_argument("--full-refresh", action="store_true")
-    args = ap.parse_args()
 
-    data_dir = Path(args.data_dir)
-    files = {k: data_dir / v for k, v in REQUIRED_FILES.items()}
-    datasets = {
-        name: (read_csv_rows(path) if path.exists() else [])
-        for name, path in files.items()
+def load_arrow_batches(cur, name, batches):
+    """Write typed batches for one table; returns a Counter of outcomes."""
+    if name == "customers":
+        copy_customers_arrow(cur, batches)
+        return Counter()
+    loaded, dropped = copy_churn_labels_arrow(cur, batches)
+    return Counter(loaded=loaded, dropped=dropped)
+
+
+def load_file(cur, name, path, mode, delta):
+    """Load one whole input file in the current transaction; returns (rows, counts)."""
+    if arrow_input.is_arrow_input(path):
+        seen = Counter()
+
+        def counted():
+            batches = arrow_input.read_batches(path, ARROW_SCHEMAS[name])
+            for batch in PHASES.timed(batches, "parse"):
+                seen["rows"] += batch.num_rows
+                yield batch
+
+        counts = load_arrow_batches(cur, name, counted())
+        return seen["rows"], counts
+    with PHASES.phase("parse"):
+        rows = read_csv_rows(path)
+    if not rows:
+        return 0, Counter()
+    ensure_columns(rows, TABLE_COLS[name], path.name)
+    if name == "customers":
+        return len(rows), load_customers_batch(cur, rows, mode, delta)
+    return len(rows), load_labels_batch(cur, rows, mode)
+
+
+def load_customers_batch(cur, rows, mode, delta=False):
+    """Write one batch of customer rows; returns a Counter of outcomes."""
+    counts = Counter()
+    if delta:
+        rows, counts = filter_delta(cur, rows)
+    if rows:
+        if mode == "copy":
+            copy_customers(cur, rows)
+        else:
+            upsert_customers(cur, rows)
+    return counts
+
+
+def load_labels_batch(cur, rows, mode):
+    """Write one batch of label rows; returns a Counter of outcomes."""
+    if mode == "copy":
+        loaded, dropped = copy_churn_labels(cur, rows)
+    else:
+        loaded, dropped = load_churn_labels(cur, rows)
+    return Counter(loaded=loaded, dropped=dropped)
+
+
+def report_rate(name, n, seconds):
+    rate = n / seconds if seconds > 0 else float("inf")
+    print(f"{name}: {n} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+
+
+def report_counts(name, counts):
+    if name == "customers" and counts:
+        print(
+            f"customers delta: {counts['inserted']} inserted, "
+            f"{counts['updated']} updated, {counts['unchanged']} unchanged, "
+            f"{counts['skipped']} skipped"
+        )
+    if name == "churn_labels" and counts.get("dropped"):
+        print(
+            f"churn_labels: {counts['dropped']} rows dropped "
+            "(external_id not in churn.customers)"
+        )
+
+
+def label_dates(path: Path):
+    """Distinct label_date values (as strings) of a label input file."""
+    if arrow_input.is_arrow_input(path):
+        return arrow_input.distinct_strings(path, "label_date")
+    with path.open("r", newline="", encoding="utf-8") as f:
+        return {r["label_date"] for r in csv.DictReader(f) if r.get("label_date")}
+
+
+def drop_label_partitions(cur, files):
+    """
+    --full-refresh: drop the monthly churn_labels partitions that the label
+    input covers. Other snapshots are left alone; the load recreates the
+    dropped partitions. Returns the dropped partition names.
+    """
+    path = files["churn_labels"]
+    if not path.exists():
+        return []
+    cur.execute(
+        "SELECT DISTINCT churn.label_partition_name(d::date) "
+        "FROM unnest(%s::text[]) AS d;",
+        (sorted(label_dates(path)),),
+    )
+    dropped = []
+    for (name,) in sorted(cur.fetchall()):
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"churn.{name}",))
+        if cur.fetchone()[0]:
+            cur.execute(f"DROP TABLE churn.{name};")
+            dropped.append(name)
+    if dropped:
+        print(f"Full refresh: dropped label partitions {', '.join(dropped)}")
+    return dropped
+
+
+def set_valid_from(conn, valid_from):
+    """
+    Stamp the customer_history versions this session writes with `valid_from`
+    (the extract's snapshot date) instead of NOW(): sets churn.valid_from,
+    read by sql/004_customer_history.sql. Committed, so later rollbacks on
+    the connection keep it.
+    """
+    if valid_from is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute("SELECT set_config('churn.valid_from', %s, false);", (valid_from,))
+    conn.commit()
+
+
+def ingest_streaming(conn, files, mode, chunk_size, checkpoint, full_refresh, delta):
+    """
+    Load customers then labels in fixed-size chunks, committing each chunk and
+    recording its end offset. Memory is bounded by chunk_size, not file size.
+    A crash between commit and checkpoint replays one chunk; the upserts are
+    idempotent so that is harmless.
+    """
+    state = load_checkpoint(checkpoint, files)
+    if state:
+        print(f"Resuming from checkpoint {checkpoint}")
+    elif full_refresh:
+        with conn.cursor() as cur:
+            drop_label_partitions(cur, files)
+        with PHASES.phase("commit"):
+            conn.commit()
+
+    loaders = {
+        "customers": lambda cur, rows: load_customers_batch(cur, rows, mode, delta),
+        "churn_labels": lambda cur, rows: load_labels_batch(cur, rows, mode),
     }
+    totals = {}
+    for name, cols in TABLE_COLS.items():
+        path = files[name]
+        if not path.exists():
+            continue
+        typed = arrow_input.is_arrow_input(path)
+        if not typed:
+            ensure_columns([dict.fromkeys(read_csv_header(path))], cols, path.name)
+        progress = state.get(name) or {
+            "file": _file_identity(path),
+            "offset": 0,
+            "rows": 0,
+            "counts": {},
+            "done": False,
+        }
+        start_rows = progress["rows"]
+        t0 = time.perf_counter()
+        if not progress["done"]:
+            if typed:
+                chunks = arrow_input.iter_chunks(
+                    path, progress["offset"], chunk_size, ARROW_SCHEMAS[name]
+                )
+            else:
+                chunks = iter_chunks(path, progress["offset"], chunk_size)
+            for rows, end in PHASES.timed(chunks, "parse"):
+                with conn.cursor() as cur:
+                    if typed:
+                        counts = load_arrow_batches(cur, name, [rows])
+                    else:
+                        counts = loaders[name](cur, rows)
+                with PHASES.phase("commit"):
+                    conn.commit()
+                counts.update(progress["counts"])
+                progress.update(
+                    offset=end, rows=progress["rows"] + len(rows), counts=dict(counts)
+                )
+                state[name] = progress
+                save_checkpoint(checkpoint, state)
+            progress["done"] = True
+            state[name] = progress
+            save_checkpoint(checkpoint, state)
+        report_rate(name, progress["rows"] - start_rows, time.perf_counter() - t0)
+        report_counts(name, Counter(progress["counts"]))
+        totals[name] = progress["rows"]
+
+    if checkpoint is not None and checkpoint.exists():
+        checkpoint.unlink()  # load finished; next run starts fresh
+    return totals
+
+
+# Batch size for --workers when --chunk-size is not given
+DEFAULT_SHARD_CHUNK = 10_000
+
+
+def shard_of(external_id, n_shards):
+    """Stable shard index for an external_id (same on every worker and run)."""
+    return zlib.crc32((external_id or "").encode("utf-8")) % n_shards
 
-    # Column checks
-    if datasets["customers"]:
-        ensure_columns(datasets["customers"], CUSTOMERS_COLS, files["customers"].name)
-    if datasets["churn_labels"]:
-        ensure_columns(datasets["churn_labels"], CHURN_COLS, files["churn_labels"].name)
 
-    conn = connect_from_env()
+def _next_record_end(f, pos, quoted, block):
+    """
+    First record boundary after byte `pos` (`quoted`: pos is inside a quoted
+    field): the end of the first line that leaves an even quote count. An
+    embedded quote is doubled in CSV, so quote parity tells whether a newline
+    is inside a field. The file size if there is no boundary.
+    """
+    f.seek(pos)
+    while chunk := f.read(block):
+        i = 0
+        while (j := chunk.find(b"\n", i)) >= 0:
+            quoted ^= chunk.count(b'"', i, j) & 1
+            i = j + 1
+            if not quoted:
+                return pos + i
+        quoted ^= chunk.count(b'"', i) & 1
+        pos += len(chunk)
+    return pos
+
+
+def shard_ranges(path: Path, n_ranges: int, block: int = 1 << 20):
+    """
+    Split the data rows of a CSV into n_ranges contiguous byte ranges
+    [(start, end)] of about equal size, each starting on a record boundary,
+    so every row falls in exactly one range. Finding the boundaries counts
+    quote bytes up to each split point (bytes.count, no parsing).
+    """
+    with path.open("rb") as f:
+        f.readline()  # header
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        bounds = [start]
+        for k in range(1, n_ranges):
+            target = start + (size - start) * k // n_ranges
+            if target <= bounds[-1]:  # the previous range ran past it
+                bounds.append(bounds[-1])
+                continue
+            # quote parity from the last boundary up to the target
+            f.seek(bounds[-1])
+            quotes, left = 0, target - bounds[-1]
+            while left:
+                chunk = f.read(min(block, left))
+                quotes += chunk.count(b'"')
+                left -= len(chunk)
+            bounds.append(_next_record_end(f, target, quotes % 2 == 1, block))
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _spool_path(spool_dir, part, shard):
+    return Path(spool_dir) / f"part{part:04d}.shard{shard:04d}.pickle"
+
+
+def _split_range(path, part, start, end, n_shards, chunk_size, spool_dir):
+    """
+    Worker entry point, parse step: parse bytes [start, end) of the file once
+    and route each row by shard_of(external_id) into one spool file per shard,
+    as pickled chunks in file order. Returns the rows spooled per shard.
+    """
+    PHASES.reset()  # pool processes are reused across tasks
+    rows = PHASES.timed((row for row, _ in iter_csv_rows(path, start, end)), "parse")
+    buffers = [[] for _ in range(n_shards)]
+    spooled = [0] * n_shards
+    files = [_spool_path(spool_dir, part, s).open("wb") for s in range(n_shards)]
     try:
-        with conn.cursor() as cur:
-            if args.full_refresh:
-                truncate_tables(cur)
+        for row in rows:
+            shard = shard_of(row.get("external_id"), n_shards)
+            buffers[shard].append(row)
+            if len(buffers[shard]) >= chunk_size:
+                with PHASES.phase("spool"):
+                    pickle.dump(buffers[shard], files[shard], pickle.HIGHEST_PROTOCOL)
+                spooled[shard] += len(buffers[shard])
+                buffers[shard] = []
+        with PHASES.phase("spool"):
+            for shard, buffer in enumerate(buffers):
+                if buffer:
+                    pickle.dump(buffer, files[shard], pickle.HIGHEST_PROTOCOL)
+                    spooled[shard] += len(buffer)
+    finally:
+        for f in files:
+            f.close()
+    return spooled, dict(PHASES.seconds)
 
-            if datasets["customers"]:
-                upsert_customers(cur, datasets["customers"])
-            ext2uuid = map_external_to_uuid(cur)
 
-            if datasets["churn_labels"]:
-                load_churn_labels(cur, datasets["churn_labels"], ext2uuid)
+def _iter_spooled(paths):
+    """Rows of the given spool files, in order."""
+    for path in paths:
+        with path.open("rb") as f:
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    break
+                yield from chunk
+
+
+def _load_shard(name, spool_paths, mode, chunk_size, delta, valid_from=None):
+    """
+    Worker entry point, load step: load one hash shard over a dedicated
+    connection, reading its spool files in range (i.e. file) order.
 
+    Shards are disjoint by external_id, so workers never touch the same
+    customer (or that customer's labels) and never wait on each other's row
+    locks. A repeated external_id stays in one shard and in file order, so
+    the last row wins exactly as in a serial load. Batches are sorted by
+    external_id (a stable sort) to keep lock order consistent within a worker.
+    """
+    PHASES.reset()
+    counts, n_rows = Counter(), 0
+    with db.connection() as conn:
+        set_valid_from(conn, valid_from)
+        rows = PHASES.timed(_iter_spooled(spool_paths), "spool")
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                counts.update(_write_shard_batch(conn, name, batch, mode, delta))
+                n_rows += len(batch)
+                batch = []
+        if batch:
+            counts.update(_write_shard_batch(conn, name, batch, mode, delta))
+            n_rows += len(batch)
+    return n_rows, counts, dict(PHASES.seconds)
+
+
+def _write_shard_batch(conn, name, batch, mode, delta):
+    batch.sort(key=lambda r: r.get("external_id") or "")
+    with conn.cursor() as cur:
+        if name == "customers":
+            counts = load_customers_batch(cur, batch, mode, delta)
+        else:
+            counts = load_labels_batch(cur, batch, mode)
+    with PHASES.phase("commit"):
         conn.commit()
+    return counts
+
+
+def ingest_parallel(
+    files, mode, workers, chunk_size, full_refresh, delta, valid_from=None
+):
+    """
+    Load customers, then labels, each with `workers` processes in two steps:
+
+    1. the file is cut into `workers` byte ranges (shard_ranges); each is
+       parsed once and its rows are spooled to a temp directory by
+       shard_of(external_id)
+    2. each hash shard is loaded over its own connection from its spool
+       files, read in range order
+
+    The file is parsed once in total, and the shards stay disjoint by
+    external_id. The spool holds one pickled copy of the input's rows at a
+    time. Labels start only after every customer shard has committed, so
+    label resolution sees the full customer set. Worker phase times are
+    summed into PHASES (seconds across all workers, not wall time).
+    """
+    if full_refresh:
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                drop_label_partitions(cur, files)
+            conn.commit()
+
+    totals = {}
+    # Workers build their own pool; the parent's sockets must not be shared
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=db.reset_after_fork
+    ) as pool:
+        for name, cols in TABLE_COLS.items():
+            path = files[name]
+            if not path.exists():
+                continue
+            ensure_columns([dict.fromkeys(read_csv_header(path))], cols, path.name)
+            t0 = time.perf_counter()
+            with tempfile.TemporaryDirectory(prefix=f"ingest-{name}-") as spool_dir:
+                ranges = shard_ranges(path, workers)
+                splits = [
+                    pool.submit(
+                        _split_range,
+                        path,
+                        part,
+                        start,
+                        end,
+                        workers,
+                        chunk_size,
+                        spool_dir,
+                    )
+                    for part, (start, end) in enumerate(ranges)
+                ]
+                for fut in splits:
+                    PHASES.seconds.update(fut.result()[1])
+                loads = [
+                    pool.submit(
+                        _load_shard,
+                        name,
+                        [_spool_path(spool_dir, p, shard) for p in range(len(ranges))],
+                        mode,
+                        chunk_size,
+                        delta,
+                        valid_from,
+                    )
+                    for shard in range(workers)
+                ]
+                n_rows, counts = 0, Counter()
+                for fut in loads:
+                    shard_rows, shard_counts, shard_phases = fut.result()
+                    n_rows += shard_rows
+                    counts.update(shard_counts)
+                    PHASES.seconds.update(shard_phases)
+            report_rate(name, n_rows, time.perf_counter() - t0)
+            report_counts(name, counts)
+            totals[name] = n_rows
+    return totals
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-dir", type=str, default="data/raw")
+    ap.add_argument("--full-refresh", action="store_true")
+    ap.add_argument(
+        "--mode",
+        choices=["upsert", "copy"],
+        default="upsert",
+        help="upsert: batched INSERT ... ON CONFLICT; copy: COPY into staging + merge "
+        "(Parquet/Arrow inputs always use binary COPY)",
+    )
+    ap.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Stream input in chunks of N rows, committing after each chunk.",
+    )
+    ap.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="Checkpoint file for --chunk-size loads; resumes from it if present.",
+    )
+    ap.add_argument(
+        "--delta",
+        action="store_true",
+        help="Skip customers whose content hash matches the stored row_hash.",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse byte ranges of each CSV in N processes, then load "
+        "hash-of-external_id shards concurrently over N connections.",
+    )
+    ap.add_argument(
+        "--valid-from",
+        type=lambda v: dt.date.fromisoformat(v).isoformat(),
+        default=None,
+        metavar="DATE",
+        help="Date the extract was taken: customer_history versions written by "
+        "this load start then instead of now, so labels dated on or after it "
+        "find them (build-training-sets). Default: now",
+    )
+    ap.add_argument(
+        "--stats-json",
+        type=str,
+        default=None,
+        help="Write rows, wall time, per-phase seconds and peak RSS to this file.",
+    )
+    args = ap.parse_args()
+    t_start = time.perf_counter()
+
+    files = resolve_inputs(Path(args.data_dir))
+    typed_inputs = [p.name for p in files.values() if arrow_input.is_arrow_input(p)]
+    if typed_inputs and (args.delta or args.workers > 1):
+        ap.error(f"--delta and --workers need CSV inputs (got {typed_inputs})")
+
+    if args.workers > 1:
+        if args.checkpoint:
+            ap.error("--checkpoint is not supported with --workers")
+        totals = ingest_parallel(
+            files,
+            args.mode,
+            args.workers,
+            args.chunk_size or DEFAULT_SHARD_CHUNK,
+            args.full_refresh,
+            args.delta,
+            args.valid_from,
+        )
         print(
-            "Ingest complete. "
-            f"{len(datasets['customers'])} customers, "
-            f"{len(datasets['churn_labels'])} labels processed."
+            f"Ingest complete ({args.mode}, {args.workers} workers). "
+            f"{totals.get('customers', 0)} customers, "
+            f"{totals.get('churn_labels', 0)} labels processed."
         )
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    elif args.chunk_size:
+        with db.connection() as conn:
+            set_valid_from(conn, args.valid_from)
+            totals = ingest_streaming(
+                conn,
+                files,
+                args.mode,
+                args.chunk_size,
+                Path(args.checkpoint) if args.checkpoint else None,
+                args.full_refresh,
+                args.delta,
+            )
+            print(
+                f"Ingest complete ({args.mode}, chunked). "
+                f"{totals.get('customers', 0)} customers, "
+                f"{totals.get('churn_labels', 0)} labels processed."
+            )
+    else:
+        with db.connection() as conn:
+            set_valid_from(conn, args.valid_from)
+            results = {}
+            with conn.cursor() as cur:
+                if args.full_refresh:
+                    drop_label_partitions(cur, files)
+                for name, path in files.items():
+                    if not path.exists():
+                        continue
+                    t0 = time.perf_counter()
+                    n_rows, counts = load_file(cur, name, path, args.mode, args.delta)
+                    results[name] = (n_rows, counts, time.perf_counter() - t0)
+
+            with PHASES.phase("commit"):
+                conn.commit()
+            for name, (n_rows, counts, seconds) in results.items():
+                report_rate(name, n_rows, seconds)
+                report_counts(name, counts)
+            totals = {name: r[0] for name, r in results.items()}
+            print(
+                f"Ingest complete ({args.mode}). "
+                f"{totals.get('customers', 0)} customers, "
+                f"{totals.get('churn_labels', 0)} labels processed."
+            )
+
+    if args.stats_json:
+        write_stats(Path(args.stats_json), args, totals, time.perf_counter() - t_start)
+
+
+def write_stats(path, args, totals, wall_seconds):
+    """Dump one run's measurements as JSON (see scripts/bench_ingest.py)."""
+    # ru_maxrss is in KiB on Linux; children covers --workers processes
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    stats = {
+        "mode": args.mode,
+        "chunk_size": args.chunk_size,
+        "workers": args.workers,
+        "delta": args.delta,
+        "rows": totals,
+        "wall_seconds": round(wall_seconds, 4),
+        "phases": {k: round(v, 4) for k, v in sorted(PHASES.seconds.items())},
+        "peak_rss_mb": round(self_rss / 1024, 1),
+        "peak_rss_children_mb": round(child_rss / 1024, 1),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(stats, indent=2))
 
 
 if __name__ == "__main__":
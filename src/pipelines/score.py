@@ -0,0 +1,286 @@
+"""
+Batch scoring: a saved baseline pipeline -> churn.predictions.
+
+- Loads model.pkl + params.json from a train_baseline artifact directory;
+  the model version defaults to <dir name>-<first 8 hex of model.pkl's hash>
+- Reads customers from churn.customers through a server-side cursor (feature
+  columns pulled out of `attributes`, numeric ones cast in SQL), or from a
+  features parquet in record batches; either way one batch of rows is in
+  memory at a time
+- Runs predict_proba on whole batches and binary-COPYs each batch of results
+  (arrow_input.encode_batch) into churn.predictions from a writer thread on
+  its own connection, so the next batch is read and scored while the last one
+  is written; a bounded queue caps how far the reader can run ahead
+- The rows of the run's (model_version, snapshot_date) are replaced in one
+  transaction; rows/s and time per phase are reported at the end
+"""
+
+import datetime as dt
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg import sql
+
+from src import db
+from src.pipelines import arrow_input
+from src.pipelines.fast_scorer import FastScorer
+
+PREDICTIONS_SCHEMA = pa.schema(
+    [
+        ("model_version", pa.string()),
+        ("snapshot_date", pa.date32()),
+        ("customer_id", pa.string()),
+        ("churn_probability", pa.float64()),
+        ("predicted_label", pa.bool_()),
+    ]
+)
+PREDICTIONS_TYPES = ["TEXT", "DATE", "UUID", "FLOAT8", "BOOLEAN"]
+
+
+def load_model(model_dir: Path):
+    """(pipeline, params.json dict, default model version) for an artifact dir."""
+    model_path = model_dir / "model.pkl"
+    digest = hashlib.blake2b(model_path.read_bytes()).hexdigest()
+    params = json.loads((model_dir / "params.json").read_text())
+    return joblib.load(model_path), params, f"{model_dir.name}-{digest[:8]}"
+
+
+def load_scorer(model_dir: Path):
+    """
+    (FastScorer, default model version) from <model_dir>/scorer/, arrays
+    memory-mapped; the version matches load_model()'s for the same model.pkl.
+    """
+    scorer = FastScorer.load(model_dir / "scorer")
+    return scorer, f"{model_dir.name}-{scorer.meta['model_digest'][:8]}"
+
+
+def feature_columns(params: dict):
+    features = params["features"]
+    return features["numeric"], features["categorical"]
+
+
+def feature_exprs(numeric, categorical) -> list[sql.Composed]:
+    """
+    SELECT-list entries pulling each feature out of customers.attributes.
+    Numeric ones use churn.to_numeric_or_null (sql/002_customer_features.sql).
+    """
+    cols = []
+    for name in numeric:
+        cols.append(
+            sql.SQL("churn.to_numeric_or_null(attributes->>{})::float8 AS {}").format(
+                sql.Literal(name), sql.Identifier(name)
+            )
+        )
+    for name in categorical:
+        cols.append(
+            sql.SQL("attributes->>{} AS {}").format(
+                sql.Literal(name), sql.Identifier(name)
+            )
+        )
+    return cols
+
+
+def customers_query(numeric, categorical, active_only: bool) -> sql.Composed:
+    """SELECT customer_id + each model feature out of customers.attributes."""
+    cols = [sql.SQL("customer_id::text")] + feature_exprs(numeric, categorical)
+    query = sql.SQL("SELECT {} FROM churn.customers").format(sql.SQL(", ").join(cols))
+    if active_only:
+        query += sql.SQL(" WHERE is_active")
+    return query
+
+
+def iter_db_batches(conn, numeric, categorical, batch_rows, active_only=False):
+    """Yield (customer_ids, features frame) per batch from a server-side cursor."""
+    columns = ["customer_id"] + numeric + categorical
+    with conn.cursor(name="score_customers") as cur:
+        cur.execute(customers_query(numeric, categorical, active_only))
+        while rows := cur.fetchmany(batch_rows):
+            frame = pd.DataFrame.from_records(rows, columns=columns)
+            yield frame.pop("customer_id").to_numpy(), frame
+
+
+def iter_parquet_batches(path, numeric, categorical, batch_rows, id_column):
+    """Yield (ids, features frame) per record batch of a features parquet."""
+    parquet = pq.ParquetFile(path)
+    if id_column not in parquet.schema_arrow.names:
+        raise ValueError(f"{path}: no '{id_column}' column to key predictions by")
+    for batch in parquet.iter_batches(
+        batch_size=batch_rows, columns=[id_column] + numeric + categorical
+    ):
+        frame = batch.to_pandas()
+        yield frame.pop(id_column).to_numpy(), frame
+
+
+def resolve_external_ids(cur, batches, counts):
+    """Map external_id -> customer_id batch by batch; unknown ids are dropped."""
+    for ids, frame in batches:
+        cur.execute(
+            "SELECT external_id, customer_id::text FROM churn.customers "
+            "WHERE external_id = ANY(%s);",
+            (list(ids),),
+        )
+        known = dict(cur.fetchall())
+        mapped = pd.Series(ids).map(known)
+        keep = mapped.notna().to_numpy()
+        counts["unmatched"] += int((~keep).sum())
+        yield mapped[keep].to_numpy(), frame[keep]
+
+
+class PredictionWriter(threading.Thread):
+    """
+    Writer thread: replaces the run's rows, then binary-COPYs queued batches
+    into churn.predictions and commits once the end-of-input marker arrives.
+    An error is kept in `error` and later batches are drained unwritten, so
+    the producer never blocks on a dead writer.
+    """
+
+    def __init__(self, model_version, snapshot_date, depth=4):
+        super().__init__(name="prediction-writer", daemon=True)
+        self.model_version = model_version
+        self.snapshot_date = snapshot_date
+        self.queue = queue.Queue(maxsize=depth)
+        self.error = None
+        self.seconds = 0.0
+        self.replaced = 0
+
+    def run(self):
+        done = False
+        try:
+            with db.connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM churn.predictions "
+                    "WHERE model_version = %s AND snapshot_date = %s;",
+                    (self.model_version, self.snapshot_date),
+                )
+                self.replaced = cur.rowcount
+                while (batch := self.queue.get()) is not None:
+                    if self.error is not None:
+                        continue
+                    t0 = time.perf_counter()
+                    try:
+                        arrow_input.copy_binary(
+                            cur,
+                            "churn.predictions",
+                            PREDICTIONS_SCHEMA,
+                            [batch],
+                            PREDICTIONS_TYPES,
+                        )
+                    except Exception as e:  # surfaced by close()
+                        self.error = e
+                    self.seconds += time.perf_counter() - t0
+                done = True
+                if self.error is None:
+                    conn.commit()
+        except Exception as e:
+            self.error = e
+        while not done:  # unblock the producer
+            done = self.queue.get() is None
+
+    def put(self, batch: pa.RecordBatch):
+        self.queue.put(batch)
+
+    def close(self):
+        """Signal end of input, wait for the commit and re-raise writer errors."""
+        self.queue.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        """Producer failed: roll back instead of committing what was written."""
+        if self.error is None:
+            self.error = RuntimeError("scoring aborted")
+        self.queue.put(None)
+        self.join()
+
+
+def prediction_batch(ids, proba, model_version, snapshot_date) -> pa.RecordBatch:
+    n = len(ids)
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array([model_version] * n, pa.string()),
+            pa.array(np.full(n, np.datetime64(snapshot_date, "D"))),
+            pa.array(ids, pa.string()),
+            pa.array(proba, pa.float64()),
+            pa.array(proba >= 0.5),
+        ],
+        schema=PREDICTIONS_SCHEMA,
+    )
+
+
+def score(
+    model_dir,
+    input_path=None,
+    id_column="customer_id",
+    snapshot_date=None,
+    model_version=None,
+    batch_rows=50_000,
+    active_only=False,
+):
+    """Score every input row and write churn.predictions; returns run stats."""
+    pipe, params, default_version = load_model(Path(model_dir))
+    numeric, categorical = feature_columns(params)
+    model_version = model_version or default_version
+    snapshot_date = snapshot_date or dt.date.today()
+
+    counts = Counter()
+    seconds = Counter()
+    t_start = time.perf_counter()
+    writer = PredictionWriter(model_version, snapshot_date)
+    writer.start()
+    try:
+        with db.connection() as conn, conn.cursor() as cur:
+            if input_path is None:
+                batches = iter_db_batches(
+                    conn, numeric, categorical, batch_rows, active_only
+                )
+            else:
+                batches = iter_parquet_batches(
+                    input_path, numeric, categorical, batch_rows, id_column
+                )
+                if id_column == "external_id":
+                    batches = resolve_external_ids(cur, batches, counts)
+            while True:
+                t0 = time.perf_counter()
+                item = next(batches, None)
+                seconds["read"] += time.perf_counter() - t0
+                if item is None:
+                    break
+                ids, frame = item
+                if not len(ids):
+                    continue
+                t0 = time.perf_counter()
+                proba = pipe.predict_proba(frame)[:, 1]
+                seconds["predict"] += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                writer.put(prediction_batch(ids, proba, model_version, snapshot_date))
+                seconds["queue_wait"] += time.perf_counter() - t0
+                counts["scored"] += len(ids)
+                counts["positive"] += int((proba >= 0.5).sum())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    seconds["write"] = writer.seconds
+    wall = time.perf_counter() - t_start
+    return {
+        "model_version": model_version,
+        "snapshot_date": str(snapshot_date),
+        "rows": counts["scored"],
+        "predicted_churn": counts["positive"],
+        "unmatched": counts["unmatched"],
+        "replaced": writer.replaced,
+        "wall_seconds": round(wall, 3),
+        "rows_per_sec": round(counts["scored"] / wall, 1) if wall else None,
+        "phases": {k: round(v, 3) for k, v in seconds.items()},
+    }
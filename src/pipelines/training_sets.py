@@ -0,0 +1,274 @@
+"""
+Point-in-time training sets: one parquet per label snapshot, with each
+customer's features as they were on the label_date.
+
+- Features come from churn.customer_history (sql/004_customer_history.sql),
+  the attributes version valid at the start of label_date (UTC): the newest
+  valid_from <= label_date. Labels of customers with no version by then are
+  dropped (counted in the stats); a snapshot that keeps none of its labels
+  is an error, and dropping most labels is warned about (check_coverage)
+- One pass for all snapshots: the history versions and the labels of every
+  snapshot being built are each read once by binary COPY into Arrow
+  (db_features.read_query), and the as-of join is a sort of the history by
+  (customer, valid_from) plus one np.searchsorted for all labels. Neither
+  side is queried per snapshot
+- Output: <out_dir>/label_date=YYYY-MM-DD/part-0.parquet (hive layout), the
+  Telco features followed by the target; text features are dictionary-encoded
+  as archive_to_parquet writes them, so any one file is a train_baseline
+  --input
+- <out_dir>/_manifest.json keeps a fingerprint per snapshot: the snapshot's
+  label count and newest inserted_at, and the count and newest recorded_at of
+  history versions valid by its label_date. Only snapshots whose fingerprint
+  changed (or whose file is missing) are rebuilt; partitions of label dates
+  no longer in churn_labels are removed
+"""
+
+import json
+import os
+import shutil
+import time
+import warnings
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from psycopg import sql
+
+from src import db
+from src.pipelines.db_features import TELCO_FEATURES, TELCO_NUMERIC, read_query
+from src.pipelines.score import feature_exprs
+
+MANIFEST = "_manifest.json"
+_DAY_US = 86_400 * 1_000_000
+# Labels are joined to the state at the start of label_date, UTC
+_CUTOFF = "(label_date::timestamp AT TIME ZONE 'UTC')"
+
+
+def snapshot_fingerprints(cur) -> dict:
+    """label_date -> [labels, newest inserted_at, versions valid, newest recorded_at]."""
+    cur.execute(
+        f"""
+        SELECT l.label_date::text, l.n, l.last_inserted::text, h.n, h.last_recorded::text
+        FROM (
+          SELECT label_date, count(*) AS n, max(inserted_at) AS last_inserted
+          FROM churn.churn_labels GROUP BY label_date
+        ) l
+        CROSS JOIN LATERAL (
+          SELECT count(*) AS n, max(recorded_at) AS last_recorded
+          FROM churn.customer_history WHERE valid_from <= {_CUTOFF}
+        ) h
+        """
+    )
+    return {row[0]: list(row[1:]) for row in cur.fetchall()}
+
+
+def history_query(until: str, labelled_on: Optional[str] = None) -> sql.Composed:
+    """
+    Every attributes version valid by `until` (a date), features extracted;
+    with labelled_on, only customers labelled on that date.
+    """
+    numeric = [c for c in TELCO_FEATURES if c in TELCO_NUMERIC]
+    categorical = [c for c in TELCO_FEATURES if c not in TELCO_NUMERIC]
+    exprs = dict(zip(numeric + categorical, feature_exprs(numeric, categorical)))
+    labelled = sql.SQL("")
+    if labelled_on is not None:
+        labelled = sql.SQL(
+            " AND customer_id IN (SELECT customer_id FROM churn.churn_labels "
+            "WHERE label_date = {})"
+        ).format(sql.Literal(labelled_on))
+    # valid_from as Unix microseconds; NULL stands for '-infinity'
+    return sql.SQL(
+        "SELECT customer_id::text AS customer_id, "
+        "CASE WHEN isfinite(valid_from) "
+        "THEN (extract(epoch FROM valid_from) * 1000000)::int8 END AS valid_from_us, "
+        "{} FROM churn.customer_history "
+        "WHERE valid_from <= ({}::date::timestamp AT TIME ZONE 'UTC'){}"
+    ).format(
+        sql.SQL(", ").join(exprs[c] for c in TELCO_FEATURES),
+        sql.Literal(until),
+        labelled,
+    )
+
+
+def labels_query(label_dates, target: str) -> sql.Composed:
+    return sql.SQL(
+        "SELECT customer_id::text AS customer_id, label_date, label::int4 AS {} "
+        "FROM churn.churn_labels WHERE label_date = ANY({}::date[]) "
+        "ORDER BY label_date, customer_id"
+    ).format(sql.Identifier(target), sql.Literal(list(label_dates)))
+
+
+def _codes(ids: pa.ChunkedArray, dictionary: pa.Array) -> np.ndarray:
+    """Position of each id in dictionary, -1 where absent."""
+    return pc.index_in(ids, value_set=dictionary).fill_null(-1).to_numpy()
+
+
+def as_of_rows(history: pa.Table, labels: pa.Table) -> np.ndarray:
+    """
+    For each label row, the history row valid at the start of its label_date
+    (largest valid_from <= cutoff, same customer), or -1.
+    """
+    ids = history.column("customer_id").combine_chunks()
+    if isinstance(ids.type, pa.DictionaryType):
+        ids = ids.dictionary_decode()
+    dictionary = pc.unique(ids)
+    h_code = _codes(ids, dictionary)
+    l_code = _codes(labels.column("customer_id").cast(pa.string()), dictionary)
+    h_time = (
+        history.column("valid_from_us").fill_null(np.iinfo(np.int64).min).to_numpy()
+    )
+    days = labels.column("label_date").cast(pa.int32()).to_numpy()
+    l_time = days.astype(np.int64) * _DAY_US
+
+    # (customer, time) as one sortable int64: customer code in the high
+    # bits, the time's rank among all history and label times in the low
+    _, rank = np.unique(np.concatenate([h_time, l_time]), return_inverse=True)
+    h_key = (h_code.astype(np.int64) << 32) | rank[: len(h_time)]
+    l_key = (l_code.astype(np.int64) << 32) | rank[len(h_time) :]
+    order = np.argsort(h_key, kind="stable")
+    at = np.searchsorted(h_key[order], l_key, side="right") - 1
+    rows = order[np.maximum(at, 0)]
+    found = (at >= 0) & (l_code >= 0) & (h_code[rows] == l_code)
+    return np.where(found, rows, -1)
+
+
+def join_snapshots(history: pa.Table, labels: pa.Table, target: str) -> pa.Table:
+    """Features as of each label plus label_date and the target (unmatched labels dropped)."""
+    rows = as_of_rows(history, labels)
+    keep = rows >= 0
+    features = history.select(TELCO_FEATURES).take(pa.array(rows[keep]))
+    kept = labels.filter(pa.array(keep))
+    return features.append_column(
+        "label_date", kept.column("label_date")
+    ).append_column(target, kept.column(target))
+
+
+def check_coverage(
+    label_dates: list[str], matched: list[int], dropped: int, total: int
+) -> None:
+    """
+    Raise when a snapshot kept none of its labels, and warn when most labels
+    were dropped. Both usually mean the customers were loaded after the label
+    dates without `ingest_csv --valid-from`, so their history starts at the
+    load (sql/004_customer_history.sql).
+    """
+    hint = (
+        "customer_history versions start after the label_date; load extracts "
+        "with ingest_csv --valid-from DATE, the date they were taken"
+    )
+    empty = [d for d, n in zip(label_dates, matched) if n == 0]
+    if empty:
+        raise ValueError(f"no label of {', '.join(empty)} has features: {hint}")
+    if dropped * 2 > total:
+        warnings.warn(f"{dropped} of {total} labels dropped: {hint}", stacklevel=2)
+
+
+def _partition(out_dir: Path, label_date: str) -> Path:
+    return out_dir / f"label_date={label_date}" / "part-0.parquet"
+
+
+def _write(table: pa.Table, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    pq.write_table(table.unify_dictionaries().combine_chunks(), tmp, compression="zstd")
+    os.replace(tmp, path)  # readers never see a half-written snapshot
+
+
+def build_training_sets(
+    out_dir: str,
+    label_dates: Optional[list[str]] = None,
+    target: str = "churned",
+    force: bool = False,
+) -> dict:
+    """
+    Write (or refresh) the per-snapshot parquet files under out_dir. With
+    label_dates only those snapshots are considered. Returns run stats.
+    """
+    out = Path(out_dir)
+    manifest_path = out / MANIFEST
+    manifest = {}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+    spec = {"features": TELCO_FEATURES, "target": target}
+    if manifest.get("spec") != spec:
+        manifest = {"spec": spec, "snapshots": {}}
+    built = manifest["snapshots"]
+
+    phases = {}
+    t0 = time.perf_counter()
+    with db.connection() as conn, conn.cursor() as cur:
+        fingerprints = snapshot_fingerprints(cur)
+        conn.rollback()
+        wanted = sorted(fingerprints if label_dates is None else label_dates)
+        missing = [d for d in wanted if d not in fingerprints]
+        if missing:
+            raise ValueError(f"no labels for label_date {', '.join(missing)}")
+        stale = [
+            d
+            for d in wanted
+            if force
+            or built.get(d) != fingerprints[d]
+            or not _partition(out, d).exists()
+        ]
+        phases["fingerprint"] = time.perf_counter() - t0
+
+        rows = dropped = 0
+        if stale and not fingerprints[stale[-1]][2]:
+            # no history version by the latest of them: every label is dropped
+            total = sum(fingerprints[d][0] for d in stale)
+            check_coverage(stale, [0] * len(stale), total, total)
+        if stale:
+            t = time.perf_counter()
+            history = read_query(conn, history_query(stale[-1]))
+            conn.rollback()
+            labels = read_query(conn, labels_query(stale, target))
+            conn.rollback()
+            phases["read"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            joined = join_snapshots(history, labels, target)
+            del history
+            phases["join"] = time.perf_counter() - t
+            dropped = labels.num_rows - joined.num_rows
+
+            t = time.perf_counter()
+            days = joined.column("label_date").cast(pa.int32()).to_numpy()
+            order = np.argsort(days, kind="stable")
+            joined = joined.take(pa.array(order))
+            # sorted by label_date: each snapshot is one slice
+            wanted_days = np.array(
+                [np.datetime64(d, "D").astype(np.int64) for d in stale]
+            )
+            lo = np.searchsorted(days[order], wanted_days)
+            hi = np.searchsorted(days[order], wanted_days, side="right")
+            check_coverage(stale, list(hi - lo), dropped, labels.num_rows)
+            for d, start, stop in zip(stale, lo, hi):
+                part = joined.slice(start, stop - start).drop_columns(["label_date"])
+                _write(part, _partition(out, d))
+                built[d] = fingerprints[d]
+                rows += part.num_rows
+            phases["write"] = time.perf_counter() - t
+
+    removed = []
+    if label_dates is None:
+        for d in sorted(set(built) - set(fingerprints)):
+            shutil.rmtree(_partition(out, d).parent, ignore_errors=True)
+            del built[d]
+            removed.append(d)
+
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_name(MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, manifest_path)
+    return {
+        "built": stale,
+        "unchanged": [d for d in wanted if d not in stale],
+        "removed": removed,
+        "rows": rows,
+        "dropped_labels": dropped,
+        "phases": phases,
+        "wall_seconds": time.perf_counter() - t0,
+    }
@@ -0,0 +1,300 @@
+"""
+HTTP scoring service for a saved baseline model (`python -m src.app serve`).
+
+- Loads the memory-mapped scorer/ of a train_baseline artifact dir, or
+  compiles model.pkl into a FastScorer (src/pipelines/fast_scorer.py) for
+  dirs saved before scorer/ existed; `--engine pipeline` serves
+  Pipeline.predict_proba instead, for comparison
+- Each request's features are checked and coerced against the model's
+  columns before it is queued (numbers or numeric strings for numeric
+  columns, JSON scalars for categorical ones, matched against the model's
+  categories as they are; null = missing, imputed); anything else is a 400
+  for that request alone
+- Requests are micro-batched: a scoring thread takes whatever is queued (up
+  to --max-batch) and scores it in one call. It waits (at most
+  --max-wait-ms) for more only while other requests are still being read,
+  so a lone client is never delayed. If a batch fails, its requests are
+  re-scored one by one, so only the failing request gets the error
+- Stdlib only (ThreadingHTTPServer); one thread per connection
+
+Endpoints:
+- POST /score   {"features": {...}} or {"instances": [{...}, ...]}
+                -> {"churn_probability": p, "predicted_label": bool}
+                   or {"predictions": [...]}
+- GET  /health  model version and engine
+- GET  /stats   request count and p50 / p99 / max latency in ms
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.pipelines.fast_scorer import MANIFEST, FastScorer
+from src.pipelines.score import load_model, load_scorer
+
+
+class PipelineScorer:
+    """Same interface as FastScorer, backed by the sklearn pipeline."""
+
+    def __init__(self, pipe):
+        from sklearn.preprocessing import OneHotEncoder
+
+        self.pipe = pipe
+        self.numeric_cols, self.categorical_cols = [], []
+        for _, transformer, cols in pipe.steps[0][1].transformers_:
+            if transformer == "drop" or isinstance(cols, str):
+                continue
+            last = transformer.steps[-1][1] if hasattr(transformer, "steps") else None
+            if isinstance(last, OneHotEncoder):
+                self.categorical_cols += list(cols)
+            else:
+                self.numeric_cols += list(cols)
+
+    def predict_proba(self, rows: list[dict]) -> np.ndarray:
+        # Every model column, even one no row in the batch has (imputed)
+        columns = self.numeric_cols + self.categorical_cols
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        return self.pipe.predict_proba(frame)[:, 1]
+
+
+def coerce_rows(rows: list[dict], numeric_cols, categorical_cols) -> list[dict]:
+    """
+    The model's columns of each row, numerics as float and categories as the
+    JSON scalar they arrived as (a model trained on bools knows True, not
+    "True"); absent keys stay absent and null stays missing. Raises
+    ValueError naming the first value that is neither.
+    """
+    out = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"instance {i}: expected an object")
+        clean = {}
+        for c in numeric_cols:
+            if c not in row:
+                continue
+            v = row[c]
+            try:
+                if v is not None and not isinstance(v, (int, float, str)):
+                    raise TypeError
+                clean[c] = float("nan") if v is None else float(v)
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"instance {i}: '{c}' must be a number, got {v!r}"
+                ) from None
+        for c in categorical_cols:
+            if c not in row:
+                continue
+            v = row[c]
+            if isinstance(v, (dict, list)):
+                raise ValueError(f"instance {i}: '{c}' must be a scalar, got {v!r}")
+            clean[c] = v
+        out.append(clean)
+    return out
+
+
+class MicroBatcher(threading.Thread):
+    """Collects concurrent requests into batches for one scorer call."""
+
+    def __init__(self, scorer, max_batch=64, max_wait_ms=2.0):
+        super().__init__(name="micro-batcher", daemon=True)
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.active = 0  # requests between arrive() and leave()
+        self.lock = threading.Lock()
+
+    def arrive(self):
+        with self.lock:
+            self.active += 1
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def submit(self, rows: list[dict]) -> Future:
+        fut = Future()
+        self.queue.put((rows, fut))
+        return fut
+
+    def run(self):
+        while True:
+            pending = [self.queue.get()]
+            n = len(pending[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while n < self.max_batch:
+                # Only wait if more requests are on their way
+                timeout = deadline - time.perf_counter()
+                waiting = timeout > 0 and self.active > len(pending)
+                try:
+                    item = (
+                        self.queue.get(timeout=timeout)
+                        if waiting
+                        else self.queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                pending.append(item)
+                n += len(item[0])
+            rows = [r for batch, _ in pending for r in batch]
+            try:
+                proba = self.scorer.predict_proba(rows)
+            except Exception as e:
+                self._score_each(pending, e)
+                continue
+            self.batches += 1
+            self.rows += len(rows)
+            start = 0
+            for batch, fut in pending:
+                fut.set_result(proba[start : start + len(batch)])
+                start += len(batch)
+
+    def _score_each(self, pending, error):
+        """A batch failed: score its requests alone so only the bad one fails."""
+        if len(pending) == 1:
+            pending[0][1].set_exception(error)
+            return
+        for batch, fut in pending:
+            try:
+                proba = self.scorer.predict_proba(batch)
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            fut.set_result(proba)
+
+
+class LatencyStats:
+    """Server-side request latencies (most recent `window`) and percentiles."""
+
+    def __init__(self, window=100_000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def summary(self) -> dict:
+        with self.lock:
+            ms = np.array(self.samples) * 1000
+            count = self.count
+        if not len(ms):
+            return {"requests": count}
+        p50, p99 = np.percentile(ms, [50, 99])
+        return {
+            "requests": count,
+            "p50_ms": round(float(p50), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(ms.max()), 3),
+        }
+
+
+def make_handler(batcher, latency, info):
+    numeric_cols = batcher.scorer.numeric_cols
+    categorical_cols = batcher.scorer.categorical_cols
+
+    class ScoreHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: no reconnect per request
+        # One write per response and no Nagle delay on small replies
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", **info})
+            elif self.path == "/stats":
+                batches = max(batcher.batches, 1)
+                self._reply(
+                    200,
+                    {
+                        **latency.summary(),
+                        "batches": batcher.batches,
+                        "mean_batch_rows": round(batcher.rows / batches, 2),
+                    },
+                )
+            else:
+                self._reply(404, {"error": f"no route {self.path}"})
+
+        def do_POST(self):
+            t0 = time.perf_counter()
+            if self.path != "/score":
+                self._reply(404, {"error": f"no route {self.path}"})
+                return
+            batcher.arrive()
+            try:
+                self._score(t0)
+            finally:
+                batcher.leave()
+
+        def _score(self, t0):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                single = "features" in body
+                rows = [body["features"]] if single else body["instances"]
+                if not isinstance(rows, list):
+                    raise ValueError("instances must be a list of objects")
+                rows = coerce_rows(rows, numeric_cols, categorical_cols)
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"bad request: {e}"})
+                return
+            try:
+                proba = batcher.submit(rows).result()
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+                return
+            preds = [
+                {"churn_probability": float(p), "predicted_label": bool(p >= 0.5)}
+                for p in proba
+            ]
+            latency.add(time.perf_counter() - t0)
+            self._reply(200, preds[0] if single else {"predictions": preds})
+
+        def log_message(self, format, *args):
+            pass  # per-request logs would dominate the latency being measured
+
+    return ScoreHandler
+
+
+def build_server(
+    model_dir, host="0.0.0.0", port=8000, engine="fast", max_batch=64, max_wait_ms=2.0
+):
+    """(server, batcher, latency stats) ready for serve_forever()."""
+    model_dir = Path(model_dir)
+    if engine == "fast" and (model_dir / "scorer" / MANIFEST).exists():
+        scorer, version = load_scorer(model_dir)
+    else:
+        pipe, _, version = load_model(model_dir)
+        if engine == "fast":
+            scorer = FastScorer.from_pipeline(pipe)
+        else:
+            scorer = PipelineScorer(pipe)
+    batcher = MicroBatcher(scorer, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    batcher.start()
+    latency = LatencyStats()
+    info = {"model_version": version, "engine": engine}
+    server = ThreadingHTTPServer((host, port), make_handler(batcher, latency, info))
+    server.daemon_threads = True
+    return server, batcher, latency
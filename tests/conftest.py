@@ -0,0 +1,43 @@
+import psycopg
+import pytest
+
+from src.config import settings
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "db: needs a Postgres with the sql/ schema applied (POSTGRES_* settings); "
+        "skipped when none is reachable",
+    )
+
+
+@pytest.fixture
+def pg_conn():
+    """
+    A connection to the configured Postgres, rolled back after the test, so
+    DB tests leave no rows behind. Skips when the server is unreachable or
+    the sql/ schema is missing.
+    """
+    try:
+        conn = psycopg.connect(
+            host=settings.pg_host,
+            port=settings.pg_port,
+            dbname=settings.pg_db,
+            user=settings.pg_user,
+            password=settings.pg_password,
+            connect_timeout=3,
+        )
+    except psycopg.OperationalError as e:
+        pytest.skip(f"no Postgres at {settings.pg_host}:{settings.pg_port}: {e}")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT to_regproc('churn.refresh_customer_features') IS NOT NULL"
+            )
+            if not cur.fetchone()[0]:
+                pytest.skip("sql/ schema not applied")
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,93 @@
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+SCRIPT = "scripts/archive_to_parquet.py"
+
+
+def _archive(path: Path, n: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "customerID": [f"{i:04d}-ABCD" for i in range(n)],
+            "gender": rng.choice(["Male", "Female"], n),
+            "SeniorCitizen": rng.integers(0, 2, n),
+            "tenure": rng.integers(0, 72, n),
+            # quoted newlines must not be cut between blocks
+            "Contract": rng.choice(["Month-to-month", "One year", "Two\nyear"], n),
+            "MonthlyCharges": rng.uniform(18, 120, n).round(2),
+            "TotalCharges": rng.uniform(18, 8000, n).round(2).astype(str),
+            "Churn": rng.choice(["Yes", "No"], n),
+        }
+    )
+    df.loc[::17, "TotalCharges"] = " "  # blanks, as for new customers
+    df.to_csv(path, index=False)
+    return df
+
+
+def _load_script():
+    spec = importlib.util.spec_from_file_location("archive_to_parquet", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(*args):
+    completed = subprocess.run(
+        [sys.executable, SCRIPT, *map(str, args)], capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+
+
+def _expected(raw: pd.DataFrame) -> pd.DataFrame:
+    out = raw.drop(columns=["customerID", "Churn"])
+    out["TotalCharges"] = pd.to_numeric(out["TotalCharges"], errors="coerce")
+    out["churned"] = (raw["Churn"] == "Yes").astype("int64")
+    return out
+
+
+def test_chunked_conversion_matches_pandas(tmp_path: Path):
+    raw = _archive(tmp_path / "telco.csv")
+    out = tmp_path / "features.parquet"
+    _run("--input", tmp_path / "telco.csv", "--out", out, "--row-group-rows", 64)
+
+    meta = pq.ParquetFile(out).metadata
+    assert [meta.row_group(i).num_rows for i in range(meta.num_row_groups)] == [
+        64,
+        64,
+        64,
+        64,
+        44,
+    ]
+    got = pd.read_parquet(out)
+    assert isinstance(got["Contract"].dtype, pd.CategoricalDtype)
+    got = got.astype({c: object for c in got.select_dtypes("category")})
+    pd.testing.assert_frame_equal(got, _expected(raw))
+
+
+def test_sample_keeps_dataframe_sample_rows_and_order(tmp_path: Path):
+    raw = _archive(tmp_path / "telco.csv")
+    out = tmp_path / "sample.parquet"
+    _run("--input", tmp_path / "telco.csv", "--out", out, "--sample", 50)
+
+    got = pd.read_parquet(out)
+    got = got.astype({c: object for c in got.select_dtypes("category")})
+    expected = _expected(raw.sample(n=50, random_state=42)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_blocks_end_on_record_boundaries(tmp_path: Path):
+    a2p = _load_script()
+    path = tmp_path / "telco.csv"
+    _archive(path, n=40)
+    data = path.read_bytes().split(b"\n", 1)[1]
+    # smaller than some records: the buffer has to grow
+    blocks = [bytes(b) for b in a2p.read_blocks(path, 48)]
+    assert len(blocks) > 1
+    assert b"".join(blocks) == data
+    assert all(b.endswith(b"\n") and b.count(b'"') % 2 == 0 for b in blocks)
@@ -0,0 +1,117 @@
+import datetime as dt
+import struct
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.pipelines import arrow_input, ingest_csv
+
+
+def _decode(buf, n_fields):
+    """Minimal binary COPY tuple decoder: yields lists of raw field bytes."""
+    pos, rows = 0, []
+    while pos < len(buf):
+        (count,) = struct.unpack_from(">h", buf, pos)
+        assert count == n_fields
+        pos += 2
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack_from(">i", buf, pos)
+            pos += 4
+            row.append(None if length < 0 else buf[pos : pos + length])
+            pos += max(length, 0)
+        rows.append(row)
+    return rows
+
+
+def test_encode_batch_matches_postgres_binary_formats():
+    batch = pa.RecordBatch.from_pydict(
+        {
+            "external_id": ["a", None, "ccc"],
+            "created_at": [dt.datetime(2000, 1, 1, 0, 0, 1, tzinfo=dt.timezone.utc)]
+            * 3,
+            "is_active": [True, False, None],
+            "attributes": ['{"k": 1}', None, "{}"],
+        },
+        schema=pa.schema(
+            [
+                ("external_id", pa.string()),
+                ("created_at", pa.timestamp("us", tz="UTC")),
+                ("is_active", pa.bool_()),
+                ("attributes", pa.string()),
+            ]
+        ),
+    )
+    types = arrow_input.pg_types(batch.schema)
+    assert types == ["TEXT", "TIMESTAMPTZ", "BOOLEAN", "JSONB"]
+
+    rows = _decode(arrow_input.encode_batch(batch, types), 4)
+    assert rows[0] == [b"a", struct.pack(">q", 1_000_000), b"\x01", b'\x01{"k": 1}']
+    assert rows[1] == [None, struct.pack(">q", 1_000_000), b"\x00", None]
+    assert rows[2] == [b"ccc", struct.pack(">q", 1_000_000), None, b"\x01{}"]
+
+
+def test_encode_batch_handles_prediction_columns():
+    # churn.predictions rows as written by src/pipelines/score.py
+    ids = [
+        "5f0c2b1e-8d3a-4c6e-9a7b-112233445566",
+        None,
+        "00000000-0000-0000-0000-0000000000ff",
+    ]
+    batch = pa.RecordBatch.from_pydict(
+        {"customer_id": ids, "churn_probability": [0.25, None, 1.0]}
+    )
+    rows = _decode(arrow_input.encode_batch(batch, ["UUID", "FLOAT8"]), 2)
+    assert rows[0] == [bytes.fromhex(ids[0].replace("-", "")), struct.pack(">d", 0.25)]
+    assert rows[1] == [None, None]
+    assert rows[2] == [b"\x00" * 15 + b"\xff", struct.pack(">d", 1.0)]
+
+    # Offsets of a sliced batch are honoured
+    rows = _decode(arrow_input.encode_batch(batch.slice(2), ["UUID", "FLOAT8"]), 2)
+    assert rows == [[b"\x00" * 15 + b"\xff", struct.pack(">d", 1.0)]]
+
+
+def test_read_batches_conforms_and_resumes(tmp_path):
+    table = pa.table(
+        {
+            "external_id": [f"C{i}" for i in range(10)],
+            "label": [i % 2 == 0 for i in range(10)],
+            "label_date": ["2024-06-30"] * 10,
+            "reason_code": [None] * 10,
+            "notes": [None] * 10,
+        }
+    )
+    path = tmp_path / "churn_labels.parquet"
+    pq.write_table(table, path, row_group_size=4)
+
+    batches = list(
+        arrow_input.read_batches(
+            path, arrow_input.CHURN_SCHEMA, batch_size=3, skip_rows=5
+        )
+    )
+    assert all(b.schema == arrow_input.CHURN_SCHEMA for b in batches)
+    ids = [x for b in batches for x in b.column(0).to_pylist()]
+    assert ids == [f"C{i}" for i in range(5, 10)]
+
+
+def test_label_dates_reads_distinct_dates_from_csv_and_parquet(tmp_path):
+    dates = ["2024-05-31", "2024-06-30", "2024-06-30", None]
+    table = pa.table(
+        {
+            "external_id": ["a", "b", "c", "d"],
+            "label": [True, False, True, False],
+            "label_date": pa.array(
+                [None if d is None else dt.date.fromisoformat(d) for d in dates]
+            ),
+        }
+    )
+    pq.write_table(table, tmp_path / "churn_labels.parquet")
+    csv_path = tmp_path / "churn_labels.csv"
+    csv_path.write_text(
+        "external_id,label,label_date,reason_code,notes\n"
+        + "".join(f"x{i},false,{d or ''},,\n" for i, d in enumerate(dates))
+    )
+
+    expected = {"2024-05-31", "2024-06-30"}
+    assert ingest_csv.label_dates(tmp_path / "churn_labels.parquet") == expected
+    assert ingest_csv.label_dates(csv_path) == expected
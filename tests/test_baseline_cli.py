@@ -49,6 +49,8 @@ def test_cli_produces_artifacts(tmp_path: Path, monkeypatch):
         "coefficients.csv",
         "confusion_matrix.png",
         "roc_curve.png",
+        "scorer/manifest.json",
+        "timings.json",
     ]
     for name in expected:
         assert (outdir / name).exists(), f"missing {name}"
@@ -57,3 +59,35 @@ def test_cli_produces_artifacts(tmp_path: Path, monkeypatch):
     metrics = json.loads((outdir / "metrics.json").read_text())
     for key in ["accuracy", "precision", "recall", "f1", "roc_auc"]:
         assert key in metrics
+
+    timings = json.loads((outdir / "timings.json").read_text())
+    stages = [s["stage"] for s in timings["stages"]]
+    assert stages[:3] == ["read", "sample", "split"]
+    assert {"fit", "plot_roc_curve"} <= set(stages)
+    assert timings["total"]["wall_s"] >= timings["stages"][0]["wall_s"]
+
+
+def test_sparse_path_keeps_design_matrix_csr():
+    from src.cli.train_baseline import fit_and_evaluate
+
+    rng = np.random.RandomState(0)
+    n = 400
+    df = pd.DataFrame(
+        {
+            "age": rng.randint(18, 80, size=n),
+            "zip": rng.choice([f"z{i:04d}" for i in range(300)], size=n),
+            "plan": rng.choice(["basic", "pro", "enterprise"], size=n),
+            "churned": rng.binomial(1, p=0.3, size=n),
+        }
+    )
+    dense = fit_and_evaluate(df, "churned", 0.2, 1)["metrics"]["resources"]
+    sparse = fit_and_evaluate(df, "churned", 0.2, 1, use_sparse=True)
+    design = sparse["metrics"]["resources"]["design_matrix"]
+
+    assert design["format"] == "csr"
+    assert design["shape"] == dense["design_matrix"]["shape"]
+    # one age + one zip + one plan entry per training row
+    assert design["nnz"] <= 3 * design["shape"][0]
+    assert design["mb"] < dense["design_matrix"]["mb"]
+    assert sparse["metrics"]["resources"]["peak_rss_mb"] > 0
+    assert sparse["y_proba"] is not None
@@ -0,0 +1,49 @@
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    f1_score,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+
+from src.cli.bootstrap import bootstrap_intervals, resample_metrics
+
+
+def _predictions(n=300):
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, size=n)
+    # rounded scores: plenty of ties for the ROC-AUC ranks
+    proba = np.round(0.6 * rng.random(n) + 0.3 * y, 2)
+    return y, (proba >= 0.5).astype(int), proba
+
+
+def test_resample_metrics_match_sklearn_per_resample():
+    y, pred, proba = _predictions()
+    idx = np.random.default_rng(1).integers(0, len(y), size=(20, len(y)))
+    got = resample_metrics(y, pred, proba, idx)
+
+    for b, rows in enumerate(idx):
+        yt, yp = y[rows], pred[rows]
+        expected = {
+            "accuracy": accuracy_score(yt, yp),
+            "precision": precision_score(yt, yp, zero_division=0),
+            "recall": recall_score(yt, yp, zero_division=0),
+            "f1": f1_score(yt, yp, zero_division=0),
+            "roc_auc": roc_auc_score(yt, proba[rows]),
+        }
+        for metric, value in expected.items():
+            assert abs(got[metric][b] - value) < 1e-12, metric
+
+
+def test_intervals_bracket_the_point_estimate():
+    y, pred, proba = _predictions()
+    out = bootstrap_intervals(y, pred, proba, resamples=500, seed=3)
+    assert out["resamples"] == 500
+    auc = out["intervals"]["roc_auc"]
+    assert auc["low"] < roc_auc_score(y, proba) < auc["high"]
+    acc = out["intervals"]["accuracy"]
+    assert acc["low"] < accuracy_score(y, pred) < acc["high"]
+
+    no_proba = bootstrap_intervals(y, pred, None, resamples=50)
+    assert no_proba["intervals"]["roc_auc"] is None
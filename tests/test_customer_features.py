@@ -0,0 +1,87 @@
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.db
+
+ATTRS = {
+    "gender": "Female",
+    "SeniorCitizen": "1",
+    "Partner": "Yes",
+    "Dependents": "No",
+    "tenure": " 12 ",
+    "PhoneService": "Yes",
+    "Contract": "Month-to-month",
+    "PaperlessBilling": "No",
+    "MonthlyCharges": "70.35",
+    "TotalCharges": " ",
+}
+
+
+def _insert(cur, external_id, updated_at, attrs):
+    cur.execute(
+        "INSERT INTO churn.customers (external_id, attributes, updated_at) "
+        f"VALUES (%s, %s, {updated_at}) RETURNING customer_id",
+        (external_id, json.dumps(attrs)),
+    )
+    return cur.fetchone()[0]
+
+
+def _features(cur, customer_id):
+    cur.execute(
+        "SELECT senior_citizen, partner, dependents, tenure, phone_service, "
+        "paperless_billing, monthly_charges, total_charges, contract "
+        "FROM churn.customer_features WHERE customer_id = %s",
+        (customer_id,),
+    )
+    return cur.fetchone()
+
+
+def test_refresh_reads_past_the_watermark_and_casts(pg_conn):
+    tag = uuid.uuid4().hex[:8]
+    with pg_conn.cursor() as cur:
+        # One transaction throughout: NOW() is fixed, and the fixture rolls back
+        cur.execute(
+            "UPDATE churn.refresh_state SET watermark = NOW() - interval '30 min' "
+            "WHERE table_name = 'customer_features'"
+        )
+        before = _insert(cur, f"t-{tag}-old", "NOW() - interval '1 hour'", ATTRS)
+        after = _insert(
+            cur,
+            f"t-{tag}-new",
+            "NOW() - interval '10 min'",
+            {**ATTRS, "tenure": "n/a", "TotalCharges": "844.2"},
+        )
+
+        cur.execute("SELECT churn.refresh_customer_features()")
+        assert cur.fetchone()[0] >= 1
+
+        assert _features(cur, before) is None  # below the watermark
+        # tenure "n/a" is junk: NULL instead of failing the refresh
+        assert _features(cur, after) == (
+            True,
+            True,
+            False,
+            None,
+            True,
+            False,
+            Decimal("70.35"),
+            Decimal("844.20"),
+            "Month-to-month",
+        )
+
+        cur.execute(
+            # capped at NOW() and at the oldest other open transaction
+            "SELECT watermark >= NOW() - interval '30 min', watermark <= NOW(), "
+            "rows_changed FROM churn.refresh_state "
+            "WHERE table_name = 'customer_features'"
+        )
+        advanced, capped, changed = cur.fetchone()
+        assert advanced and capped and changed >= 1
+
+        # A full refresh picks up rows below the watermark; blanks are NULL
+        cur.execute("SELECT churn.refresh_customer_features(TRUE)")
+        features = _features(cur, before)
+        assert (features[3], features[7]) == (12, None)
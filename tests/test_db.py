@@ -0,0 +1,43 @@
+from dataclasses import replace
+
+import pytest
+
+from src import config, db
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(monkeypatch):
+    # Each test builds its own engine; nothing here opens a connection
+    monkeypatch.setattr(db, "_engine", None)
+    yield
+    if db._engine is not None:
+        db._engine.dispose()
+
+
+def test_engine_is_process_wide_and_uses_settings(monkeypatch):
+    monkeypatch.setattr(
+        db, "settings", replace(config.settings, db_pool_size=3, db_max_overflow=2)
+    )
+    engine = db.get_engine()
+    assert db.get_engine() is engine
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 2
+    assert engine.url.drivername == "postgresql+psycopg"
+
+
+def test_statement_timeout_is_passed_as_server_option(monkeypatch):
+    monkeypatch.setattr(
+        db, "settings", replace(config.settings, db_statement_timeout_ms=1500)
+    )
+    assert db._connect_args()["options"] == "-c statement_timeout=1500"
+
+    monkeypatch.setattr(
+        db, "settings", replace(config.settings, db_statement_timeout_ms=0)
+    )
+    assert "options" not in db._connect_args()
+
+
+def test_pool_stats_reports_counters():
+    stats = db.pool_stats()
+    assert set(stats) == {"size", "checked_in", "checked_out", "overflow"}
+    assert stats["checked_out"] == 0
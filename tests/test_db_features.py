@@ -0,0 +1,117 @@
+import datetime as dt
+import struct
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.pipelines import db_features
+from src.pipelines.arrow_input import COPY_HEADER, COPY_TRAILER
+
+# name, type OID, column values (None = NULL)
+COLUMNS = [
+    ("plan", 25, ["basic", None, "pro", "", "basic", "pro"]),
+    ("tenure", 23, [1, 2, None, 4, 5, 6]),
+    ("charges", 701, [9.5, None, 30.25, 0.0, -1.0, 2.5]),
+    ("paperless", 16, [True, False, None, True, False, True]),
+    ("since", 1082, [dt.date(2024, 1, 31), None] + [dt.date(1999, 12, 31)] * 4),
+]
+PACK = {23: ">i", 701: ">d", 16: ">?"}
+
+
+def _value(oid, v) -> bytes:
+    if oid == 25:
+        return v.encode("utf-8")
+    if oid == 1082:
+        return struct.pack(">i", (v - dt.date(2000, 1, 1)).days)
+    return struct.pack(PACK[oid], v)
+
+
+def _stream(rows) -> bytes:
+    """Binary COPY output of copy_query(): row offset first, then the values."""
+    out, offset = [], 0
+    for row in rows:
+        fields = [
+            b"" if v is None else _value(oid, v) for (_, oid, _), v in zip(COLUMNS, row)
+        ]
+        size = 2 + 4 + 8 + sum(4 + len(f) for f in fields)
+        parts = [struct.pack(">hiq", len(fields) + 1, 8, offset)]
+        for f, v in zip(fields, row):
+            parts.append(struct.pack(">i", -1 if v is None else len(f)) + f)
+        out.append(b"".join(parts))
+        offset += size
+    return COPY_HEADER + b"".join(out) + COPY_TRAILER
+
+
+def _layout():
+    _, layout = db_features.copy_query(
+        db_features.sql.SQL("SELECT 1"), [(name, oid) for name, oid, _ in COLUMNS]
+    )
+    return layout
+
+
+def _decode(data: bytes, batch_bytes: int, chunk: int = 7) -> pa.Table:
+    chunks = [data[i : i + chunk] for i in range(0, len(data), chunk)]
+    batches = list(db_features.iter_copy_batches(chunks, _layout(), batch_bytes))
+    return pa.Table.from_batches(batches).unify_dictionaries()
+
+
+@pytest.mark.parametrize("batch_bytes", [1 << 20, 64])
+def test_copy_stream_decodes_to_typed_arrow(batch_bytes):
+    rows = list(zip(*(values for _, _, values in COLUMNS)))
+    table = _decode(_stream(rows), batch_bytes)
+
+    assert table.schema.field("plan").type == pa.dictionary(pa.int32(), pa.string())
+    assert [f.type for f in table.schema][1:] == [
+        pa.int32(),
+        pa.float64(),
+        pa.bool_(),
+        pa.date32(),
+    ]
+    got = table.to_pydict()
+    for name, _, values in COLUMNS:
+        assert got[name] == values, name
+
+
+def test_marker_bytes_inside_a_text_value_fall_back_to_walking():
+    rows = list(zip(*(values for _, _, values in COLUMNS)))
+    # Row 0's text value starts at byte 18 of the data: make it read as a
+    # row marker (6 fields, int8 length word) claiming that very offset
+    fake = struct.pack(">hiq", len(COLUMNS) + 1, 8, 18).decode("ascii")
+    rows[0] = (fake,) + rows[0][1:]
+    table = _decode(_stream(rows), 1 << 20)
+    assert table.column("plan").to_pylist()[0] == fake
+    assert table.num_rows == len(rows)
+
+
+def test_truncated_stream_is_rejected():
+    rows = list(zip(*(values for _, _, values in COLUMNS)))
+    data = _stream(rows)
+    with pytest.raises(ValueError, match="truncated"):
+        _decode(data[:-6], 1 << 20)
+    # cut after a value that happens to end in the trailer's bytes
+    with pytest.raises(ValueError, match="line up"):
+        _decode(data[:-2], 1 << 20)
+
+
+def test_write_query_streams_batches_to_parquet(tmp_path, monkeypatch):
+    rows = list(zip(*(values for _, _, values in COLUMNS)))
+    chunks = [_stream(rows)]
+    # 64-byte batches: one row each, each with its own text dictionary
+    monkeypatch.setattr(
+        db_features,
+        "iter_query",
+        lambda conn, query, batch_bytes: db_features.iter_copy_batches(
+            chunks, _layout(), 64
+        ),
+    )
+    path = tmp_path / "features.parquet"
+    assert db_features.write_query(None, "q", path) == len(rows)
+    got = pq.read_table(path).to_pydict()
+    for name, _, values in COLUMNS:
+        assert got[name] == values, name
+
+    chunks = [COPY_HEADER + COPY_TRAILER]
+    with pytest.raises(ValueError, match="no rows"):
+        db_features.write_query(None, "q", tmp_path / "empty.parquet")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["features.parquet"]
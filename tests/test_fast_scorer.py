@@ -0,0 +1,203 @@
+import http.client
+import json
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import serve
+from src.cli import out_of_core, train_baseline
+from src.pipelines.fast_scorer import FastScorer
+
+
+def _features(n=400):
+    rng = np.random.RandomState(0)
+    tenure = rng.randint(0, 72, size=n).astype(float)
+    plan = rng.choice(["basic", "pro", "enterprise"], size=n).astype(object)
+    charges = rng.uniform(10, 120, size=n)
+    tenure[rng.rand(n) < 0.1] = np.nan
+    plan[rng.rand(n) < 0.1] = np.nan
+    logit = 1.0 - 0.05 * np.nan_to_num(tenure) + (plan == "basic") * 1.0
+    return pd.DataFrame(
+        {
+            "tenure": tenure,
+            "charges": charges,
+            "plan": plan,
+            "churned": rng.binomial(1, 1 / (1 + np.exp(-logit))),
+        }
+    )
+
+
+def _rows():
+    return [
+        {"tenure": 12.0, "charges": 70.0, "plan": "pro"},
+        {"tenure": np.nan, "charges": 30.5, "plan": "basic"},
+        {"charges": 99.0, "plan": "platinum"},  # absent key + unseen category
+        {"tenure": 60.0, "charges": 20.0},
+    ]
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_fast_scorer_matches_pipeline(use_sparse):
+    result = train_baseline.fit_and_evaluate(
+        _features(), "churned", 0.2, 7, use_sparse=use_sparse
+    )
+    pipe = result["pipe"]
+    rows = _rows()
+    expected = pipe.predict_proba(pd.DataFrame.from_records(rows))[:, 1]
+    got = FastScorer.from_pipeline(pipe).predict_proba(rows)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-12)
+
+
+def test_fast_scorer_matches_out_of_core_model(tmp_path):
+    data = tmp_path / "features.parquet"
+    _features().to_parquet(data)
+    pipe = out_of_core.fit_out_of_core(str(data), "churned", 0.2, 7, epochs=2)["pipe"]
+    rows = _rows()
+    expected = pipe.predict_proba(pd.DataFrame.from_records(rows))[:, 1]
+    got = FastScorer.from_pipeline(pipe).predict_proba(rows)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-12)
+
+
+def test_saved_scorer_is_memory_mapped_and_rebuilds_pipeline(tmp_path):
+    pipe = train_baseline.fit_and_evaluate(_features(), "churned", 0.2, 7)["pipe"]
+    FastScorer.from_pipeline(pipe).save(tmp_path / "scorer", model_digest="abc")
+
+    loaded = FastScorer.load(tmp_path / "scorer")
+    assert isinstance(loaded.numeric_weights.base, np.memmap)
+    assert not loaded.categorical_weights.flags.writeable
+    assert loaded.meta["model_digest"] == "abc"
+
+    rows = _rows()
+    frame = pd.DataFrame.from_records(rows)
+    expected = pipe.predict_proba(frame)[:, 1]
+    np.testing.assert_allclose(loaded.predict_proba(rows), expected, atol=1e-12)
+    rebuilt = loaded.to_pipeline().predict_proba(frame)[:, 1]
+    np.testing.assert_allclose(rebuilt, expected, atol=1e-12)
+
+
+def test_serve_scores_single_and_batched_requests(tmp_path):
+    pipe = train_baseline.fit_and_evaluate(_features(), "churned", 0.2, 7)["pipe"]
+    joblib.dump(pipe, tmp_path / "model.pkl")
+    (tmp_path / "params.json").write_text("{}")
+    server, _, latency = serve.build_server(tmp_path, host="127.0.0.1", port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address[:2])
+
+        def post(body):
+            conn.request("POST", "/score", json.dumps(body))
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+
+        rows = [{k: v for k, v in r.items() if v == v} for r in _rows()]  # no NaN
+        expected = pipe.predict_proba(pd.DataFrame.from_records(rows))[:, 1]
+        status, one = post({"features": rows[0]})
+        assert status == 200
+        assert one["churn_probability"] == pytest.approx(expected[0])
+        status, many = post({"instances": rows})
+        assert status == 200
+        assert [p["churn_probability"] for p in many["predictions"]] == (
+            pytest.approx(list(expected))
+        )
+        assert post({"instances": "nope"})[0] == 400
+        assert latency.summary()["requests"] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_matches_non_string_categories(tmp_path):
+    data = _features()
+    data["autopay"] = (np.arange(len(data)) % 3 == 0).astype(object)
+    data.loc[data["autopay"].astype(bool), "churned"] = 0
+    pipe = train_baseline.fit_and_evaluate(data, "churned", 0.2, 7)["pipe"]
+    joblib.dump(pipe, tmp_path / "model.pkl")
+    (tmp_path / "params.json").write_text("{}")
+    server, _, _ = serve.build_server(tmp_path, host="127.0.0.1", port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address[:2])
+        rows = [
+            {**{k: v for k, v in r.items() if v == v}, "autopay": a}  # no NaN
+            for r in _rows()[:2]
+            for a in (True, False)
+        ]
+        expected = pipe.predict_proba(pd.DataFrame.from_records(rows))[:, 1]
+        conn.request("POST", "/score", json.dumps({"instances": rows}))
+        response = conn.getresponse()
+        got = [
+            p["churn_probability"] for p in json.loads(response.read())["predictions"]
+        ]
+        assert response.status == 200
+        assert got == pytest.approx(list(expected))
+        assert got[0] != pytest.approx(got[1])  # true was not an unknown "True"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _PickyScorer:
+    numeric_cols, categorical_cols = ["x"], []
+
+    def predict_proba(self, rows):
+        if any(r.get("x") is None for r in rows):
+            raise ValueError("x is required")
+        return np.array([r["x"] for r in rows], dtype=float)
+
+
+def test_failed_batch_only_fails_the_bad_request():
+    batcher = serve.MicroBatcher(_PickyScorer(), max_batch=64)
+    # queued before the thread starts: all three land in one batch
+    futures = [batcher.submit(rows) for rows in ([{"x": 1}], [{}], [{"x": 3}])]
+    batcher.start()
+    assert list(futures[0].result(timeout=5)) == [1.0]
+    with pytest.raises(ValueError, match="required"):
+        futures[1].result(timeout=5)
+    assert list(futures[2].result(timeout=5)) == [3.0]
+
+
+def test_concurrent_requests_are_isolated_from_a_bad_one(tmp_path):
+    pipe = train_baseline.fit_and_evaluate(_features(), "churned", 0.2, 7)["pipe"]
+    joblib.dump(pipe, tmp_path / "model.pkl")
+    (tmp_path / "params.json").write_text("{}")
+    rows = [{k: v for k, v in r.items() if v == v} for r in _rows()] * 2
+    expected = pipe.predict_proba(pd.DataFrame.from_records(rows))[:, 1]
+    bad = {0: {**rows[0], "tenure": "abc"}, 1: {**rows[1], "tenure": [1, 2]}}
+    for engine in ("fast", "pipeline"):
+        server, batcher, _ = serve.build_server(
+            tmp_path, host="127.0.0.1", port=0, engine=engine, max_wait_ms=50
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        results = {}
+        start = threading.Barrier(len(rows))
+
+        def post(i):
+            conn = http.client.HTTPConnection(*server.server_address[:2])
+            start.wait()
+            conn.request(
+                "POST", "/score", json.dumps({"features": bad.get(i, rows[i])})
+            )
+            response = conn.getresponse()
+            results[i] = response.status, json.loads(response.read())
+            conn.close()
+
+        try:
+            threads = [threading.Thread(target=post, args=(i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            server.shutdown()
+            server.server_close()
+        for i in bad:
+            assert results[i][0] == 400
+            assert "tenure" in results[i][1]["error"]
+        for i in range(len(bad), len(rows)):
+            assert results[i][0] == 200, (engine, results[i])
+            assert results[i][1]["churn_probability"] == pytest.approx(expected[i])
+    # numeric strings are coerced, not rejected
+    assert serve.coerce_rows([{"tenure": "12"}], ["tenure"], []) == [{"tenure": 12.0}]
@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from src.pipelines.ingest_csv import CHURN_COLS, CUSTOMERS_COLS, PhaseTimer
+
+
+def test_generator_writes_loader_ready_csvs(tmp_path: Path):
+    cmd = [
+        sys.executable,
+        "scripts/gen_synthetic.py",
+        "--customers",
+        "500",
+        "--snapshots",
+        "3",
+        "--block-size",
+        "200",
+        "--out-dir",
+        str(tmp_path),
+    ]
+    completed = subprocess.run(cmd, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+
+    customers = pd.read_csv(tmp_path / "customers.csv", keep_default_na=False)
+    labels = pd.read_csv(tmp_path / "churn_labels.csv", keep_default_na=False)
+    assert list(customers.columns) == CUSTOMERS_COLS
+    assert list(labels.columns) == CHURN_COLS
+    assert customers["external_id"].is_unique and len(customers) == 500
+
+    attrs = json.loads(customers["attributes"].iloc[0])
+    assert {"tenure", "Contract", "InternetService", "TotalCharges"} <= set(attrs)
+
+    # At most one label per customer and snapshot, all at month ends
+    assert not labels.duplicated(["external_id", "label_date"]).any()
+    assert labels["label_date"].nunique() <= 3
+    assert set(labels["external_id"]) <= set(customers["external_id"])
+    # Churned at the latest snapshot implies inactive
+    latest = labels[labels["label_date"] == labels["label_date"].max()]
+    churned = set(latest.loc[latest["label"], "external_id"])
+    inactive = set(customers.loc[~customers["is_active"], "external_id"])
+    assert churned <= inactive
+
+
+def test_phase_timer_charges_nested_time_to_inner_phase():
+    timer = PhaseTimer()
+
+    def slow_items():
+        for i in range(2):
+            time.sleep(0.02)
+            yield i
+
+    with timer.phase("outer"):
+        for _ in timer.timed(slow_items(), "inner"):
+            time.sleep(0.01)
+
+    assert timer.seconds["inner"] >= 0.04
+    assert 0.02 <= timer.seconds["outer"] < timer.seconds["inner"]
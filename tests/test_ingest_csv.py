@@ -0,0 +1,231 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from src.pipelines import ingest_csv
+
+
+def _write_csv(path: Path, n: int = 60) -> list[dict]:
+    # attributes with commas, doubled quotes and embedded newlines (\n, \r\n)
+    notes = ["plain", 'says "hi", twice', "two\nlines", 'a "quoted\r\nbreak"', ""]
+    rows = [
+        {
+            **dict.fromkeys(ingest_csv.CUSTOMERS_COLS, ""),
+            "external_id": f"C{i:03d}",
+            "attributes": notes[i % len(notes)],
+        }
+        for i in range(n)
+    ]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=ingest_csv.CUSTOMERS_COLS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+class _Conn:
+    """Rows reach `committed` only on commit(), like a transaction."""
+
+    def __init__(self):
+        self.pending, self.committed = [], []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        self.committed += self.pending
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def test_every_row_end_offset_resumes_at_the_next_row(tmp_path):
+    path = tmp_path / "customers.csv"
+    rows = _write_csv(path, n=12)
+    seen = list(ingest_csv.iter_csv_rows(path))
+    assert [row for row, _ in seen] == rows
+    for i, (_, end) in enumerate(seen):
+        rest = [row for row, _ in ingest_csv.iter_csv_rows(path, end)]
+        assert rest == rows[i + 1 :]
+
+
+def test_checkpoint_refuses_a_changed_input(tmp_path):
+    path = tmp_path / "customers.csv"
+    _write_csv(path, n=3)
+    files = {"customers": path}
+    checkpoint = tmp_path / "ingest.ckpt"
+    progress = {"file": ingest_csv._file_identity(path), "offset": 10}
+    ingest_csv.save_checkpoint(checkpoint, {"customers": progress})
+    assert ingest_csv.load_checkpoint(checkpoint, files)["customers"] == progress
+    assert not (tmp_path / "ingest.ckpt.tmp").exists()
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write("C999" + "," * (len(ingest_csv.CUSTOMERS_COLS) - 1) + "\n")
+    with pytest.raises(ValueError, match="does not match"):
+        ingest_csv.load_checkpoint(checkpoint, files)
+
+
+def test_crash_between_chunks_resumes_without_duplicates_or_gaps(tmp_path, monkeypatch):
+    path = tmp_path / "customers.csv"
+    rows = _write_csv(path, n=23)
+    files = {"customers": path, "churn_labels": tmp_path / "churn_labels.csv"}
+    checkpoint = tmp_path / "ingest.ckpt"
+    conn, chunks = _Conn(), []
+
+    def copy_customers(cur, batch):
+        chunks.append(len(batch))
+        if len(chunks) == 4:
+            raise ConnectionError("server went away")
+        cur.pending += batch
+
+    monkeypatch.setattr(ingest_csv, "copy_customers", copy_customers)
+    with pytest.raises(ConnectionError):
+        ingest_csv.ingest_streaming(conn, files, "copy", 5, checkpoint, False, False)
+    assert conn.committed == rows[:15]
+    assert json.loads(checkpoint.read_text())["customers"]["rows"] == 15
+
+    conn.rollback()  # the failed chunk's transaction
+    totals = ingest_csv.ingest_streaming(
+        conn, files, "copy", 5, checkpoint, False, False
+    )
+    assert conn.committed == rows
+    assert totals["customers"] == 23
+    assert not checkpoint.exists()
+
+
+class _Cursor:
+    def __init__(self, stored):
+        self.stored = stored
+
+    def execute(self, sql, params):
+        self.rows = [(e, self.stored[e]) for e in params[0] if e in self.stored]
+
+    def fetchall(self):
+        return self.rows
+
+
+def _in_subprocess(code: str, *args) -> str:
+    """stdout of `code` run in a fresh interpreter with another hash seed."""
+    return subprocess.run(
+        [sys.executable, "-c", code, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONHASHSEED": "123"},
+        cwd=Path(__file__).resolve().parents[1],
+    ).stdout.strip()
+
+
+def test_filter_delta_sends_only_new_and_changed_rows():
+    def customer(ext, plan):
+        return {"external_id": ext, "country": "US", "plan_tier": plan}
+
+    stored = {
+        "same": ingest_csv.row_hash(customer("same", "pro")),
+        "changed": ingest_csv.row_hash(customer("changed", "basic")),
+    }
+    rows = [
+        customer("new", "pro"),
+        customer("same", "pro"),
+        customer("changed", "basic"),
+        customer("changed", "pro"),  # later duplicate wins
+        customer("", "pro"),
+        customer(None, "pro"),
+    ]
+    changed, counts = ingest_csv.filter_delta(_Cursor(stored), rows)
+    assert changed == [customer("new", "pro"), customer("changed", "pro")]
+    assert counts == Counter(inserted=1, updated=1, unchanged=1, skipped=3)
+
+
+def test_row_hash_is_stable_across_processes():
+    row = {"external_id": "C1", "country": "US", "attributes": '{"tenure": 3}'}
+    code = (
+        "import json, sys; from src.pipelines.ingest_csv import row_hash; "
+        "print(row_hash(json.loads(sys.argv[1])))"
+    )
+    assert _in_subprocess(code, json.dumps(row)) == ingest_csv.row_hash(row)
+
+
+def _shards(path, n_shards, n_ranges, spool_dir, monkeypatch):
+    """Rows each `_load_shard` worker writes, by shard (split step, then load)."""
+    ranges = ingest_csv.shard_ranges(path, n_ranges)
+    for part, (start, end) in enumerate(ranges):
+        ingest_csv._split_range(path, part, start, end, n_shards, 7, spool_dir)
+    shards = [[] for _ in range(n_shards)]
+    for shard in range(n_shards):
+
+        def write(conn, name, batch, mode, delta, got=shards[shard]):
+            got.extend(batch)
+            return Counter()
+
+        monkeypatch.setattr(ingest_csv, "_write_shard_batch", write)
+        paths = [ingest_csv._spool_path(spool_dir, p, shard) for p in range(n_ranges)]
+        ingest_csv._load_shard("customers", paths, "copy", 7, False)
+    return shards
+
+
+@pytest.mark.parametrize(
+    "n_shards, block", [(1, 1 << 20), (2, 1 << 20), (4, 7), (7, 64), (90, 1 << 20)]
+)
+def test_shard_ranges_are_disjoint_and_cover_every_row(tmp_path, n_shards, block):
+    path = tmp_path / "customers.csv"
+    rows = _write_csv(path)
+    ranges = ingest_csv.shard_ranges(path, n_shards, block=block)
+
+    assert len(ranges) == n_shards
+    assert ranges[-1][1] == path.stat().st_size
+    # contiguous: each range starts where the previous one ended
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    parts = [
+        [row for row, _ in ingest_csv.iter_csv_rows(path, start, end)]
+        for start, end in ranges
+    ]
+    assert [row for part in parts for row in part] == rows
+    if n_shards <= 7:
+        assert all(parts)  # 60 rows: every range gets some
+
+
+def test_shards_are_disjoint_by_external_id_and_keep_file_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_csv.db, "connection", lambda: _Conn())
+    path = tmp_path / "customers.csv"
+    rows = _write_csv(path)
+    # a repeated external_id in a later byte range than its first occurrence
+    repeats = [{**rows[i], "attributes": f"v{i}"} for i in (0, 1, 0)]
+    with path.open("a", newline="", encoding="utf-8") as f:
+        csv.DictWriter(f, fieldnames=ingest_csv.CUSTOMERS_COLS).writerows(repeats)
+    rows += repeats
+
+    shards = _shards(path, 3, 4, tmp_path, monkeypatch)
+    assert all(shards)
+    for shard, batch in enumerate(shards):
+        assert {ingest_csv.shard_of(r["external_id"], 3) for r in batch} == {shard}
+        # every shard sees its rows in file order, so the last duplicate wins
+        assert batch == [r for r in rows if r in batch]
+    assert sorted(map(str, sum(shards, []))) == sorted(map(str, rows))
+
+
+def test_shard_of_is_stable_across_processes():
+    ids = [f"C{i}" for i in range(50)] + ["", None]
+    code = (
+        "import json, sys; from src.pipelines.ingest_csv import shard_of; "
+        "print(json.dumps([shard_of(e, 7) for e in json.loads(sys.argv[1])]))"
+    )
+    here = [ingest_csv.shard_of(e, 7) for e in ids]
+    assert json.loads(_in_subprocess(code, json.dumps(ids))) == here
+    assert len(set(here)) == 7
@@ -0,0 +1,112 @@
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cli import monte_carlo
+from src.cli.run_registry import RunRegistry
+from src.cli.train_baseline import _maybe_sample, fit_and_evaluate
+
+
+def _features(n=120):
+    rng = np.random.RandomState(0)
+    plan = rng.choice(["basic", "pro", "enterprise"], size=n).astype(object)
+    plan[::17] = None  # categorical NaNs must survive the shared encoding
+    return pd.DataFrame(
+        {
+            "age": rng.randint(18, 80, size=n),
+            "charges": rng.uniform(10, 120, size=n),
+            "plan": plan,
+            "paperless": rng.choice([True, False], size=n),
+            "churned": rng.binomial(1, p=0.3, size=n),
+        }
+    )
+
+
+def test_shared_frame_round_trips(tmp_path: Path):
+    df = _features()
+    spec = monte_carlo.export_frame(df, tmp_path)
+    arrays = {
+        c["name"]: np.load(tmp_path / c["file"], mmap_mode="r") for c in spec["columns"]
+    }
+    rows = monte_carlo.sample_rows(len(df), 50, seed=7)
+    expected = _maybe_sample(df, 50, 7)
+    rebuilt = monte_carlo.import_frame(spec, arrays, rows)
+    pd.testing.assert_frame_equal(rebuilt, expected, check_dtype=False)
+
+
+def test_pool_runs_match_single_runs(tmp_path: Path):
+    df = _features()
+    data = tmp_path / "features.parquet"
+    df.to_parquet(data)
+    outbase = tmp_path / "mc"
+
+    failed = monte_carlo.run_monte_carlo(
+        str(data), "churned", [1, 2, 3], str(outbase), sample_n=80, jobs=2
+    )
+    assert failed == 0
+
+    with open(outbase / "metrics.csv", newline="") as f:
+        rows = {int(r["seed"]): r for r in csv.DictReader(f)}
+    assert sorted(rows) == [1, 2, 3]
+    for seed, row in rows.items():
+        expected = fit_and_evaluate(df, "churned", 0.2, seed, sample_n=80)["metrics"]
+        for key in monte_carlo.METRIC_FIELDS:
+            assert float(row[key]) == pytest.approx(expected[key])
+        assert (outbase / f"run_{seed}" / "model.pkl").exists()
+
+    registry = RunRegistry(outbase / "runs.sqlite")
+    best = registry.top("roc_auc", k=3)
+    assert [r["seed"] for r in best] == sorted(
+        rows, key=lambda s: (-float(rows[s]["roc_auc"]), s)
+    )
+    assert registry.get(best[0]["run_id"])["params"]["sample_n"] == 80
+    registry.close()
+
+    timings = pd.read_csv(outbase / "timings.csv")
+    assert sorted(timings["seed"].unique()) == [1, 2, 3]
+    assert {"fit", "predict", "dump_model"} <= set(timings["stage"])
+    assert (timings["wall_s"] >= 0).all()
+
+
+def test_appended_runs_share_the_monte_carlo_sweep(tmp_path: Path):
+    data = tmp_path / "features.parquet"
+    _features().to_parquet(data)
+    outbase = tmp_path / "mc"
+    failed = monte_carlo.run_monte_carlo(
+        str(data),
+        "churned",
+        [1, 2],
+        str(outbase),
+        sample_n=80,
+        jobs=1,
+        cache_dir=str(tmp_path / "cache"),
+    )
+    assert failed == 0
+    with RunRegistry(outbase / "runs.sqlite") as registry:
+        (sweep,) = {r["sweep"] for r in registry.top("roc_auc", k=2)}
+
+    # params.json differs per seed (preprocess_cache key and hit)
+    registry_path = tmp_path / "appended.sqlite"
+    script = Path(__file__).resolve().parents[1] / "scripts" / "mc_append_metrics.py"
+    for seed in (1, 2):
+        run_dir = outbase / f"run_{seed}"
+        assert "preprocess_cache" in json.loads((run_dir / "params.json").read_text())
+        subprocess.run(
+            [
+                sys.executable,
+                str(script),
+                str(seed),
+                "80",
+                str(run_dir),
+                str(registry_path),
+            ],
+            check=True,
+        )
+    with RunRegistry(registry_path) as registry:
+        assert {r["sweep"] for r in registry.top("roc_auc", k=2)} == {sweep}
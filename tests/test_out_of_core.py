@@ -0,0 +1,98 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cli import out_of_core, train_baseline
+
+
+def _features(n=2000):
+    rng = np.random.RandomState(0)
+    tenure = rng.randint(0, 72, size=n)
+    plan = rng.choice(["basic", "pro", "enterprise"], size=n).astype(object)
+    plan[::50] = None
+    logit = 1.0 - 0.05 * tenure + (plan == "basic") * 1.0
+    return pd.DataFrame(
+        {
+            "tenure": tenure,
+            "charges": rng.uniform(10, 120, size=n),
+            "plan": plan,
+            "paperless": rng.choice([True, False], size=n),
+            "churned": rng.binomial(1, 1 / (1 + np.exp(-logit))),
+        }
+    )
+
+
+def test_held_out_split_ignores_batch_boundaries():
+    ids = np.arange(10_000)
+    mask = out_of_core.held_out_mask(ids, 0.2, seed=3)
+    parts = [
+        out_of_core.held_out_mask(ids[i : i + 999], 0.2, 3)
+        for i in range(0, 10_000, 999)
+    ]
+    assert np.array_equal(mask, np.concatenate(parts))
+    assert 0.18 < mask.mean() < 0.22
+    assert not np.array_equal(mask, out_of_core.held_out_mask(ids, 0.2, seed=4))
+
+
+def test_out_of_core_cli_writes_baseline_artifacts(tmp_path: Path):
+    data = tmp_path / "features.parquet"
+    _features().to_parquet(data, row_group_size=300)
+    outdir = tmp_path / "artifacts"
+    cmd = [
+        sys.executable,
+        "-m",
+        "src.cli.train_baseline",
+        "--input",
+        str(data),
+        "--target",
+        "churned",
+        "--outdir",
+        str(outdir),
+        "--out-of-core",
+        "--batch-rows",
+        "256",
+    ]
+    completed = subprocess.run(cmd, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+
+    for name in [
+        "model.pkl",
+        "metrics.json",
+        "params.json",
+        "coefficients.csv",
+        "confusion_matrix.png",
+        "roc_curve.png",
+    ]:
+        assert (outdir / name).exists(), f"missing {name}"
+
+    metrics = json.loads((outdir / "metrics.json").read_text())
+    assert metrics["roc_auc"] > 0.7
+    params = json.loads((outdir / "params.json").read_text())
+    assert params["model"] == "SGDClassifier"
+    split = params["out_of_core"]
+    assert split["train_rows"] + split["test_rows"] == 2000
+    coef = pd.read_csv(outdir / "coefficients.csv")
+    assert {"tenure", "plan_basic", "paperless_True"} <= set(coef["feature"])
+
+
+def test_out_of_core_fits_without_numeric_columns(tmp_path: Path):
+    data = tmp_path / "features.parquet"
+    _features().drop(columns=["tenure", "charges"]).to_parquet(data)
+    result = out_of_core.fit_out_of_core(str(data), "churned", 0.2, 7, epochs=2)
+    assert result["numeric_cols"] == []
+    assert result["metrics"]["roc_auc"] > 0.55
+
+
+@pytest.mark.parametrize("flag", [["--sparse"], ["--cache-dir", "cache"]])
+def test_out_of_core_rejects_flags_it_would_ignore(monkeypatch, capsys, flag):
+    argv = ["train_baseline", "--input", "x.parquet", "--target", "churned"]
+    argv += ["--outdir", "out", "--out-of-core", *flag]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit):
+        train_baseline.parse_args()
+    assert "cannot be combined with --out-of-core" in capsys.readouterr().err
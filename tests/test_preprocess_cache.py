@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cli.preprocess_cache import PreprocessCache, file_digest
+from src.cli.train_baseline import cached_prepare, fit_and_evaluate, fit_prepared
+
+
+def _features(n=200):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame(
+        {
+            "age": rng.randint(18, 80, size=n),
+            "plan": rng.choice(["basic", "pro", "enterprise"], size=n),
+            "churned": rng.binomial(1, p=0.3, size=n),
+        }
+    )
+
+
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_cache_hit_skips_loading_and_matches_uncached_run(tmp_path: Path, use_sparse):
+    df = _features()
+    cache = PreprocessCache(str(tmp_path / "cache"), max_bytes=2**30)
+    args = ("churned", 0.2, 7, None, use_sparse)
+
+    _, info = cached_prepare(cache, "digest-a", lambda: df, *args)
+    assert info["hit"] is False
+
+    def not_loaded():
+        raise AssertionError("frame loaded on a cache hit")
+
+    prepared, info = cached_prepare(cache, "digest-a", not_loaded, *args)
+    assert info["hit"] is True
+    cached = fit_prepared(prepared, 7, use_sparse)["metrics"]
+    expected = fit_and_evaluate(df, "churned", 0.2, 7, use_sparse=use_sparse)["metrics"]
+    for key in ["accuracy", "precision", "recall", "f1", "roc_auc"]:
+        assert cached[key] == pytest.approx(expected[key])
+
+    # Different data or split -> different entry
+    _, info = cached_prepare(cache, "digest-b", lambda: df, *args)
+    assert info["hit"] is False
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    df = _features()
+    root = tmp_path / "cache"
+    cache = PreprocessCache(str(root), max_bytes=2**30)
+    keys = []
+    for i, digest in enumerate(["a", "b", "c"]):
+        _, info = cached_prepare(cache, digest, lambda: df, "churned", 0.2, 7)
+        keys.append(info["key"])
+        os.utime(root / info["key"] / "meta.json", (1000 + i, 1000 + i))
+    cache.get(keys[0])  # "a" becomes the most recently used
+
+    entry_bytes = sum(p.stat().st_size for p in (root / keys[0]).iterdir())
+    cache.max_bytes = 2 * entry_bytes
+    assert cache.evict() == [keys[1]]
+    assert sorted(p.name for p in root.iterdir()) == sorted([keys[0], keys[2]])
+
+
+def test_file_digest_follows_rewrites_without_reading_the_data(tmp_path: Path):
+    path = tmp_path / "features.parquet"
+    _features().to_parquet(path)
+    digest = file_digest(str(path))
+    assert file_digest(str(path)) == digest
+
+    # same size and mtime, other rows: the footer's statistics differ
+    stat = path.stat()
+    other = _features().assign(age=lambda d: d["age"] + 1)
+    other.to_parquet(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert file_digest(str(path)) != digest
+
+    csv = tmp_path / "features.csv"
+    _features().to_csv(csv, index=False)
+    assert len(file_digest(str(csv))) == 32
@@ -0,0 +1,103 @@
+import json
+import multiprocessing as mp
+import os
+from pathlib import Path
+
+import pytest
+
+from src.cli.run_registry import RunRegistry, sweep_key
+
+
+def _writer(path, seeds):
+    with RunRegistry(path) as registry:
+        for seed in seeds:
+            registry.register(seed, {"roc_auc": seed / 1000, "f1": 1 - seed / 1000})
+
+
+def test_concurrent_writers_and_top_k(tmp_path: Path):
+    path = tmp_path / "runs.sqlite"
+    ctx = mp.get_context("spawn")
+    procs = [
+        ctx.Process(target=_writer, args=(path, range(i, 200, 4))) for i in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+
+    with RunRegistry(path) as registry:
+        (count,) = registry.conn.execute("SELECT count(*) FROM runs").fetchone()
+        assert count == 200
+        assert [r["seed"] for r in registry.top("roc_auc", k=3)] == [199, 198, 197]
+        assert [r["seed"] for r in registry.top("f1", k=2)] == [0, 1]
+        assert [r["seed"] for r in registry.top("f1", k=1, lowest=True)] == [199]
+        plan = " ".join(
+            row[-1]
+            for row in registry.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT run_id FROM metrics "
+                "WHERE name = 'roc_auc' ORDER BY value DESC LIMIT 3"
+            )
+        )
+        assert "metrics_by_value" in plan
+
+
+def test_reregistering_a_seed_replaces_it_within_its_sweep(tmp_path: Path):
+    with RunRegistry(tmp_path / "runs.sqlite") as registry:
+        params = {"sample_n": 50, "random_state": 7}
+        first = registry.register(7, {"roc_auc": 0.5, "recall": 0.1}, params=params)
+        again = registry.register(
+            7,
+            {"roc_auc": 0.8, "resources": {"peak_rss_mb": 1.0}},
+            n=50,
+            params=params,
+        )
+        assert again == first
+        run = registry.get(first)
+        assert run["metrics"] == {"roc_auc": 0.8}  # nested blocks are not metrics
+        assert run["params"] == params
+
+
+def test_sweeps_keep_their_own_runs_and_ranking(tmp_path: Path):
+    with RunRegistry(tmp_path / "runs.sqlite") as registry:
+        small = {"test_size": 0.2, "input_path": "a.parquet"}
+        large = {"test_size": 0.5, "input_path": "a.parquet"}
+        for seed in range(3):
+            registry.register(seed, {"roc_auc": 0.9 + seed / 100}, params=small)
+        for seed in range(3):
+            registry.register(seed, {"roc_auc": 0.6 + seed / 100}, params=large)
+
+        (count,) = registry.conn.execute("SELECT count(*) FROM runs").fetchone()
+        assert count == 6
+        assert registry.latest_sweep() == sweep_key(large)
+        best = registry.top("roc_auc", sweep=sweep_key(large))[0]
+        assert (best["seed"], best["roc_auc"]) == (2, 0.62)
+        assert registry.top("roc_auc")[0]["sweep"] == sweep_key(small)
+        # the seed is not part of the sweep
+        assert sweep_key({**small, "random_state": 1}) == sweep_key(small)
+
+
+def test_promote_switches_the_symlink(tmp_path: Path):
+    base = tmp_path / "mc"
+    best = base / "best"
+    best.mkdir(parents=True)
+    (best / "metrics.json").write_text("{}")  # left by copy-based promotion
+    with RunRegistry(base / "runs.sqlite") as registry:
+        ids = {}
+        for seed, auc in [(1, 0.7), (2, 0.9)]:
+            run_dir = base / f"run_{seed}"
+            run_dir.mkdir()
+            (run_dir / "metrics.json").write_text(json.dumps({"roc_auc": auc}))
+            ids[seed] = registry.register(seed, {"roc_auc": auc}, run_dir=str(run_dir))
+
+        registry.promote(ids[1], best, metric="roc_auc", value=0.7)
+        assert best.is_symlink() and os.readlink(best) == "run_1"
+        registry.promote(ids[2], best, metric="roc_auc", value=0.9)
+        assert os.readlink(best) == "run_2"
+        assert json.loads((best / "metrics.json").read_text()) == {"roc_auc": 0.9}
+        assert registry.alias("best")["run_id"] == ids[2]
+        assert not [p for p in base.iterdir() if p.name.endswith(".tmp")]
+
+        no_dir = registry.register(3, {"roc_auc": 1.0})
+        with pytest.raises(FileNotFoundError):
+            registry.promote(no_dir, best)
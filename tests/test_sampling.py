@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src.cli.sampling import read_sample, sample_positions
+from src.cli.train_baseline import _maybe_sample
+
+
+def _features(n=1000):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame(
+        {
+            "age": rng.randint(18, 80, size=n),
+            "plan": rng.choice(["basic", "pro", "enterprise"], size=n),
+            "churned": rng.binomial(1, p=0.2, size=n),
+        }
+    )
+
+
+@pytest.mark.parametrize("stratify_on", [None, "churned"])
+def test_read_sample_matches_in_memory_sample(tmp_path: Path, monkeypatch, stratify_on):
+    df = _features()
+    path = tmp_path / "features.parquet"
+    df.to_parquet(path, row_group_size=50)
+
+    read = []
+    original = pq.ParquetFile.read_row_group
+
+    def spy(self, i, *args, **kwargs):
+        read.append(i)
+        return original(self, i, *args, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "read_row_group", spy)
+    got = read_sample(path, 8, seed=3, stratify_on=stratify_on)
+
+    expected = _maybe_sample(df, 8, 3, stratify_on)
+    pd.testing.assert_frame_equal(got, expected)
+    assert 0 < len(read) <= 8  # only row groups holding sampled rows
+
+
+def test_stratified_positions_keep_class_shares():
+    labels = np.array([0] * 700 + [1] * 250 + [2] * 50)
+    rows = sample_positions(len(labels), 101, seed=1, labels=labels)
+    assert len(np.unique(rows)) == 101
+    # 70.7 / 25.25 / 5.05 -> largest remainder gives the 101st row to class 0
+    assert np.bincount(labels[rows]).tolist() == [71, 25, 5]
+    np.testing.assert_array_equal(
+        rows, sample_positions(len(labels), 101, seed=1, labels=labels)
+    )
+
+
+def test_no_sampling_when_cap_covers_the_data(tmp_path: Path):
+    df = _features(30)
+    path = tmp_path / "features.parquet"
+    df.to_parquet(path)
+    assert sample_positions(30, 30, seed=0) is None
+    pd.testing.assert_frame_equal(read_sample(path, 50, seed=0), df)
@@ -0,0 +1,82 @@
+import datetime as dt
+import warnings
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from src.pipelines.db_features import TELCO_FEATURES
+from src.pipelines.training_sets import as_of_rows, check_coverage, join_snapshots
+
+DAY_US = 86_400 * 1_000_000
+
+
+def _us(day: str, hours: int = 0) -> int:
+    days = (dt.date.fromisoformat(day) - dt.date(1970, 1, 1)).days
+    return days * DAY_US + hours * 3_600 * 1_000_000
+
+
+def _history():
+    # customer a: backfilled, then changed mid-May and again on the label day
+    # itself (after midnight: not yet visible at the start of 2024-05-31);
+    # customer b only from June; c never changes
+    rows = [
+        ("a", None, 1),
+        ("b", _us("2024-06-02"), 20),
+        ("a", _us("2024-05-15"), 2),
+        ("c", None, 30),
+        ("a", _us("2024-05-31", hours=9), 3),
+    ]
+    columns = {
+        "customer_id": pa.array([r[0] for r in rows]).dictionary_encode(),
+        "valid_from_us": pa.array([r[1] for r in rows], pa.int64()),
+    }
+    for name in TELCO_FEATURES:
+        columns[name] = pa.array([float(r[2]) for r in rows])
+    return pa.table(columns)
+
+
+def _labels():
+    days = [
+        "2024-04-30",
+        "2024-05-31",
+        "2024-05-31",
+        "2024-06-30",
+        "2024-06-30",
+        "2024-06-30",
+    ]
+    return pa.table(
+        {
+            "customer_id": pa.array(
+                ["a", "a", "b", "a", "b", "zz"]
+            ).dictionary_encode(),
+            "label_date": pa.array(
+                [dt.date.fromisoformat(d) for d in days], pa.date32()
+            ),
+            "churned": pa.array([0, 1, 0, 1, 1, 0], pa.int32()),
+        }
+    )
+
+
+def test_as_of_rows_take_the_version_valid_at_the_start_of_label_date():
+    rows = as_of_rows(_history(), _labels())
+    # a@04-30 -> backfill, a@05-31 -> mid-May version, b@05-31 -> none yet,
+    # a@06-30 -> label-day version, b@06-30 -> June version, zz -> unknown
+    np.testing.assert_array_equal(rows, [0, 2, -1, 4, 1, -1])
+
+
+def test_join_snapshots_keeps_matched_labels_in_order():
+    joined = join_snapshots(_history(), _labels(), "churned")
+    assert joined.column_names == TELCO_FEATURES + ["label_date", "churned"]
+    assert joined.column("tenure").to_pylist() == [1.0, 2.0, 3.0, 20.0]
+    assert joined.column("churned").to_pylist() == [0, 1, 1, 1]
+
+
+def test_check_coverage_fails_empty_snapshots_and_warns_on_most_dropped():
+    with pytest.raises(ValueError, match="2024-06-30.*--valid-from"):
+        check_coverage(["2024-05-31", "2024-06-30"], [3, 0], 4, 7)
+    with pytest.warns(UserWarning, match="3 of 5 labels dropped"):
+        check_coverage(["2024-05-31", "2024-06-30"], [1, 1], 3, 5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        check_coverage(["2024-05-31"], [3], 2, 5)
@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.cli import train_baseline
+
+
+def _features(n=600):
+    rng = np.random.RandomState(0)
+    tenure = rng.randint(0, 72, size=n)
+    plan = rng.choice(["basic", "pro", "enterprise"], size=n)
+    logit = 1.0 - 0.05 * tenure + (plan == "basic") * 1.0
+    return pd.DataFrame(
+        {
+            "tenure": tenure,
+            "charges": rng.uniform(10, 120, size=n),
+            "plan": plan,
+            "churned": rng.binomial(1, 1 / (1 + np.exp(-logit))),
+        }
+    )
+
+
+def test_successive_halving_narrows_candidates_as_rows_grow():
+    prepared = train_baseline.prepare(_features(), "churned", 0.2, 3, use_sparse=True)
+    best, trials, rungs = train_baseline.tune(prepared, 3, eta=3, min_rows=40, jobs=2)
+
+    n_candidates = len(train_baseline.TUNE_PATHS) * len(train_baseline.TUNE_C)
+    assert [r["trials"] for r in rungs] == [48, 16, 6][: len(rungs)]
+    assert rungs[0]["trials"] == n_candidates
+    assert [r["rows"] for r in rungs] == sorted(r["rows"] for r in rungs)
+    assert len(trials) == sum(r["trials"] for r in rungs)
+
+    last = [t for t in trials if t["rows"] == rungs[-1]["rows"]]
+    top = max(last, key=lambda t: t["roc_auc"])
+    assert best == {k: top[k] for k in ("solver", "penalty", "class_weight", "C")}
+
+
+def test_tune_mode_writes_best_params(tmp_path: Path):
+    data = tmp_path / "features.parquet"
+    _features().to_parquet(data)
+    outdir = tmp_path / "artifacts"
+    cmd = [
+        sys.executable,
+        "-m",
+        "src.cli.train_baseline",
+        "--input",
+        str(data),
+        "--target",
+        "churned",
+        "--outdir",
+        str(outdir),
+        "--mode",
+        "tune",
+        "--jobs",
+        "2",
+    ]
+    completed = subprocess.run(cmd, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+
+    params = json.loads((outdir / "params.json").read_text())
+    assert params["solver"] in ("liblinear", "saga")
+    assert params["C"] in train_baseline.TUNE_C
+    assert params["tune"]["metric"] == "roc_auc"
+    metrics = json.loads((outdir / "metrics.json").read_text())
+    assert metrics["roc_auc"] is not None
+    trials = pd.read_csv(outdir / "tune_trials.csv")
+    assert len(trials) == params["tune"]["trials"]